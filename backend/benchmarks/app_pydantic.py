@@ -0,0 +1,28 @@
+"""
+App Flask com o blueprint `nps` (modelo Pydantic + cliente supabase-py).
+
+O `main.py` serve só a pilha `nps_simple`; este módulo expõe a outra pilha nas
+mesmas rotas para o `bench_carga.py` (requer o pacote `supabase`).
+
+Uso:
+    gunicorn benchmarks.app_pydantic:app
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from flask import Flask, jsonify
+
+load_dotenv()
+
+from src.routes.nps import nps_bp
+
+app = Flask(__name__)
+app.register_blueprint(nps_bp, url_prefix='/api')
+
+
+@app.route('/api/health')
+def health():
+    return jsonify({'status': 'ok'})
@@ -0,0 +1,89 @@
+"""
+Benchmark das operações de armazenamento: Supabase (PostgREST) vs. SQLite local.
+
+Executa as chamadas que o `NPSServiceSimple` faz no banco (insert de uma
+pesquisa, bulk insert de 100, contagem por categoria e filial, contagens
+agrupadas via `nps_contagens` e uma página da listagem) contra o
+`SimpleSupabaseClient` apontado para o PostgREST falso e contra o
+`SQLiteClient` num arquivo temporário, ambos com as mesmas `--linhas`
+pesquisas. O PostgREST falso roda na mesma máquina: a latência de rede de
+uma filial até o Supabase entra com `--atraso-ms`.
+
+Uso:
+    python benchmarks/bench_armazenamento.py --linhas 100000 --chamadas 500 --atraso-ms 30
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.carga_http import percentil
+from benchmarks.dados_sinteticos import gerar_pesquisas
+from benchmarks.fake_postgrest import FakePostgREST
+
+TABELA = 'nps_pesquisas'
+PESQUISA = {'filial': 'blumenau', 'score': 9, 'categoria_nps': 'promotor', 'timestamp': '2025-12-31T12:00:00'}
+
+
+def _operacoes(cliente):
+    lote = [dict(PESQUISA) for _ in range(100)]
+    return {
+        'insert': lambda: cliente.insert(TABELA, PESQUISA),
+        'insert_many (100)': lambda: cliente.insert_many(TABELA, lote),
+        'count (categoria, filial)': lambda: cliente.count(TABELA, {'categoria_nps': 'promotor', 'filial': 'joinville'}),
+        'rpc nps_contagens (filial)': lambda: cliente.rpc('nps_contagens', {'p_filial': 'joinville'}),
+        'select (página 50)': lambda: cliente.select(TABELA, {'filial': 'joinville'}, 51, order='timestamp.desc,id.desc')
+    }
+
+
+def _medir(funcao, chamadas):
+    latencias = []
+    for _ in range(chamadas):
+        inicio = time.perf_counter()
+        sucesso, resultado = funcao()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if not sucesso:
+            raise RuntimeError(resultado)
+    return sum(latencias) / len(latencias), percentil(latencias, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=100000, help='pesquisas já gravadas')
+    parser.add_argument('--chamadas', type=int, default=500, help='chamadas por operação')
+    parser.add_argument('--atraso-ms', type=float, default=0.0, help='latência simulada do PostgREST')
+    args = parser.parse_args()
+
+    linhas = gerar_pesquisas(args.linhas)
+
+    servidor = FakePostgREST(atraso_ms=args.atraso_ms).iniciar()
+    servidor.inserir(TABELA, linhas)
+    os.environ['SUPABASE_URL'] = servidor.url
+    os.environ['SUPABASE_KEY'] = 'chave-benchmark'
+
+    from src.database.sqlite_client import SQLiteClient
+    from src.database.supabase_client_simple import SimpleSupabaseClient
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        sqlite = SQLiteClient(os.path.join(diretorio, 'nps.db'))
+        for inicio in range(0, len(linhas), 10000):
+            sqlite.insert_many(TABELA, linhas[inicio:inicio + 10000])
+
+        clientes = (('supabase', SimpleSupabaseClient()), ('sqlite', sqlite))
+        print(f"{args.linhas} linhas, {args.chamadas} chamadas por operação, PostgREST +{args.atraso_ms:.0f} ms")
+        print(f"{'operação':<30}{'backend':<10}{'média (ms)':>12}{'p99 (ms)':>10}")
+        for nome, funcao in _operacoes(clientes[0][1]).items():
+            for backend, cliente in clientes:
+                media, p99 = _medir(_operacoes(cliente)[nome], args.chamadas)
+                print(f"{nome:<30}{backend:<10}{media:>12.3f}{p99:>10.3f}")
+
+        for _, cliente in clientes:
+            cliente.close()
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
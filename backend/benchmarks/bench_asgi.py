@@ -0,0 +1,93 @@
+"""
+Benchmark de vazão concorrente: app WSGI (gunicorn, workers síncronos) vs.
+app ASGI (uvicorn, `src/main_asgi.py`).
+
+Sobe o PostgREST falso com latência simulada em um processo separado, cada
+servidor da API com o mesmo número de workers e dispara requisições
+concorrentes por conexões keep-alive. Com workers síncronos cada requisição
+prende um worker durante a ida e volta ao banco; no ASGI as requisições
+aguardam o PostgREST sem bloquear o processo.
+
+Uso:
+    python benchmarks/bench_asgi.py --requisicoes 2000 --concorrencia 200 --workers 2 --atraso-ms 50
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from benchmarks.carga_http import aguardar, carga, percentil, porta_livre, requisicao_http
+
+PESQUISA = {'filial': 'blumenau', 'score': 9, 'nome': 'Benchmark', 'email': 'bench@exemplo.com'}
+
+
+def _requisicao(rota):
+    if rota == 'post':
+        return requisicao_http('POST', '/api/nps', PESQUISA)
+    return requisicao_http('GET', '/api/nps/estatisticas')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requisicoes', type=int, default=2000)
+    parser.add_argument('--concorrencia', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--atraso-ms', type=float, default=50.0, help='latência simulada do PostgREST')
+    parser.add_argument('--rota', choices=('post', 'estatisticas'), default='post')
+    args = parser.parse_args()
+    
+    porta_banco = porta_livre()
+    banco = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.fake_postgrest', '--porta', str(porta_banco), '--atraso-ms', str(args.atraso_ms)],
+        cwd=BACKEND, stdout=subprocess.DEVNULL
+    )
+    ambiente = dict(
+        os.environ,
+        SUPABASE_URL=f'http://127.0.0.1:{porta_banco}',
+        SUPABASE_KEY='chave-benchmark',
+        NPS_INGESTAO_MODO='sincrono',
+        NPS_AGREGADOS_ATIVO='false',
+        NPS_SNAPSHOT_ATIVO='false',
+        NPS_CACHE_ATIVO='false',
+        # A mesma pesquisa repetida seria respondida pela supressão de reenvios
+        NPS_IDEMPOTENCIA_ATIVO='false'
+    )
+    
+    servidores = {
+        'wsgi (gunicorn sync)': ['gunicorn', '-w', str(args.workers), '--log-level', 'warning', 'src.main:app', '-b'],
+        'asgi (uvicorn)': ['uvicorn', '--workers', str(args.workers), '--log-level', 'warning', 'src.main_asgi:app', '--port'],
+    }
+    
+    print(f"{args.requisicoes} requisições ({args.rota}), concorrência {args.concorrencia}, "
+          f"{args.workers} workers, PostgREST +{args.atraso_ms:.0f} ms")
+    print(f"{'servidor':<24}{'req/s':>10}{'p50 (ms)':>11}{'p99 (ms)':>11}{'erros':>8}")
+    falhou = False
+    try:
+        aguardar(f'http://127.0.0.1:{porta_banco}/rest/v1/nps_pesquisas')
+        for nome, comando in servidores.items():
+            porta = porta_livre()
+            endereco = f'127.0.0.1:{porta}' if comando[0] == 'gunicorn' else str(porta)
+            servidor = subprocess.Popen(comando + [endereco], cwd=BACKEND, env=ambiente,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                url = f'http://127.0.0.1:{porta}'
+                aguardar(url + '/api/health')
+                vazao, latencias, erros = asyncio.run(carga(porta, _requisicao(args.rota), args.requisicoes, args.concorrencia))
+                p50, p99 = percentil(latencias, 50), percentil(latencias, 99)
+                falhou = falhou or erros > 0
+                print(f"{nome:<24}{vazao:>10.0f}{p50:>11.1f}{p99:>11.1f}{erros:>8}")
+            finally:
+                servidor.terminate()
+                servidor.wait()
+    finally:
+        banco.terminate()
+    
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Suíte de carga HTTP de ponta a ponta contra o PostgREST falso.
+
+Para cada pilha (`simple`: `src.main:app` com o blueprint `nps_simple`;
+`pydantic`: `benchmarks.app_pydantic:app` com o blueprint `nps`), sobe um
+PostgREST falso novo (latência, taxa de erro e volume de linhas
+configuráveis) e a API no gunicorn. Em seguida dispara `POST /api/nps`,
+`GET /api/nps` e `GET /api/nps/estatisticas` em cada nível de concorrência
+fixo e mede req/s e latências p50/p95/p99.
+
+O relatório vai para a tela e, com `--saida`, para um JSON. Com
+`--comparar base.json`, os resultados são comparados aos da base. O
+processo termina com código 1 se algum cenário ficar abaixo da tolerância:
+req/s menor que a base menos `--tolerancia`, ou p99 maior que a base mais
+`--tolerancia`. Grave a base na mesma máquina.
+
+Uso:
+    python benchmarks/bench_carga.py --concorrencias 1,8,32 --requisicoes 400 --saida base.json
+    python benchmarks/bench_carga.py --concorrencias 1,8,32 --requisicoes 400 --comparar base.json --tolerancia 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from benchmarks.carga_http import aguardar, carga, percentil, porta_livre, requisicao_http
+
+PILHAS = {
+    'simple': 'src.main:app',
+    'pydantic': 'benchmarks.app_pydantic:app',
+}
+
+# Sem email/CNPJ: nenhuma pilha trata o envio repetido como reenvio
+PESQUISA = {'filial': 'blumenau', 'score': 9, 'nome': 'Benchmark', 'comentario': 'Atendimento rápido'}
+
+CENARIOS = {
+    'estatisticas': requisicao_http('GET', '/api/nps/estatisticas'),
+    'listar': requisicao_http('GET', '/api/nps?limite=50'),
+    'post': requisicao_http('POST', '/api/nps', PESQUISA),
+}
+
+# Chave no formato de JWT: o supabase-py recusa chaves em outro formato
+CHAVE_BENCHMARK = 'chave.benchmark.local'
+
+
+def _ambiente(porta_banco, extras):
+    ambiente = dict(
+        os.environ,
+        SUPABASE_URL=f'http://127.0.0.1:{porta_banco}',
+        SUPABASE_KEY=CHAVE_BENCHMARK,
+        NPS_INGESTAO_MODO='sincrono',
+        # Mede o caminho até o banco, não as respostas em memória
+        NPS_AGREGADOS_ATIVO='false',
+        NPS_SNAPSHOT_ATIVO='false',
+        NPS_CACHE_ATIVO='false',
+        NPS_IDEMPOTENCIA_ATIVO='false'
+    )
+    for extra in extras:
+        chave, _, valor = extra.partition('=')
+        ambiente[chave] = valor
+    return ambiente
+
+
+def _medir_pilha(pilha, args):
+    """Resultados de todos os cenários de uma pilha (PostgREST falso e API novos)"""
+    porta_banco = porta_livre()
+    banco = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.fake_postgrest', '--porta', str(porta_banco),
+         '--atraso-ms', str(args.atraso_ms), '--taxa-erro', str(args.taxa_erro), '--linhas', str(args.linhas)],
+        cwd=BACKEND, stdout=subprocess.DEVNULL
+    )
+    servidor = None
+    try:
+        aguardar(f'http://127.0.0.1:{porta_banco}/rest/v1/nps_pesquisas?limit=1', tempo_max=60.0, processo=banco)
+        
+        porta = porta_livre()
+        servidor = subprocess.Popen(
+            ['gunicorn', '-w', str(args.workers), '--threads', str(args.threads), '--log-level', 'warning',
+             '-b', f'127.0.0.1:{porta}', PILHAS[pilha]],
+            cwd=BACKEND, env=_ambiente(porta_banco, args.env),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        aguardar(f'http://127.0.0.1:{porta}/api/health', processo=servidor)
+        
+        resultados = []
+        for cenario in args.cenarios:
+            requisicao = CENARIOS[cenario]
+            if args.aquecimento:
+                asyncio.run(carga(porta, requisicao, args.aquecimento, 1))
+            for concorrencia in args.concorrencias:
+                vazao, latencias, erros = asyncio.run(carga(porta, requisicao, args.requisicoes, concorrencia))
+                resultados.append({
+                    'pilha': pilha,
+                    'cenario': cenario,
+                    'concorrencia': concorrencia,
+                    'requisicoes': args.requisicoes,
+                    'req_s': round(vazao, 1),
+                    'p50_ms': round(percentil(latencias, 50), 2),
+                    'p95_ms': round(percentil(latencias, 95), 2),
+                    'p99_ms': round(percentil(latencias, 99), 2),
+                    'erros': erros
+                })
+        return resultados
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+        banco.terminate()
+        banco.wait()
+
+
+def _chave(resultado):
+    return resultado['pilha'], resultado['cenario'], resultado['concorrencia']
+
+
+def _comparar(resultados, base, tolerancia):
+    """Imprime a variação contra a base; retorna os cenários que regrediram"""
+    anteriores = {_chave(r): r for r in base['resultados']}
+    regressoes = []
+    print(f"\ncomparação com a base (tolerância {tolerancia:.0%})")
+    print(f"{'pilha':<10}{'cenário':<14}{'conc':>5}{'req/s':>10}{'Δ':>8}{'p99 (ms)':>10}{'Δ':>8}  situação")
+    for resultado in resultados:
+        anterior = anteriores.get(_chave(resultado))
+        if anterior is None:
+            continue
+        delta_vazao = resultado['req_s'] / anterior['req_s'] - 1 if anterior['req_s'] else 0.0
+        delta_p99 = resultado['p99_ms'] / anterior['p99_ms'] - 1 if anterior['p99_ms'] else 0.0
+        regrediu = delta_vazao < -tolerancia or delta_p99 > tolerancia
+        if regrediu:
+            regressoes.append(resultado)
+        pilha, cenario, concorrencia = _chave(resultado)
+        print(f"{pilha:<10}{cenario:<14}{concorrencia:>5}{resultado['req_s']:>10.0f}{delta_vazao:>+8.0%}"
+              f"{resultado['p99_ms']:>10.1f}{delta_p99:>+8.0%}  {'REGRESSÃO' if regrediu else 'ok'}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pilhas', default='simple,pydantic', help='pilhas medidas (simple, pydantic)')
+    parser.add_argument('--cenarios', default='estatisticas,listar,post', help='cenários (estatisticas, listar, post)')
+    parser.add_argument('--concorrencias', default='1,8,32', help='conexões simultâneas de cada nível')
+    parser.add_argument('--requisicoes', type=int, default=400, help='requisições por cenário e nível')
+    parser.add_argument('--aquecimento', type=int, default=20, help='requisições descartadas antes de cada cenário')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=1, help='threads por worker do gunicorn')
+    parser.add_argument('--atraso-ms', type=float, default=10.0, help='latência simulada do PostgREST')
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help='fração das chamadas ao PostgREST com 503')
+    parser.add_argument('--linhas', type=int, default=10000, help='pesquisas já gravadas no PostgREST falso')
+    parser.add_argument('--env', action='append', default=[], metavar='CHAVE=VALOR',
+                        help='variável de ambiente extra para a API (repetível)')
+    parser.add_argument('--saida', help='grava o relatório em JSON neste arquivo')
+    parser.add_argument('--comparar', help='relatório JSON de base para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=0.15, help='piora relativa aceita contra a base')
+    args = parser.parse_args()
+    
+    pilhas = [p.strip() for p in args.pilhas.split(',') if p.strip()]
+    args.cenarios = [c.strip() for c in args.cenarios.split(',') if c.strip()]
+    args.concorrencias = [int(c) for c in args.concorrencias.split(',')]
+    for nome, validos in (('pilha', PILHAS), ('cenário', CENARIOS)):
+        for valor in (pilhas if nome == 'pilha' else args.cenarios):
+            if valor not in validos:
+                parser.error(f"{nome} desconhecido: {valor}")
+    
+    print(f"{args.requisicoes} requisições por nível, {args.workers} workers x {args.threads} threads, "
+          f"PostgREST +{args.atraso_ms:.0f} ms, erro {args.taxa_erro:.1%}, {args.linhas} linhas")
+    print(f"{'pilha':<10}{'cenário':<14}{'conc':>5}{'req/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'erros':>7}")
+    
+    resultados = []
+    indisponiveis = {}
+    for pilha in pilhas:
+        try:
+            medidos = _medir_pilha(pilha, args)
+        except RuntimeError as e:
+            # Ex.: a pilha pydantic sem o pacote supabase instalado
+            indisponiveis[pilha] = str(e)
+            print(f"{pilha:<10}indisponível: {e}")
+            continue
+        for r in medidos:
+            print(f"{r['pilha']:<10}{r['cenario']:<14}{r['concorrencia']:>5}{r['req_s']:>10.0f}"
+                  f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['erros']:>7}")
+        resultados.extend(medidos)
+    
+    relatorio = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'maquina': {'python': platform.python_version(), 'plataforma': platform.platform(), 'cpus': os.cpu_count()},
+        'parametros': {
+            'requisicoes': args.requisicoes,
+            'workers': args.workers,
+            'threads': args.threads,
+            'atraso_ms': args.atraso_ms,
+            'taxa_erro': args.taxa_erro,
+            'linhas': args.linhas,
+            'env': args.env
+        },
+        'resultados': resultados,
+        'indisponiveis': indisponiveis
+    }
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"\nrelatório gravado em {args.saida}")
+    
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            base = json.load(arquivo)
+        regressoes = _comparar(resultados, base, args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} cenário(s) com regressão acima de {args.tolerancia:.0%}")
+            sys.exit(1)
+    
+    sys.exit(0 if resultados else 1)
+
+
+if __name__ == '__main__':
+    main()
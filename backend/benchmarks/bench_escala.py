@@ -0,0 +1,277 @@
+"""
+Micro-benchmarks de escala das camadas de modelo e de serviço.
+
+Mede, em cada tamanho (1k/100k/1M envios ou linhas), o tempo por operação e
+o pico de memória (tracemalloc) de:
+
+- `NPSPesquisaSimple.validate`, `NPSPesquisaSimple.to_dict` e
+  `validar_pesquisas` sobre envios de `gerar_envios`;
+- `NPSPesquisaModel` (construção + `to_dict`), se o Pydantic estiver instalado;
+- carga inicial do `NPSSnapshot` e do `NPSAgregados` (`reconciliar`) e
+  `NPSServiceSimple.obter_estatisticas` respondendo de cada um, sobre linhas
+  de `gerar_pesquisas`.
+
+O tempo vem da melhor de `--repeticoes` passadas (casos rápidos repetem a
+função até a passada durar ao menos 0,2 s); o pico de memória, de uma
+passada separada com tracemalloc (que deixaria o tempo mais lento). Os dados
+são determinísticos, então duas execuções medem exatamente o mesmo trabalho.
+
+O relatório vai para a tela e, com `--saida`, para um JSON. Com
+`--comparar base.json`, cada caso é comparado ao da base e o processo
+termina com código 1 se o tempo por operação ou o pico de memória passar da
+base mais `--tolerancia`. A base de referência fica em
+`benchmarks/baselines/escala.json`; regrave-a (na mesma máquina) junto com
+mudanças que alterem o desempenho de propósito.
+
+Uso:
+    python benchmarks/bench_escala.py --saida benchmarks/baselines/escala.json
+    python benchmarks/bench_escala.py --comparar benchmarks/baselines/escala.json --tolerancia 0.25
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Serviço sem banco: as estatísticas saem do snapshot/contadores semeados abaixo
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('SUPABASE_KEY', 'chave-benchmark')
+os.environ.update(
+    NPS_AGREGADOS_ATIVO='false',
+    NPS_SNAPSHOT_ATIVO='false',
+    NPS_CACHE_ATIVO='false',
+    NPS_IDEMPOTENCIA_ATIVO='false',
+    NPS_INGESTAO_MODO='sincrono',
+    NPS_SAUDE_INTERVALO_S='3600'
+)
+# A sonda de saúde falha sem banco; o aviso não interessa aqui
+logging.getLogger('src.services.nps_saude').setLevel(logging.ERROR)
+
+from benchmarks.dados_sinteticos import gerar_envios, gerar_pesquisas
+from src.models.nps_pesquisa_simple import NPSPesquisaSimple, validar_pesquisas
+from src.services.nps_agregados import NPSAgregados
+from src.services.nps_snapshot import NPSSnapshot
+from src.services.nps_service_simple import nps_service_simple as servico
+
+try:
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+    from src.models.nps_pesquisa import NPSPesquisaModel
+except ImportError:
+    NPSPesquisaModel = None
+
+# Chamadas de obter_estatisticas por passada (o custo não depende do tamanho)
+CONSULTAS = 100
+
+# Duração mínima de uma passada: casos rápidos repetem a função até atingi-la
+PASSADA_MIN_S = 0.2
+
+# Diferença de memória abaixo disso é ruído do alocador, não regressão
+FOLGA_MEMORIA_KB = 64
+
+
+def _carregador(linhas):
+    """`carregar_pagina` sobre a lista em memória (ids 1..N em ordem)"""
+    def carregar_pagina(apos_id, limite):
+        return linhas[apos_id:apos_id + limite]
+    return carregar_pagina
+
+
+def _medir_tempo(executar, repeticoes):
+    """Menor duração de uma execução entre `repeticoes` passadas"""
+    inicio = time.perf_counter()
+    executar()
+    voltas = max(1, int(PASSADA_MIN_S / max(time.perf_counter() - inicio, 1e-9)))
+    
+    melhor = None
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        for _ in range(voltas):
+            executar()
+        duracao = (time.perf_counter() - inicio) / voltas
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor
+
+
+def _medir_pico(executar):
+    """Pico de memória alocada durante `executar`, acima do que já existia"""
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    executar()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return max(pico - antes, 0)
+
+
+def _casos_envios(envios):
+    """(caso, operações, função) sobre os corpos de POST"""
+    def validate():
+        for envio in envios:
+            NPSPesquisaSimple(**envio).validate()
+    
+    validados = []
+    for envio in envios:
+        pesquisa = NPSPesquisaSimple(**envio)
+        pesquisa.validate()
+        validados.append(pesquisa)
+    
+    def to_dict():
+        for pesquisa in validados:
+            pesquisa.to_dict()
+    
+    casos = [
+        ('NPSPesquisaSimple.validate', len(envios), validate),
+        ('NPSPesquisaSimple.to_dict', len(envios), to_dict),
+        ('validar_pesquisas', len(envios), lambda: validar_pesquisas(envios))
+    ]
+    
+    if NPSPesquisaModel is not None:
+        def modelo():
+            for envio in envios:
+                NPSPesquisaModel(**envio).to_dict()
+        casos.append(('NPSPesquisaModel', len(envios), modelo))
+    
+    return casos
+
+
+def _casos_linhas(linhas):
+    """(caso, operações, função) sobre as linhas gravadas"""
+    carregar_pagina = _carregador(linhas)
+    
+    def carga_snapshot():
+        NPSSnapshot(carregar_pagina).reconciliar()
+    
+    def carga_agregados():
+        NPSAgregados(carregar_pagina).reconciliar()
+    
+    snapshot = NPSSnapshot(carregar_pagina)
+    snapshot.reconciliar()
+    agregados = NPSAgregados(carregar_pagina)
+    agregados.reconciliar()
+    
+    def estatisticas(origem, filial):
+        esperado = sum(1 for linha in linhas if filial is None or linha['filial'] == filial)
+        
+        def executar():
+            servico.snapshot, servico.agregados = origem
+            for _ in range(CONSULTAS):
+                resposta = servico.obter_estatisticas(filial)
+            # Falha se a resposta não veio da origem em memória (ex.: caiu no banco)
+            if not resposta.success or resposta.data['total'] != esperado:
+                raise RuntimeError(f"Estatísticas divergentes: {resposta.to_dict()}")
+        return executar
+    
+    return [
+        ('NPSSnapshot.reconciliar', len(linhas), carga_snapshot),
+        ('NPSAgregados.reconciliar', len(linhas), carga_agregados),
+        ('obter_estatisticas[snapshot]', CONSULTAS, estatisticas((snapshot, None), None)),
+        ('obter_estatisticas[snapshot,filial]', CONSULTAS, estatisticas((snapshot, None), 'joinville')),
+        ('obter_estatisticas[agregados]', CONSULTAS, estatisticas((None, agregados), None))
+    ]
+
+
+def _medir_tamanho(tamanho, args):
+    resultados = []
+    for gerar, montar in ((gerar_envios, _casos_envios), (gerar_pesquisas, _casos_linhas)):
+        dados = gerar(tamanho)
+        for caso, operacoes, executar in montar(dados):
+            duracao = _medir_tempo(executar, args.repeticoes)
+            resultado = {
+                'caso': caso,
+                'tamanho': tamanho,
+                'operacoes': operacoes,
+                'total_ms': round(duracao * 1000, 2),
+                'us_por_op': round(duracao * 1e6 / operacoes, 3),
+                'pico_kb': None if args.sem_memoria else round(_medir_pico(executar) / 1024, 1)
+            }
+            pico = '-' if resultado['pico_kb'] is None else f"{resultado['pico_kb']:.0f}"
+            print(f"{caso:<38}{tamanho:>10}{resultado['total_ms']:>12.1f}{resultado['us_por_op']:>12.3f}{pico:>12}")
+            resultados.append(resultado)
+        del dados
+    return resultados
+
+
+def _chave(resultado):
+    return resultado['caso'], resultado['tamanho']
+
+
+def _comparar(resultados, base, tolerancia):
+    """Imprime a variação contra a base; retorna os casos que regrediram"""
+    anteriores = {_chave(r): r for r in base['resultados']}
+    regressoes = []
+    print(f"\ncomparação com a base (tolerância {tolerancia:.0%})")
+    print(f"{'caso':<38}{'tamanho':>10}{'µs/op':>12}{'Δ':>8}{'pico (KB)':>12}{'Δ':>8}  situação")
+    for resultado in resultados:
+        anterior = anteriores.get(_chave(resultado))
+        if anterior is None:
+            continue
+        delta_tempo = resultado['us_por_op'] / anterior['us_por_op'] - 1 if anterior['us_por_op'] else 0.0
+        regrediu = delta_tempo > tolerancia
+        
+        delta_pico = 0.0
+        if resultado['pico_kb'] is not None and anterior.get('pico_kb'):
+            delta_pico = resultado['pico_kb'] / anterior['pico_kb'] - 1
+            regrediu = regrediu or (delta_pico > tolerancia
+                                    and resultado['pico_kb'] - anterior['pico_kb'] > FOLGA_MEMORIA_KB)
+        if regrediu:
+            regressoes.append(resultado)
+        
+        pico = '-' if resultado['pico_kb'] is None else f"{resultado['pico_kb']:.0f}"
+        print(f"{resultado['caso']:<38}{resultado['tamanho']:>10}{resultado['us_por_op']:>12.3f}{delta_tempo:>+8.0%}"
+              f"{pico:>12}{delta_pico:>+8.0%}  {'REGRESSÃO' if regrediu else 'ok'}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', default='1000,100000,1000000', help='envios/linhas de cada rodada')
+    parser.add_argument('--repeticoes', type=int, default=3, help='passadas cronometradas (vale a melhor)')
+    parser.add_argument('--sem-memoria', action='store_true', help='não mede o pico de memória')
+    parser.add_argument('--saida', help='grava o relatório em JSON neste arquivo')
+    parser.add_argument('--comparar', help='relatório JSON de base para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='piora relativa aceita contra a base')
+    args = parser.parse_args()
+    
+    tamanhos = [int(t) for t in args.tamanhos.split(',')]
+    
+    if NPSPesquisaModel is None:
+        print("Pydantic não instalado: NPSPesquisaModel fica de fora")
+    print(f"{'caso':<38}{'tamanho':>10}{'total (ms)':>12}{'µs/op':>12}{'pico (KB)':>12}")
+    
+    resultados = []
+    for tamanho in tamanhos:
+        resultados.extend(_medir_tamanho(tamanho, args))
+    
+    relatorio = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'maquina': {'python': platform.python_version(), 'plataforma': platform.platform(), 'cpus': os.cpu_count()},
+        'parametros': {'tamanhos': tamanhos, 'repeticoes': args.repeticoes, 'consultas': CONSULTAS},
+        'resultados': resultados
+    }
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"\nrelatório gravado em {args.saida}")
+    
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            base = json.load(arquivo)
+        regressoes = _comparar(resultados, base, args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} caso(s) com regressão acima de {args.tolerancia:.0%}")
+            sys.exit(1)
+    
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark do frontend servido pelo app Flask: leitura do disco vs. manifesto em memória.
+
+Monta um `dist/` sintético no formato do Vite (index.html, assets/index-<hash>.js
+e .css) e mede, com o cliente de teste do Flask, a rota `serve()` anterior
+(`os.path.exists` + `send_from_directory` a cada requisição) e a atual
+(`ArquivosEstaticos`): requisições por segundo, bytes enviados e arquivos
+abertos por requisição (contados por um audit hook) para a página da pesquisa,
+uma rota da SPA, o bundle JS com `Accept-Encoding: gzip, br` e uma revalidação
+do bundle com `If-None-Match`.
+
+Uso:
+    python benchmarks/bench_estaticos.py --requisicoes 5000 --bundle-kb 400
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, send_from_directory
+
+from src.services.nps_estaticos import ArquivosEstaticos, brotli
+
+JS = 'assets/index-BpZ2ycW4.js'
+CSS = 'assets/index-Cx8f9aQ1.css'
+
+
+def _gerar_dist(diretorio, bundle_kb):
+    """index.html, bundle JS e CSS com texto parecido com o gerado pelo Vite"""
+    aleatorio = random.Random(42)
+    os.makedirs(os.path.join(diretorio, 'assets'))
+    with open(os.path.join(diretorio, 'index.html'), 'w') as arquivo:
+        arquivo.write(
+            '<!doctype html><html lang="pt-BR"><head><meta charset="UTF-8" />'
+            '<meta name="viewport" content="width=device-width, initial-scale=1.0" />'
+            f'<title>Pesquisa Digital Sat</title><script type="module" crossorigin src="/{JS}"></script>'
+            f'<link rel="stylesheet" crossorigin href="/{CSS}"></head><body><div id="root"></div></body></html>'
+        )
+    
+    nomes = ['useState', 'useEffect', 'jsx', 'className', 'filial', 'score', 'onClick', 'children', 'props']
+    partes, tamanho = [], 0
+    while tamanho < bundle_kb * 1024:
+        parte = (f'function {aleatorio.choice(nomes)}{aleatorio.randrange(10000)}(e,t){{return '
+                 f'e.{aleatorio.choice(nomes)}?t({aleatorio.randrange(1000)}):"{aleatorio.choice(nomes)}"}};')
+        partes.append(parte)
+        tamanho += len(parte)
+    with open(os.path.join(diretorio, JS), 'w') as arquivo:
+        arquivo.write(''.join(partes))
+    
+    with open(os.path.join(diretorio, CSS), 'w') as arquivo:
+        arquivo.write(''.join(f'.c{i}{{margin:{i % 16}px;color:#{i:06x}}}' for i in range(3000)))
+
+
+def _app_disco(diretorio):
+    """A rota `serve()` antes do manifesto: consulta o disco a cada requisição"""
+    app = Flask(__name__, static_folder=diretorio)
+    
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
+            return send_from_directory(app.static_folder, path)
+        if os.path.exists(os.path.join(app.static_folder, 'index.html')):
+            return send_from_directory(app.static_folder, 'index.html')
+        return jsonify({'message': 'API de Pesquisas Digital Sat'})
+    
+    return app
+
+
+def _medir(cliente, caminho, cabecalhos, requisicoes, contagem):
+    cliente.get(caminho, headers=cabecalhos).close()
+    contagem['aberturas'] = 0
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        # O corpo é lido, como faria o servidor ao enviá-lo
+        resposta = cliente.get(caminho, headers=cabecalhos)
+        corpo = resposta.get_data()
+        resposta.close()
+    duracao = time.perf_counter() - inicio
+    return requisicoes / duracao, len(corpo), contagem['aberturas'] / requisicoes, resposta.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requisicoes', type=int, default=5000, help='requisições por caso')
+    parser.add_argument('--bundle-kb', type=int, default=400, help='tamanho do bundle JS')
+    args = parser.parse_args()
+    
+    # Importado aqui: o app lê a configuração do ambiente
+    os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+    os.environ.setdefault('SUPABASE_KEY', 'chave-benchmark')
+    os.environ['NPS_AQUECIMENTO'] = 'false'
+    import src.main
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        _gerar_dist(diretorio, args.bundle_kb)
+        
+        inicio = time.perf_counter()
+        ArquivosEstaticos(diretorio)
+        print(f"manifesto montado em {(time.perf_counter() - inicio) * 1000:.0f} ms "
+              f"({'com' if brotli is not None else 'sem'} brotli)")
+        
+        src.main.app.static_folder = diretorio
+        apps = (('disco', _app_disco(diretorio)), ('memória', src.main.app))
+        casos = (
+            ('página da pesquisa (/)', '/', {}, False),
+            ('rota da SPA', '/pesquisa/joinville', {}, False),
+            ('bundle JS (gzip, br)', f'/{JS}', {'Accept-Encoding': 'gzip, br'}, False),
+            ('bundle JS revalidado', f'/{JS}', {'Accept-Encoding': 'gzip, br'}, True)
+        )
+        
+        contagem = {'aberturas': 0}
+        
+        def auditar(evento, _):
+            if evento in ('open', 'os.listdir', 'os.scandir'):
+                contagem['aberturas'] += 1
+        sys.addaudithook(auditar)
+        
+        print(f"{'caso':<26}{'rota serve()':<14}{'req/s':>10}{'bytes':>10}{'aberturas':>11}{'status':>8}")
+        for nome, caminho, cabecalhos, revalidar in casos:
+            for rotulo, app in apps:
+                cliente = app.test_client()
+                if revalidar:
+                    # Com o ETag que o próprio app enviou na primeira resposta
+                    etag = cliente.get(caminho, headers=cabecalhos).headers['ETag']
+                    cabecalhos = dict(cabecalhos, **{'If-None-Match': etag})
+                rps, tamanho, aberturas, status = _medir(cliente, caminho, cabecalhos, args.requisicoes, contagem)
+                print(f"{nome:<26}{rotulo:<14}{rps:>10.0f}{tamanho:>10}{aberturas:>11.1f}{status:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark e verificação das estatísticas NPS calculadas no banco.
+
+Compara o caminho antigo (baixar `select=*` com limite de 1000 linhas e
+contar em Python) com as contagens por categoria (HEAD com `count=exact`
+concorrentes, ou a função RPC `nps_contagens`) contra o PostgREST falso.
+Com mais de 1000 linhas o caminho antigo erra os totais; o script falha
+(código de saída 1) se as contagens não baterem com os dados gerados.
+Também compara o comparativo de filiais feito com uma chamada por filial
+com a leitura agrupada única de `contar_categorias_por_filial`.
+
+Uso:
+    python benchmarks/bench_estatisticas.py --linhas 5000 --atraso-ms 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dados_sinteticos import FILIAIS, gerar_pesquisas
+from benchmarks.fake_postgrest import FakePostgREST
+
+TABELA = 'nps_pesquisas'
+
+
+def _esperado(linhas, filial=None):
+    contagens = {'promotor': 0, 'neutro': 0, 'detrator': 0}
+    for linha in linhas:
+        if filial is None or linha['filial'] == filial:
+            contagens[linha['categoria_nps']] += 1
+    return contagens['promotor'], contagens['neutro'], contagens['detrator']
+
+
+def _medir(servidor, funcao, repeticoes):
+    bytes_antes = servidor.bytes_enviados
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    duracao_ms = (time.perf_counter() - inicio) * 1000 / repeticoes
+    return resultado, duracao_ms, (servidor.bytes_enviados - bytes_antes) // repeticoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=5000)
+    parser.add_argument('--atraso-ms', type=float, default=5.0, help='latência simulada por consulta')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    servidor = FakePostgREST(atraso_ms=args.atraso_ms).iniciar()
+    linhas = gerar_pesquisas(args.linhas)
+    servidor.inserir(TABELA, linhas)
+
+    os.environ['SUPABASE_URL'] = servidor.url
+    os.environ['SUPABASE_KEY'] = 'chave-benchmark'
+    os.environ['NPS_AGREGADOS_ATIVO'] = 'false'
+
+    from src.config import Config
+    from src.services.nps_service_simple import nps_service_simple as servico
+
+    def legado():
+        sucesso, resultado = servico.client.select(TABELA, {}, 1000)
+        promotores = len([p for p in resultado if p.get('categoria_nps') == 'promotor'])
+        detratores = len([p for p in resultado if p.get('categoria_nps') == 'detrator'])
+        return promotores, len(resultado) - promotores - detratores, detratores
+
+    def contagem():
+        return servico.contar_categorias()[1]
+
+    def contagem_rpc():
+        Config.NPS_ESTATISTICAS_RPC = 'nps_contagens'
+        try:
+            return servico.contar_categorias()[1]
+        finally:
+            Config.NPS_ESTATISTICAS_RPC = None
+
+    esperado = _esperado(linhas)
+    print(f"{args.linhas} linhas, esperado (promotores, neutros, detratores) = {esperado}")
+    print(f"{'caminho':<22}{'ms/consulta':>14}{'bytes':>10}  resultado")
+
+    falhou = False
+    for nome, funcao in (('select=* limit 1000', legado), ('count=exact (HEAD)', contagem), ('rpc nps_contagens', contagem_rpc)):
+        resultado, duracao_ms, tamanho = _medir(servidor, funcao, args.repeticoes)
+        correto = tuple(resultado) == esperado
+        if funcao is not legado and not correto:
+            falhou = True
+        print(f"{nome:<22}{duracao_ms:>14.2f}{tamanho:>10}  {resultado} {'ok' if correto else 'ERRADO'}")
+
+    # Filtro por filial também precisa bater
+    for filial in ('blumenau', 'lages'):
+        if servico.contar_categorias(filial)[1] != _esperado(linhas, filial):
+            print(f"contagem por filial incorreta: {filial}")
+            falhou = True
+
+    # Comparativo de filiais: uma chamada por filial vs. uma leitura agrupada
+    Config.NPS_ESTATISTICAS_RPC = 'nps_contagens'
+    print(f"{'comparativo filiais':<22}{'ms/consulta':>14}{'bytes':>10}")
+    por_filial, duracao_ms, tamanho = _medir(
+        servidor, lambda: {f: servico.contar_categorias(f)[1] for f in FILIAIS}, args.repeticoes
+    )
+    print(f"{'12 x rpc por filial':<22}{duracao_ms:>14.2f}{tamanho:>10}")
+    agrupado, duracao_ms, tamanho = _medir(servidor, lambda: servico.contar_categorias_por_filial()[1], args.repeticoes)
+    print(f"{'1 x rpc agrupada':<22}{duracao_ms:>14.2f}{tamanho:>10}")
+    Config.NPS_ESTATISTICAS_RPC = None
+    if agrupado != por_filial or any(agrupado[f] != _esperado(linhas, f) for f in FILIAIS):
+        print("comparativo de filiais incorreto")
+        falhou = True
+
+    servidor.shutdown()
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark da subida do app Flask (`src.main`) em interpretadores novos.
+
+Cada rodada inicia um processo Python que importa `src.main` e faz a primeira
+requisição (GET /api/nps/estatisticas) contra o PostgREST falso, em dois modos:
+
+- frio: NPS_AQUECIMENTO=false; o serviço e o cliente são criados na primeira
+  requisição, que paga também o import do cliente HTTP e as consultas;
+- aquecido: espera o aquecimento em segundo plano (pré-conexão do pool e carga
+  dos contadores) terminar antes da primeira requisição.
+
+Mostra a mediana do tempo total do processo até a resposta, do import do app e
+da primeira requisição, e de cada etapa do relatório de `GET /api/inicializacao`.
+A latência do PostgREST (`--atraso-ms`) não deve aparecer no import.
+
+Uso:
+    python benchmarks/bench_inicializacao.py --processos 10 --atraso-ms 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DIRETORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRETORIO)
+
+from benchmarks.dados_sinteticos import gerar_pesquisas
+from benchmarks.fake_postgrest import FakePostgREST
+
+# Executado em cada processo novo; imprime as medições em JSON
+PROCESSO = """
+import json, sys, time
+inicio = time.perf_counter()
+import src.main as main
+importado = time.perf_counter()
+if main._aquecimento is not None:
+    main._aquecimento.join()
+pronto = time.perf_counter()
+resposta = main.app.test_client().get('/api/nps/estatisticas')
+fim = time.perf_counter()
+print(json.dumps({
+    'import_ms': (importado - inicio) * 1000,
+    'primeira_ms': (fim - pronto) * 1000,
+    'status': resposta.status_code,
+    'numpy_no_import': 'numpy' in sys.modules,
+    'etapas': main.inicializacao.dados()['etapas']
+}))
+"""
+
+
+def _rodada(ambiente):
+    inicio = time.perf_counter()
+    saida = subprocess.run([sys.executable, '-c', PROCESSO], cwd=DIRETORIO, env=ambiente,
+                           capture_output=True, text=True, check=True).stdout
+    resultado = json.loads(saida.strip().splitlines()[-1])
+    resultado['processo_ms'] = (time.perf_counter() - inicio) * 1000
+    if resultado['status'] != 200:
+        raise RuntimeError(f"Primeira requisição falhou: {resultado['status']}")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processos', type=int, default=10, help='processos por modo')
+    parser.add_argument('--linhas', type=int, default=10000, help='pesquisas já gravadas')
+    parser.add_argument('--atraso-ms', type=float, default=20.0, help='latência simulada do PostgREST')
+    args = parser.parse_args()
+    
+    servidor = FakePostgREST(atraso_ms=args.atraso_ms).iniciar()
+    servidor.inserir('nps_pesquisas', gerar_pesquisas(args.linhas))
+    base = dict(os.environ, SUPABASE_URL=servidor.url, SUPABASE_KEY='chave-benchmark', NPS_SAUDE_INTERVALO_S='3600')
+    
+    print(f"{args.processos} processos por modo, {args.linhas} linhas, PostgREST +{args.atraso_ms:.0f} ms (medianas em ms)")
+    for modo, aquecimento in (('frio', 'false'), ('aquecido', 'true')):
+        rodadas = [_rodada(dict(base, NPS_AQUECIMENTO=aquecimento)) for _ in range(args.processos)]
+        
+        print(f"\n{modo}")
+        for chave, rotulo in (('processo_ms', 'processo até a resposta'), ('import_ms', 'import do app'),
+                              ('primeira_ms', 'primeira requisição')):
+            print(f"  {rotulo:<28}{statistics.median(r[chave] for r in rodadas):>10.1f}")
+        
+        duracoes = {}
+        for rodada in rodadas:
+            for etapa in rodada['etapas']:
+                duracoes.setdefault((etapa['tipo'], etapa['etapa']), []).append(etapa['duracao_ms'])
+        for (tipo, etapa), valores in duracoes.items():
+            print(f"  {etapa + ' (' + tipo + ')':<28}{statistics.median(valores):>10.1f}")
+        if any(r['numpy_no_import'] for r in rodadas):
+            print("  numpy carregado na subida")
+    
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
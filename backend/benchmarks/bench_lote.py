@@ -0,0 +1,69 @@
+"""
+Benchmark da sincronização de um coletor offline.
+
+Compara o reenvio de N pesquisas como N chamadas `POST /api/nps` com uma
+única chamada `POST /api/nps/lote`, contra o PostgREST falso com latência
+simulada por requisição.
+
+Uso:
+    python benchmarks/bench_lote.py --pesquisas 500 --atraso-ms 20 --bloco 500
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_postgrest import FakePostgREST
+from benchmarks.dados_sinteticos import gerar_pesquisas
+
+TABELA = 'nps_pesquisas'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pesquisas', type=int, default=500)
+    parser.add_argument('--atraso-ms', type=float, default=20.0, help='latência simulada do PostgREST')
+    parser.add_argument('--bloco', type=int, default=500, help='linhas por bulk insert (NPS_LOTE_BLOCO)')
+    args = parser.parse_args()
+    
+    servidor = FakePostgREST(atraso_ms=args.atraso_ms).iniciar()
+    os.environ.update(
+        SUPABASE_URL=servidor.url,
+        SUPABASE_KEY='chave-benchmark',
+        NPS_INGESTAO_MODO='sincrono',
+        NPS_LOTE_BLOCO=str(args.bloco),
+        NPS_LOTE_MAX_ITENS=str(max(args.pesquisas, 1))
+    )
+    
+    from src.main import app
+    
+    cliente = app.test_client()
+    pesquisas = [
+        {'filial': linha['filial'], 'score': linha['score'], 'timestamp': linha['timestamp']}
+        for linha in gerar_pesquisas(args.pesquisas)
+    ]
+    
+    inicio = time.perf_counter()
+    for pesquisa in pesquisas:
+        assert cliente.post('/api/nps', json=pesquisa).status_code == 201
+    individual = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    resposta = cliente.post('/api/nps/lote', json=pesquisas)
+    lote = time.perf_counter() - inicio
+    assert resposta.status_code == 201, resposta.get_json()
+    
+    blocos = -(-args.pesquisas // args.bloco)
+    print(f"{args.pesquisas} pesquisas, PostgREST +{args.atraso_ms:.0f} ms por requisição")
+    print(f"{'modo':<24}{'tempo (ms)':>12}{'idas ao banco':>15}")
+    print(f"{'POST /api/nps (cada)':<24}{individual * 1000:>12.0f}{args.pesquisas:>15}")
+    print(f"{'POST /api/nps/lote':<24}{lote * 1000:>12.0f}{blocos:>15}")
+    print(f"ganho: {individual / lote:.1f}x; linhas gravadas: {len(servidor.tabelas[TABELA])}")
+    
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
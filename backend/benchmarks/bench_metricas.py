@@ -0,0 +1,93 @@
+"""
+Benchmark do custo de registrar métricas no caminho da requisição.
+
+Mede o tempo por chamada de `NPSMetricas.registrar_requisicao` (histograma
+de duração + histograma de tamanho) com 1 e N threads gravando ao mesmo
+tempo, comparado a um registro equivalente protegido por um único lock
+global, e o custo de uma coleta (`texto()`) com as séries resultantes.
+
+Uso:
+    python benchmarks/bench_metricas.py --chamadas 200000 --threads 8
+"""
+import argparse
+import bisect
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.nps_metricas import NPSMetricas, HISTOGRAMA, BUCKETS_BYTES
+
+ROTAS = ['/api/nps', '/api/nps/estatisticas', '/api/nps/lote', '/api/nps/health']
+
+
+class MetricasComLock:
+    """Referência: o mesmo registro num dicionário único protegido por lock"""
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+    
+    def observar(self, nome, valor, rotulos):
+        chave = (nome, rotulos)
+        with self.lock:
+            serie = self.series.get(chave)
+            if serie is None:
+                serie = self.series[chave] = [0] * (len(self.buckets) + 3)
+            serie[bisect.bisect_left(self.buckets, valor)] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+    
+    def registrar_requisicao(self, rota, metodo, status, duracao, tamanho):
+        self.observar('duracao', duracao, (('rota', rota), ('metodo', metodo), ('status', str(status))))
+        if tamanho:
+            self.observar('tamanho', tamanho, (('rota', rota), ('metodo', metodo)))
+
+
+def _medir(registrar, chamadas, threads):
+    por_thread = chamadas // threads
+    
+    def gravar(deslocamento):
+        for i in range(por_thread):
+            registrar(ROTAS[(i + deslocamento) & 3], 'GET', 200, (i % 100) / 1000.0, 200)
+    
+    trabalhadores = [threading.Thread(target=gravar, args=(i,)) for i in range(threads)]
+    inicio = time.perf_counter()
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    return (time.perf_counter() - inicio) / (por_thread * threads) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chamadas', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    
+    print(f"{args.chamadas} chamadas de registrar_requisicao")
+    print(f"{'implementação':<28}{'threads':>8}{'ns/chamada':>12}")
+    for threads in (1, args.threads):
+        metricas = NPSMetricas()
+        metricas.definir('nps_http_request_duration_seconds', HISTOGRAMA, '')
+        metricas.definir('nps_http_request_size_bytes', HISTOGRAMA, '', BUCKETS_BYTES)
+        com_lock = MetricasComLock(BUCKETS_BYTES)
+        
+        print(f"{'fragmento por thread':<28}{threads:>8}{_medir(metricas.registrar_requisicao, args.chamadas, threads):>12.0f}")
+        print(f"{'lock global':<28}{threads:>8}{_medir(com_lock.registrar_requisicao, args.chamadas, threads):>12.0f}")
+        
+        inicio = time.perf_counter()
+        texto = metricas.texto()
+        print(f"coleta: {(time.perf_counter() - inicio) * 1000:.2f} ms, {len(texto.splitlines())} linhas")
+    
+    desativadas = NPSMetricas(ativo=False)
+    desativadas.definir('nps_http_request_duration_seconds', HISTOGRAMA, '')
+    print(f"{'desativadas':<28}{1:>8}{_medir(desativadas.registrar_requisicao, args.chamadas, 1):>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark do transporte HTTP do SimpleSupabaseClient.
+
+Compara uma conexão nova por requisição (`requests.post`/`requests.get` de
+módulo, comportamento anterior) com a sessão keep-alive do cliente, contra
+o PostgREST falso com custo de handshake simulado.
+
+Uso:
+    python benchmarks/bench_pool.py --requisicoes 200 --threads 4 --atraso-conexao-ms 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from benchmarks.fake_postgrest import FakePostgREST
+
+TABELA = 'nps_pesquisas'
+PESQUISA = {'filial': 'blumenau', 'score': 9, 'categoria_nps': 'promotor'}
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(int(round(p / 100.0 * (len(ordenados) - 1))), len(ordenados) - 1)
+    return ordenados[indice]
+
+
+def _medir(funcao, requisicoes, threads):
+    latencias = []
+
+    def chamada(_):
+        inicio = time.perf_counter()
+        funcao()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(chamada, range(requisicoes)))
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'req_s': round(requisicoes / duracao, 1),
+        'p50_ms': round(statistics.median(latencias), 2),
+        'p95_ms': round(_percentil(latencias, 95), 2),
+        'p99_ms': round(_percentil(latencias, 99), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requisicoes', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--atraso-conexao-ms', type=float, default=20.0,
+                        help='custo simulado do handshake TCP+TLS por conexão nova')
+    args = parser.parse_args()
+
+    servidor = FakePostgREST(atraso_conexao_ms=args.atraso_conexao_ms).iniciar()
+    os.environ['SUPABASE_URL'] = servidor.url
+    os.environ['SUPABASE_KEY'] = 'chave-benchmark'
+
+    from src.database.supabase_client_simple import SimpleSupabaseClient
+
+    cliente = SimpleSupabaseClient(pool_size=args.threads)
+    url = f"{servidor.url}/rest/v1/{TABELA}"
+
+    def sem_pool():
+        requests.post(url, json=PESQUISA, headers=cliente.headers, timeout=10)
+        requests.get(url, params={'limit': 1}, headers=cliente.headers, timeout=10)
+
+    def com_pool():
+        cliente.insert(TABELA, PESQUISA)
+        cliente.select(TABELA, limit=1)
+
+    conexoes_antes = servidor.conexoes
+    resultado_sem_pool = _medir(sem_pool, args.requisicoes, args.threads)
+    resultado_sem_pool['conexoes'] = servidor.conexoes - conexoes_antes
+
+    conexoes_antes = servidor.conexoes
+    resultado_com_pool = _medir(com_pool, args.requisicoes, args.threads)
+    resultado_com_pool['conexoes'] = servidor.conexoes - conexoes_antes
+
+    print(f"{'modo':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'conexões':>10}")
+    for nome, r in (('sem pool', resultado_sem_pool), ('com pool', resultado_com_pool)):
+        print(f"{nome:<12}{r['req_s']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['conexoes']:>10}")
+    print(f"contadores do pool: {cliente.pool_stats()}")
+
+    cliente.close()
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
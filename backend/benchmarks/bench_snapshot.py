@@ -0,0 +1,96 @@
+"""
+Benchmark de memória e tempo de consulta do snapshot colunar de pesquisas.
+
+Compara a representação usada hoje nas consultas analíticas (lista de
+dicionários, como retornada pelo PostgREST) com o `NPSSnapshot` (filial uint8,
+score e categoria int8, timestamp int64): bytes por linha medidos com
+tracemalloc e tempo das estatísticas total, por filial e de todas as filiais.
+O script falha (código de saída 1) se as contagens divergirem.
+
+Uso:
+    python benchmarks/bench_snapshot.py --linhas 1000000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dados_sinteticos import FILIAIS, gerar_pesquisas
+from src.services.nps_snapshot import NPSSnapshot
+
+
+def _contagens_dicts(linhas, filial=None):
+    """Contagem por categoria como em `obter_estatisticas` sobre dicionários"""
+    if filial:
+        linhas = [p for p in linhas if p['filial'] == filial]
+    promotores = len([p for p in linhas if p['categoria_nps'] == 'promotor'])
+    detratores = len([p for p in linhas if p['categoria_nps'] == 'detrator'])
+    return promotores, len(linhas) - promotores - detratores, detratores
+
+
+def _medir_memoria(construir):
+    gc.collect()
+    tracemalloc.start()
+    objeto = construir()
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objeto, memoria
+
+
+def _medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return resultado, (time.perf_counter() - inicio) * 1000 / repeticoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1000000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    # Linhas com as colunas que o PostgREST devolve para as consultas analíticas
+    linhas, memoria_dicts = _medir_memoria(lambda: [
+        {'id': l['id'], 'filial': l['filial'], 'score': l['score'],
+         'categoria_nps': l['categoria_nps'], 'timestamp': l['timestamp']}
+        for l in gerar_pesquisas(args.linhas)
+    ])
+
+    def construir_snapshot():
+        snapshot = NPSSnapshot(lambda apos_id, limite: linhas[apos_id:apos_id + limite], tamanho_pagina=50000)
+        snapshot.reconciliar()
+        return snapshot
+
+    # A página de origem aponta para `linhas`, que já existe: só o snapshot é medido
+    snapshot, memoria_snapshot = _medir_memoria(construir_snapshot)
+    print(f"{args.linhas} linhas")
+    print(f"  dicionários: {memoria_dicts / args.linhas:8.1f} bytes/linha")
+    print(f"  snapshot:    {memoria_snapshot / args.linhas:8.1f} bytes/linha "
+          f"({memoria_dicts / memoria_snapshot:.0f}x menor; {snapshot.estatisticas()['bytes']} bytes nas colunas)")
+
+    print(f"{'consulta':<22}{'dicionários (ms)':>18}{'snapshot (ms)':>16}")
+    falhou = False
+    consultas = (
+        ('total', lambda: _contagens_dicts(linhas), snapshot.contagens),
+        ('filial', lambda: _contagens_dicts(linhas, 'lages'), lambda: snapshot.contagens('lages')),
+        ('todas as filiais',
+         lambda: {f: _contagens_dicts(linhas, f) for f in FILIAIS},
+         snapshot.contagens_por_filial),
+    )
+    for nome, dicts, colunar in consultas:
+        esperado, dicts_ms = _medir(dicts, 1)
+        resultado, snapshot_ms = _medir(colunar, args.repeticoes)
+        correto = resultado == esperado
+        falhou = falhou or not correto
+        print(f"{nome:<22}{dicts_ms:>18.1f}{snapshot_ms:>16.2f}  {'ok' if correto else 'ERRADO'}")
+
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark do cálculo de tendência NPS por período.
+
+Compara o laço por linha sobre dicionários (como se faz hoje, exportando e
+agrupando à mão) com a passada vetorizada de `calcular_tendencia` sobre
+arrays colunares (timestamp int64, score int8), separando o custo de montar
+os arrays do custo do cálculo. O script falha (código de saída 1) se os dois
+caminhos divergirem em alguma granularidade.
+
+Uso:
+    python benchmarks/bench_tendencia.py --linhas 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dados_sinteticos import gerar_pesquisas
+from src.models.nps_pesquisa_simple import montar_estatisticas
+from src.services.nps_tendencia import GRANULARIDADES, calcular_tendencia, timestamps_epoch
+
+
+def tendencia_por_linha(linhas, granularidade):
+    """Agrupamento de referência, linha a linha"""
+    contagens = {}
+    for linha in linhas:
+        data = datetime.fromisoformat(linha['timestamp']).date()
+        if granularidade == 'semana':
+            data = data - timedelta(days=data.weekday())
+        elif granularidade == 'mes':
+            data = data.replace(day=1)
+        contador = contagens.setdefault(data, [0, 0, 0])
+        if linha['score'] >= 9:
+            contador[0] += 1
+        elif linha['score'] >= 7:
+            contador[1] += 1
+        else:
+            contador[2] += 1
+    return [
+        {'periodo': data.isoformat(), **montar_estatisticas(*contagens[data])}
+        for data in sorted(contagens)
+    ]
+
+
+def montar_colunas(linhas):
+    timestamps = timestamps_epoch(linha['timestamp'] for linha in linhas)
+    scores = np.fromiter((linha['score'] for linha in linhas), dtype=np.int8, count=len(linhas))
+    return timestamps, scores
+
+
+def _medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return resultado, (time.perf_counter() - inicio) * 1000 / repeticoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1000000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    linhas = gerar_pesquisas(args.linhas)
+    (timestamps, scores), montagem_ms = _medir(lambda: montar_colunas(linhas), 1)
+    print(f"{args.linhas} linhas; montagem dos arrays colunares: {montagem_ms:.1f} ms "
+          f"({timestamps.nbytes + scores.nbytes} bytes)")
+    print(f"{'granularidade':<15}{'períodos':>10}{'por linha (ms)':>17}{'vetorizado (ms)':>18}{'ganho':>8}")
+
+    falhou = False
+    for granularidade in GRANULARIDADES:
+        esperado, linha_ms = _medir(lambda: tendencia_por_linha(linhas, granularidade), 1)
+        resultado, vetor_ms = _medir(lambda: calcular_tendencia(timestamps, scores, granularidade), args.repeticoes)
+        correto = resultado == esperado
+        falhou = falhou or not correto
+        print(f"{granularidade:<15}{len(resultado):>10}{linha_ms:>17.1f}{vetor_ms:>18.1f}"
+              f"{linha_ms / vetor_ms:>7.0f}x  {'ok' if correto else 'ERRADO'}")
+
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == '__main__':
+    main()
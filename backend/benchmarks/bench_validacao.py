@@ -0,0 +1,301 @@
+"""
+Micro-benchmark da validação de pesquisas NPS (custo de CPU por envio).
+
+Mede validate() + to_dict() de `NPSPesquisaSimple` e construção + to_dict()
+de `NPSPesquisaModel` (Pydantic), antes (cópias das implementações
+anteriores, abaixo) e depois (padrões compilados, `__slots__`, normalização
+única), além da API em lote `validar_pesquisas`. Os payloads misturam
+pesquisas completas, mínimas e inválidas. O script falha (código de saída 1)
+se as implementações divergirem em algum resultado.
+
+Uso:
+    python benchmarks/bench_validacao.py --payloads 20000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import warnings
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dados_sinteticos import FILIAIS
+from src.models.nps_pesquisa_simple import NPSPesquisaSimple, categorizar_score, validar_pesquisas
+
+try:
+    from pydantic import BaseModel, Field, validator
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+    from src.models.nps_pesquisa import NPSPesquisaModel
+except ImportError:
+    BaseModel = None
+
+
+class PesquisaSimpleAnterior:
+    """Cópia de NPSPesquisaSimple antes dos padrões compilados e de __slots__"""
+    
+    def __init__(self, **kwargs):
+        self.filial = kwargs.get('filial', '')
+        self.score = kwargs.get('score')
+        self.nome = kwargs.get('nome', '')
+        self.email = kwargs.get('email', '')
+        self.telefone = kwargs.get('telefone', '')
+        self.cnpj = kwargs.get('cnpj', '')
+        self.comentario = kwargs.get('comentario', '')
+        self.timestamp = kwargs.get('timestamp')
+    
+    def validate(self) -> tuple[bool, str]:
+        """Valida os dados da pesquisa"""
+        
+        # Validar campos obrigatórios
+        if not self.filial or not self.filial.strip():
+            return False, "Filial é obrigatória"
+        
+        if self.score is None:
+            return False, "Score é obrigatório"
+        
+        try:
+            score_int = int(self.score)
+            if score_int < 0 or score_int > 10:
+                return False, "Score deve estar entre 0 e 10"
+            self.score = score_int
+        except (ValueError, TypeError):
+            return False, "Score deve ser um número entre 0 e 10"
+        
+        # Validar email se fornecido
+        if self.email and self.email.strip():
+            email_pattern = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
+            if not re.match(email_pattern, self.email):
+                return False, "Email inválido"
+        
+        # Validar CNPJ se fornecido
+        if self.cnpj and self.cnpj.strip():
+            cnpj_clean = re.sub(r'[^\d]', '', self.cnpj)
+            if len(cnpj_clean) != 14:
+                return False, "CNPJ deve ter 14 dígitos"
+        
+        # Validar telefone se fornecido
+        if self.telefone and self.telefone.strip():
+            tel_clean = re.sub(r'[^\d]', '', self.telefone)
+            if len(tel_clean) < 10 or len(tel_clean) > 11:
+                return False, "Telefone deve ter 10 ou 11 dígitos"
+        
+        # Validar tamanhos
+        if len(self.filial) > 50:
+            return False, "Filial deve ter no máximo 50 caracteres"
+        
+        if self.nome and len(self.nome) > 100:
+            return False, "Nome deve ter no máximo 100 caracteres"
+        
+        if self.email and len(self.email) > 100:
+            return False, "Email deve ter no máximo 100 caracteres"
+        
+        if self.comentario and len(self.comentario) > 500:
+            return False, "Comentário deve ter no máximo 500 caracteres"
+        
+        return True, "Dados válidos"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte o modelo para dicionário para inserção no banco"""
+        
+        # Adiciona timestamp se não existir
+        if not self.timestamp:
+            self.timestamp = datetime.utcnow().isoformat()
+        
+        # Determina categoria NPS
+        categoria_nps = categorizar_score(self.score)
+        
+        data = {
+            'filial': self.filial.strip(),
+            'score': self.score,
+            'categoria_nps': categoria_nps,
+            'timestamp': self.timestamp
+        }
+        
+        # Adicionar campos opcionais apenas se não estiverem vazios
+        if self.nome and self.nome.strip():
+            data['nome'] = self.nome.strip()
+        
+        if self.email and self.email.strip():
+            data['email'] = self.email.strip()
+        
+        if self.telefone and self.telefone.strip():
+            data['telefone'] = self.telefone.strip()
+        
+        if self.cnpj and self.cnpj.strip():
+            data['cnpj'] = self.cnpj.strip()
+        
+        if self.comentario and self.comentario.strip():
+            data['comentario'] = self.comentario.strip()
+        
+        return data
+
+
+if BaseModel is not None:
+    class PesquisaModelAnterior(BaseModel):
+        """Cópia de NPSPesquisaModel antes dos padrões compilados"""
+        
+        # Campos obrigatórios
+        filial: str = Field(..., min_length=1, max_length=50)
+        score: int = Field(..., ge=0, le=10)
+        
+        # Campos opcionais
+        nome: Optional[str] = Field(None, max_length=100)
+        email: Optional[str] = Field(None, max_length=100)
+        telefone: Optional[str] = Field(None, max_length=20)
+        cnpj: Optional[str] = Field(None, max_length=20)
+        comentario: Optional[str] = Field(None, max_length=500)
+        
+        # Campos automáticos
+        timestamp: Optional[datetime] = None
+        
+        @validator('email')
+        def validate_email(cls, v):
+            if v and v.strip():
+                email_pattern = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
+                if not re.match(email_pattern, v):
+                    raise ValueError('Email inválido')
+            return v
+        
+        @validator('cnpj')
+        def validate_cnpj(cls, v):
+            if v and v.strip():
+                # Remove caracteres especiais
+                cnpj_clean = re.sub(r'[^\d]', '', v)
+                if len(cnpj_clean) != 14:
+                    raise ValueError('CNPJ deve ter 14 dígitos')
+            return v
+        
+        @validator('telefone')
+        def validate_telefone(cls, v):
+            if v and v.strip():
+                # Remove caracteres especiais
+                tel_clean = re.sub(r'[^\d]', '', v)
+                if len(tel_clean) < 10 or len(tel_clean) > 11:
+                    raise ValueError('Telefone deve ter 10 ou 11 dígitos')
+            return v
+        
+        def to_dict(self) -> Dict[str, Any]:
+            """Converte o modelo para dicionário para inserção no banco"""
+            data = self.dict(exclude_none=True)
+            
+            # Adiciona timestamp se não existir
+            if 'timestamp' not in data or data['timestamp'] is None:
+                data['timestamp'] = datetime.utcnow().isoformat()
+            
+            # Determina categoria NPS
+            if self.score >= 9:
+                data['categoria_nps'] = 'promotor'
+            elif self.score >= 7:
+                data['categoria_nps'] = 'neutro'
+            else:
+                data['categoria_nps'] = 'detrator'
+            
+            return data
+
+
+def gerar_payloads(quantidade, semente=7):
+    """Pesquisas completas, mínimas e com erros de validação"""
+    aleatorio = random.Random(semente)
+    payloads = []
+    for indice in range(quantidade):
+        payload = {'filial': aleatorio.choice(FILIAIS), 'score': aleatorio.randint(0, 10)}
+        tipo = indice % 10
+        if tipo < 5:
+            payload.update({
+                'nome': f'  Cliente {indice} ',
+                'email': f'cliente{indice}@exemplo.com.br',
+                'telefone': '(47) 99999-%04d' % (indice % 10000),
+                'cnpj': '12.345.678/0001-%02d' % (indice % 100),
+                'comentario': ' Atendimento muito bom, voltarei a comprar. ' * 3,
+                'timestamp': '2025-01-15T10:00:00'
+            })
+        elif tipo == 7:
+            payload['email'] = 'email-invalido'
+        elif tipo == 8:
+            payload['score'] = 11
+        elif tipo == 9:
+            payload['telefone'] = '123'
+        payloads.append(payload)
+    return payloads
+
+
+def _sem_timestamp(linha):
+    return {chave: valor for chave, valor in linha.items() if chave != 'timestamp'}
+
+
+def _simple(modelo):
+    def validar(payload):
+        pesquisa = modelo(**payload)
+        valido, mensagem = pesquisa.validate()
+        return pesquisa.to_dict() if valido else mensagem
+    return validar
+
+
+def _pydantic(modelo):
+    def validar(payload):
+        try:
+            return modelo(**payload).to_dict()
+        except ValueError:
+            return None
+    return validar
+
+
+def _comparavel(resultado):
+    return _sem_timestamp(resultado) if isinstance(resultado, dict) else resultado
+
+
+def _medir(funcao, payloads, repeticoes=3):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(payloads)
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor * 1e6 / len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payloads', type=int, default=20000)
+    args = parser.parse_args()
+    
+    payloads = gerar_payloads(args.payloads)
+    
+    implementacoes = [
+        ('NPSPesquisaSimple', _simple(PesquisaSimpleAnterior), _simple(NPSPesquisaSimple)),
+    ]
+    if BaseModel is not None:
+        implementacoes.append(('NPSPesquisaModel', _pydantic(PesquisaModelAnterior), _pydantic(NPSPesquisaModel)))
+    
+    divergencias = 0
+    lote = validar_pesquisas(payloads)
+    for indice, payload in enumerate(payloads):
+        for _, antes, depois in implementacoes:
+            if _comparavel(antes(payload)) != _comparavel(depois(payload)):
+                divergencias += 1
+        linha, erro = lote[indice]
+        if _comparavel(linha if erro is None else erro) != _comparavel(implementacoes[0][1](payload)):
+            divergencias += 1
+    
+    casos = []
+    for modelo, antes, depois in implementacoes:
+        casos.append((modelo, 'antes', lambda ps, f=antes: [f(p) for p in ps]))
+        casos.append((modelo, 'depois', lambda ps, f=depois: [f(p) for p in ps]))
+        if modelo == 'NPSPesquisaSimple':
+            casos.append(('validar_pesquisas', 'lote', validar_pesquisas))
+    
+    print(f"{args.payloads} payloads (50% completos, 20% mínimos, 30% inválidos)")
+    print(f"{'modelo':<20}{'versão':<10}{'µs/envio':>10}")
+    for modelo, versao, funcao in casos:
+        print(f"{modelo:<20}{versao:<10}{_medir(funcao, payloads):>10.2f}")
+    print(f"divergências: {divergencias}")
+    
+    sys.exit(1 if divergencias else 0)
+
+
+if __name__ == '__main__':
+    main()
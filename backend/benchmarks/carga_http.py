@@ -0,0 +1,98 @@
+"""
+Gerador de carga HTTP/1.1 compartilhado pelos benchmarks de servidor.
+
+Cliente mínimo sobre asyncio com conexões keep-alive: o custo de CPU do
+gerador fica desprezível perto do servidor medido (os servidores medidos
+respondem sempre com Content-Length).
+"""
+import asyncio
+import json
+import socket
+import time
+
+import httpx
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def aguardar(url, tempo_max=20.0, processo=None):
+    """Espera o servidor responder em `url`; falha se `processo` terminar antes"""
+    limite = time.monotonic() + tempo_max
+    while time.monotonic() < limite:
+        if processo is not None and processo.poll() is not None:
+            raise RuntimeError(f"Servidor encerrou ao iniciar (código {processo.returncode}): {url}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Servidor não respondeu: {url}")
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(int(round(p / 100.0 * (len(ordenados) - 1))), len(ordenados) - 1)]
+
+
+def requisicao_http(metodo, caminho, corpo=None):
+    """Bytes de uma requisição HTTP/1.1 (corpo serializado como JSON)"""
+    linhas = [f'{metodo} {caminho} HTTP/1.1', 'Host: bench']
+    dados = b''
+    if corpo is not None:
+        dados = json.dumps(corpo).encode()
+        linhas += ['Content-Type: application/json', f'Content-Length: {len(dados)}']
+    return ('\r\n'.join(linhas) + '\r\n\r\n').encode() + dados
+
+
+async def conexao_http(porta, requisicao, quantidade, latencias):
+    """Envia requisições em sequência numa conexão keep-alive; retorna o número de erros"""
+    erros = 0
+    leitor = escritor = None
+    for _ in range(quantidade):
+        inicio = time.perf_counter()
+        try:
+            if escritor is None:
+                leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+            escritor.write(requisicao)
+            cabecalho = (await leitor.readuntil(b'\r\n\r\n')).decode('latin-1').lower()
+            status = int(cabecalho.split(' ', 2)[1])
+            tamanho = 0
+            for linha in cabecalho.split('\r\n'):
+                if linha.startswith('content-length:'):
+                    tamanho = int(linha.split(':', 1)[1])
+            await leitor.readexactly(tamanho)
+            if 'connection: close' in cabecalho:
+                escritor.close()
+                escritor = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status = 599
+            if escritor is not None:
+                escritor.close()
+            escritor = None
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if status >= 400:
+            erros += 1
+    if escritor is not None:
+        escritor.close()
+    return erros
+
+
+async def carga(porta, requisicao, requisicoes, concorrencia):
+    """Dispara `requisicoes` em `concorrencia` conexões simultâneas
+    
+    Retorna (req/s, latências em ms, erros).
+    """
+    latencias = []
+    por_conexao = [requisicoes // concorrencia + (1 if i < requisicoes % concorrencia else 0) for i in range(concorrencia)]
+    
+    inicio = time.perf_counter()
+    erros = await asyncio.gather(*(
+        conexao_http(porta, requisicao, quantidade, latencias) for quantidade in por_conexao if quantidade
+    ))
+    duracao = time.perf_counter() - inicio
+    
+    return requisicoes / duracao, latencias, sum(erros)
@@ -0,0 +1,102 @@
+"""
+Gerador determinístico de pesquisas NPS sintéticas para benchmarks.
+
+A mesma semente sempre gera as mesmas linhas, no formato gravado em
+`nps_pesquisas` (com `id`, `categoria_nps` e `timestamp`), ou os mesmos
+corpos de `POST /api/nps`, no formato enviado pelo formulário.
+"""
+import random
+from datetime import datetime, timedelta
+
+from src.models.nps_pesquisa_simple import categorizar_score
+
+FILIAIS = [
+    'balneario-camboriu', 'blumenau', 'brusque', 'centro-distribuicao',
+    'gravatai', 'itajai', 'itapema', 'joinville', 'lages', 'rio-do-sul',
+    'sao-jose', 'tubarao'
+]
+
+# Filiais maiores respondem mais pesquisas
+PESOS_FILIAIS = [6, 14, 7, 2, 4, 10, 5, 16, 6, 5, 13, 12]
+
+# Distribuição assimétrica típica de NPS: concentrada em 8-10, cauda em 0-3
+PESOS_SCORES = [4, 1, 1, 2, 2, 4, 5, 9, 17, 22, 33]
+
+INICIO = datetime(2025, 1, 1)
+
+# Fração dos envios do formulário que preenchem cada campo opcional
+TAXAS_OPCIONAIS = {'nome': 0.7, 'email': 0.45, 'telefone': 0.4, 'cnpj': 0.12, 'comentario': 0.3}
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Pereira', 'Costa', 'Schmitt', 'Koch', 'Müller']
+COMENTARIOS = [
+    'Atendimento rápido', 'Demorou para ser atendido', 'Equipe muito atenciosa',
+    'Faltou produto no estoque', 'Preço justo e boa variedade', 'Entrega atrasou dois dias',
+    'Vendedor explicou tudo com paciência', 'Fila grande no caixa'
+]
+
+
+def gerar_pesquisas(quantidade: int, semente: int = 42, dias: int = 365):
+    """Gera `quantidade` pesquisas em ordem crescente de timestamp"""
+    aleatorio = random.Random(semente)
+    filiais = aleatorio.choices(FILIAIS, weights=PESOS_FILIAIS, k=quantidade)
+    scores = aleatorio.choices(range(11), weights=PESOS_SCORES, k=quantidade)
+    passo = dias * 86400 / max(quantidade, 1)
+
+    linhas = []
+    for indice in range(quantidade):
+        score = scores[indice]
+        linhas.append({
+            'id': indice + 1,
+            'filial': filiais[indice],
+            'score': score,
+            'categoria_nps': categorizar_score(score),
+            'timestamp': (INICIO + timedelta(seconds=int(indice * passo))).isoformat()
+        })
+    return linhas
+
+
+def _telefone(aleatorio: random.Random) -> str:
+    ddd = aleatorio.choice(['47', '48', '49', '51'])
+    numero = f'9{aleatorio.randrange(10 ** 8):08d}'
+    # Metade com máscara, metade só dígitos
+    if aleatorio.random() < 0.5:
+        return f'({ddd}) {numero[:5]}-{numero[5:]}'
+    return ddd + numero
+
+
+def _cnpj(aleatorio: random.Random) -> str:
+    digitos = f'{aleatorio.randrange(10 ** 14):014d}'
+    if aleatorio.random() < 0.5:
+        return f'{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}'
+    return digitos
+
+
+def gerar_envios(quantidade: int, semente: int = 42):
+    """Gera `quantidade` corpos de `POST /api/nps`, todos válidos
+
+    Filiais e scores seguem as mesmas distribuições de `gerar_pesquisas`; os
+    campos opcionais aparecem com as frequências de TAXAS_OPCIONAIS.
+    """
+    aleatorio = random.Random(semente)
+    filiais = aleatorio.choices(FILIAIS, weights=PESOS_FILIAIS, k=quantidade)
+    scores = aleatorio.choices(range(11), weights=PESOS_SCORES, k=quantidade)
+
+    envios = []
+    for indice in range(quantidade):
+        envio = {'filial': filiais[indice], 'score': scores[indice]}
+        nome = None
+        if aleatorio.random() < TAXAS_OPCIONAIS['nome']:
+            nome = f'{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)}'
+            envio['nome'] = nome
+        if aleatorio.random() < TAXAS_OPCIONAIS['email']:
+            usuario = nome.split()[0].lower() if nome else 'cliente'
+            envio['email'] = f'{usuario}{indice}@exemplo.com.br'
+        if aleatorio.random() < TAXAS_OPCIONAIS['telefone']:
+            envio['telefone'] = _telefone(aleatorio)
+        if aleatorio.random() < TAXAS_OPCIONAIS['cnpj']:
+            envio['cnpj'] = _cnpj(aleatorio)
+        if aleatorio.random() < TAXAS_OPCIONAIS['comentario']:
+            envio['comentario'] = aleatorio.choice(COMENTARIOS)
+        envios.append(envio)
+    return envios
@@ -0,0 +1,328 @@
+"""
+Servidor PostgREST falso para benchmarks locais.
+
+Implementa o subconjunto da API REST do Supabase usado pelo backend
+(`/rest/v1/<tabela>`), guardando as linhas em memória. Permite simular o
+custo do handshake TCP+TLS de cada conexão nova, a latência do banco, uma
+taxa de respostas de erro (503) e começar com N pesquisas sintéticas.
+
+Uso:
+    python benchmarks/fake_postgrest.py --porta 54321 --atraso-conexao-ms 30
+    python benchmarks/fake_postgrest.py --porta 54321 --atraso-ms 10 --taxa-erro 0.01 --linhas 50000
+"""
+import argparse
+import json
+import operator
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+
+class FakePostgREST(ThreadingHTTPServer):
+    """Servidor HTTP/1.1 com keep-alive que imita o PostgREST"""
+
+    daemon_threads = True
+    # Backlog do listen(): o padrão (5) descarta conexões sob alta concorrência
+    request_queue_size = 1024
+
+    def __init__(self, endereco=('127.0.0.1', 0), atraso_conexao_ms=0.0, atraso_ms=0.0, taxa_erro=0.0,
+                 max_linhas=None):
+        super().__init__(endereco, _Handler)
+        # Como o `max-rows` do PostgREST (1000 no Supabase): corta qualquer SELECT
+        self.max_linhas = max_linhas
+        self.atraso_conexao = atraso_conexao_ms / 1000.0
+        self.atraso = atraso_ms / 1000.0
+        # Fração das requisições respondidas com 503, como um banco sobrecarregado
+        self.taxa_erro = taxa_erro
+        self.erros_simulados = 0
+        self.tabelas = {}
+        self.lock = threading.Lock()
+        self.ultimo_id = 0
+        self.conexoes = 0
+        self.bytes_enviados = 0
+        # Contagens por combinação de colunas, como um índice (invalidado a cada insert)
+        self._indices = {}
+
+    @property
+    def url(self) -> str:
+        host, porta = self.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def handle_error(self, request, client_address):
+        # Cliente que termina o processo com conexões keep-alive abertas não é erro
+        if isinstance(sys.exc_info()[1], ConnectionResetError):
+            return
+        super().handle_error(request, client_address)
+
+    def iniciar(self) -> 'FakePostgREST':
+        """Inicia o servidor em uma thread daemon"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def falhar(self):
+        """Sorteia se a requisição atual recebe o erro simulado"""
+        if self.taxa_erro and random.random() < self.taxa_erro:
+            with self.lock:
+                self.erros_simulados += 1
+            return True
+        return False
+
+    def inserir(self, tabela, linhas, on_conflict=None):
+        gravadas = []
+        with self.lock:
+            destino = self.tabelas.setdefault(tabela, [])
+            self._indices.clear()
+            # on_conflict com ignore-duplicates: linhas com a chave já gravada ficam de fora
+            existentes = {l.get(on_conflict) for l in destino} if on_conflict else set()
+            for linha in linhas:
+                linha = dict(linha)
+                if on_conflict and linha.get(on_conflict) is not None:
+                    if linha[on_conflict] in existentes:
+                        continue
+                    existentes.add(linha[on_conflict])
+                if 'id' not in linha:
+                    self.ultimo_id += 1
+                    linha['id'] = self.ultimo_id
+                self.ultimo_id = max(self.ultimo_id, linha['id'])
+                linha.setdefault('timestamp', datetime.utcnow().isoformat())
+                destino.append(linha)
+                gravadas.append(linha)
+        return gravadas
+
+    def contagens(self, filial=None):
+        """Equivalente da função RPC nps_contagens (GROUP BY filial, categoria_nps)"""
+        grupos = {}
+        with self.lock:
+            for linha in self.tabelas.get('nps_pesquisas', []):
+                if filial and linha.get('filial') != filial:
+                    continue
+                chave = (linha.get('filial'), linha.get('categoria_nps'))
+                grupos[chave] = grupos.get(chave, 0) + 1
+        return [{'filial': f, 'categoria_nps': c, 'total': t} for (f, c), t in grupos.items()]
+
+    def contar(self, tabela, params):
+        """Contagem só com filtros de igualdade, servida de um índice em memória"""
+        filtros = [(c, v) for c, v in params if c not in ('select', 'limit', 'order', 'offset')]
+        if any(c == 'or' or not v.startswith('eq.') for c, v in filtros):
+            return self.consultar(tabela, params, contar=True)[1]
+
+        filtros.sort()
+        colunas = tuple(c for c, _ in filtros)
+        with self.lock:
+            chave = (tabela, colunas)
+            if chave not in self._indices:
+                indice = {}
+                for linha in self.tabelas.get(tabela, []):
+                    valores = tuple(str(linha.get(c)) for c in colunas)
+                    indice[valores] = indice.get(valores, 0) + 1
+                self._indices[chave] = indice
+            return self._indices[chave].get(tuple(v[3:] for _, v in filtros), 0)
+
+    def consultar(self, tabela, params, contar=False):
+        limite = None
+        colunas = None
+        ordem = []
+        filtros = []
+        for chave, valor in params:
+            if chave == 'limit':
+                limite = int(valor)
+            elif chave == 'select':
+                colunas = [c.strip() for c in valor.split(',')] if valor != '*' else None
+            elif chave == 'order':
+                for termo in valor.split(','):
+                    coluna, _, direcao = termo.partition('.')
+                    ordem.append((coluna, direcao.startswith('desc')))
+            elif chave == 'offset':
+                continue
+            elif chave in ('or', 'and'):
+                filtros.append((chave, 'logico', valor))
+            else:
+                operador, _, alvo = valor.partition('.')
+                filtros.append((chave, operador, alvo))
+
+        with self.lock:
+            linhas = list(self.tabelas.get(tabela, []))
+
+        predicados = [_predicado(c, op, v, linhas) for c, op, v in filtros]
+        resultado = [l for l in linhas if all(p(l) for p in predicados)]
+        total = len(resultado)
+        for coluna, desc in reversed(ordem):
+            resultado.sort(key=lambda l: l.get(coluna), reverse=desc)
+        if limite is not None:
+            resultado = resultado[:limite]
+        if self.max_linhas is not None:
+            resultado = resultado[:self.max_linhas]
+        if colunas:
+            resultado = [{c: l.get(c) for c in colunas} for l in resultado]
+        return (resultado, total) if contar else resultado
+
+
+_OPERADORES = {
+    'eq': operator.eq, 'neq': operator.ne, 'gt': operator.gt,
+    'gte': operator.ge, 'lt': operator.lt, 'lte': operator.le
+}
+
+
+def _dividir(expressao):
+    """Divide por vírgulas de nível superior, respeitando parênteses e aspas"""
+    partes, atual, nivel, aspas = [], '', 0, False
+    for caractere in expressao:
+        if caractere == '"':
+            aspas = not aspas
+        elif not aspas and caractere == '(':
+            nivel += 1
+        elif not aspas and caractere == ')':
+            nivel -= 1
+        elif not aspas and nivel == 0 and caractere == ',':
+            partes.append(atual)
+            atual = ''
+            continue
+        atual += caractere
+    partes.append(atual)
+    return partes
+
+
+def _logico(combinar, expressao, linhas):
+    """Compila or=(...) / and(...) com filtros aninhados"""
+    predicados = []
+    for parte in _dividir(expressao[1:-1]):
+        if parte.startswith(('and(', 'or(')):
+            nome, _, resto = parte.partition('(')
+            predicados.append(_logico(all if nome == 'and' else any, '(' + resto, linhas))
+        else:
+            coluna, operador, alvo = parte.split('.', 2)
+            predicados.append(_predicado(coluna, operador, alvo.strip('"'), linhas))
+    return lambda l: combinar(p(l) for p in predicados)
+
+
+def _predicado(coluna, operador, alvo, linhas):
+    """Compila um filtro do PostgREST, convertendo o alvo para o tipo da coluna"""
+    if operador == 'logico':
+        return _logico(all if coluna == 'and' else any, alvo, linhas)
+    comparar = _OPERADORES[operador]
+    amostra = next((l[coluna] for l in linhas if l.get(coluna) is not None), None)
+    if isinstance(amostra, (int, float)):
+        alvo = type(amostra)(alvo)
+        return lambda l: l.get(coluna) is not None and comparar(l[coluna], alvo)
+    return lambda l: l.get(coluna) is not None and comparar(str(l[coluna]), alvo)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # Cada conexão nova paga o custo do handshake simulado
+        with self.server.lock:
+            self.server.conexoes += 1
+        if self.server.atraso_conexao:
+            time.sleep(self.server.atraso_conexao)
+
+    def log_message(self, *args):
+        pass
+
+    def _tabela(self):
+        caminho = urlsplit(self.path).path
+        prefixo = '/rest/v1/'
+        if not caminho.startswith(prefixo):
+            return None
+        return caminho[len(prefixo):]
+
+    def _responder(self, status, corpo, cabecalhos=None, sem_corpo=False):
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Length', '0' if sem_corpo else str(len(dados)))
+        self.end_headers()
+        if not sem_corpo:
+            self.wfile.write(dados)
+            with self.server.lock:
+                self.server.bytes_enviados += len(dados)
+
+    def do_GET(self, sem_corpo=False):
+        if self.server.atraso:
+            time.sleep(self.server.atraso)
+        if self.server.falhar():
+            return self._responder(503, {'message': 'erro simulado'}, sem_corpo=sem_corpo)
+        tabela = self._tabela()
+        if tabela is None:
+            return self._responder(404, {'message': 'not found'})
+        params = parse_qsl(urlsplit(self.path).query)
+        linhas, total = self.server.consultar(tabela, params, contar=True)
+
+        cabecalhos = {}
+        if 'count=' in (self.headers.get('Prefer') or ''):
+            faixa = f'0-{len(linhas) - 1}' if linhas else '*'
+            cabecalhos['Content-Range'] = f'{faixa}/{total}'
+        self._responder(200, linhas, cabecalhos, sem_corpo)
+
+    def do_HEAD(self):
+        if self.server.atraso:
+            time.sleep(self.server.atraso)
+        if self.server.falhar():
+            return self._responder(503, {'message': 'erro simulado'}, sem_corpo=True)
+        tabela = self._tabela()
+        if tabela is None:
+            return self._responder(404, {'message': 'not found'}, sem_corpo=True)
+        total = self.server.contar(tabela, parse_qsl(urlsplit(self.path).query))
+        self._responder(200, [], {'Content-Range': f'*/{total}'}, sem_corpo=True)
+
+    def do_POST(self):
+        if self.server.atraso:
+            time.sleep(self.server.atraso)
+        tabela = self._tabela()
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        corpo = json.loads(self.rfile.read(tamanho) or b'null')
+        if self.server.falhar():
+            return self._responder(503, {'message': 'erro simulado'})
+        if tabela is None:
+            return self._responder(404, {'message': 'not found'})
+        if tabela == 'rpc/nps_contagens':
+            return self._responder(200, self.server.contagens((corpo or {}).get('p_filial')))
+        linhas = corpo if isinstance(corpo, list) else [corpo]
+        params = dict(parse_qsl(urlsplit(self.path).query))
+        if 'columns' in params:
+            # Só as colunas listadas; as chaves ausentes recebem o padrão ou NULL
+            colunas = params['columns'].split(',')
+            padrao = 'missing=default' in (self.headers.get('Prefer') or '')
+            linhas = [
+                {c: l[c] if c in l else None for c in colunas if c in l or not padrao}
+                for l in linhas
+            ]
+        elif any(set(l) != set(linhas[0]) for l in linhas):
+            # Como o PostgREST real: um lote sem `columns` exige as mesmas chaves
+            return self._responder(400, {'code': 'PGRST102', 'message': 'All object keys must match'})
+        # Mesma restrição CHECK da tabela: o lote inteiro é rejeitado
+        if any(not 0 <= int(l.get('score', 0)) <= 10 for l in linhas):
+            return self._responder(400, {'code': '23514', 'message': 'violates check constraint'})
+        self._responder(201, self.server.inserir(tabela, linhas, params.get('on_conflict')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--porta', type=int, default=54321)
+    parser.add_argument('--atraso-conexao-ms', type=float, default=0.0)
+    parser.add_argument('--atraso-ms', type=float, default=0.0)
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help='fração das requisições respondidas com 503')
+    parser.add_argument('--linhas', type=int, default=0, help='pesquisas sintéticas carregadas na inicialização')
+    args = parser.parse_args()
+
+    servidor = FakePostgREST(('127.0.0.1', args.porta), args.atraso_conexao_ms, args.atraso_ms, args.taxa_erro)
+    if args.linhas:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from benchmarks.dados_sinteticos import gerar_pesquisas
+        servidor.inserir('nps_pesquisas', gerar_pesquisas(args.linhas))
+    print(f"PostgREST falso em {servidor.url}")
+    servidor.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
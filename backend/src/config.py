@@ -1,8 +1,7 @@
 import os
-from dotenv import load_dotenv
 
-# Carregar variáveis de ambiente
-load_dotenv()
+# O .env é carregado pelos pontos de entrada (src/main.py, src/main_asgi.py)
+# antes do primeiro import deste módulo, que só lê o ambiente
 
 class Config:
     # Configurações do Supabase
@@ -13,6 +12,115 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     
+    # Transporte HTTP do cliente Supabase (pool de conexões keep-alive)
+    SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', 10))
+    SUPABASE_CONNECT_TIMEOUT = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', 3.05))
+    SUPABASE_READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', 10))
+    # Conexões simultâneas do cliente assíncrono (app ASGI); as demais
+    # requisições em andamento aguardam uma conexão livre
+    SUPABASE_ASYNC_POOL_SIZE = int(os.getenv('SUPABASE_ASYNC_POOL_SIZE', 20))
+    
+    # Armazenamento das pesquisas: 'supabase' (PostgREST) ou 'sqlite' (arquivo
+    # local em modo WAL, para instalações de um único servidor). O SQLite faz
+    # fsync a cada commit só com NPS_SQLITE_SYNCHRONOUS=FULL
+    NPS_ARMAZENAMENTO = os.getenv('NPS_ARMAZENAMENTO', 'supabase').lower()
+    NPS_SQLITE_PATH = os.getenv('NPS_SQLITE_PATH', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nps.db'))
+    NPS_SQLITE_SYNCHRONOUS = os.getenv('NPS_SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+    # Conexões livres mantidas no pool compartilhado pelas threads do worker
+    NPS_SQLITE_POOL_SIZE = int(os.getenv('NPS_SQLITE_POOL_SIZE', 4))
+    
+    # Modo de ingestão do POST /api/nps: 'sincrono', 'lote' (write-behind)
+    # ou 'spool' (log local durável reenviado ao Supabase em segundo plano)
+    NPS_INGESTAO_MODO = os.getenv('NPS_INGESTAO_MODO', 'sincrono')
+    NPS_LOTE_TAMANHO = int(os.getenv('NPS_LOTE_TAMANHO', 100))
+    NPS_LOTE_INTERVALO_MS = int(os.getenv('NPS_LOTE_INTERVALO_MS', 200))
+    NPS_LOTE_FILA_MAX = int(os.getenv('NPS_LOTE_FILA_MAX', 10000))
+    NPS_LOTE_TENTATIVAS = int(os.getenv('NPS_LOTE_TENTATIVAS', 3))
+    
+    # POST /api/nps/lote: pesquisas aceitas por requisição e linhas por bulk insert
+    NPS_LOTE_MAX_ITENS = int(os.getenv('NPS_LOTE_MAX_ITENS', 5000))
+    NPS_LOTE_BLOCO = int(os.getenv('NPS_LOTE_BLOCO', 500))
+    
+    # Contadores NPS em memória por filial (estatísticas sem consultar o banco)
+    NPS_AGREGADOS_ATIVO = os.getenv('NPS_AGREGADOS_ATIVO', 'true').lower() == 'true'
+    NPS_AGREGADOS_RECONCILIAR_S = float(os.getenv('NPS_AGREGADOS_RECONCILIAR_S', 60))
+    
+    # Snapshot colunar da tabela em memória para estatísticas e tendências
+    NPS_SNAPSHOT_ATIVO = os.getenv('NPS_SNAPSHOT_ATIVO', 'false').lower() == 'true'
+    NPS_SNAPSHOT_RECONCILIAR_S = float(os.getenv('NPS_SNAPSHOT_RECONCILIAR_S', 300))
+    
+    # Contagens para estatísticas: método do PostgREST ('exact', 'planned' ou
+    # 'estimated') e, opcionalmente, uma função RPC com GROUP BY no banco
+    # (o SQLite já traz a nps_contagens embutida)
+    NPS_CONTAGEM_METODO = os.getenv('NPS_CONTAGEM_METODO', 'exact')
+    NPS_ESTATISTICAS_RPC = os.getenv('NPS_ESTATISTICAS_RPC') or ('nps_contagens' if NPS_ARMAZENAMENTO == 'sqlite' else None)
+    
+    # Spool local (write-ahead log) usado no modo 'spool'
+    NPS_SPOOL_DIR = os.getenv('NPS_SPOOL_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'spool'))
+    NPS_SPOOL_SEGMENTO_MB = float(os.getenv('NPS_SPOOL_SEGMENTO_MB', 8))
+    NPS_SPOOL_FSYNC_MS = int(os.getenv('NPS_SPOOL_FSYNC_MS', 5))
+    # Coluna única com o id de cada envio: os reenvios usam on_conflict nela e
+    # não duplicam linhas (obrigatória no spool; ver docs/SUPABASE_SETUP.md)
+    NPS_INGESTAO_DEDUP_COLUNA = os.getenv('NPS_INGESTAO_DEDUP_COLUNA', os.getenv('NPS_SPOOL_DEDUP_COLUNA', 'id_envio'))
+    
+    # Cache de respostas de listagem e estatísticas (invalidado a cada gravação);
+    # com NPS_CACHE_REDIS_URL o cache é compartilhado entre os workers
+    NPS_CACHE_ATIVO = os.getenv('NPS_CACHE_ATIVO', 'true').lower() == 'true'
+    NPS_CACHE_TTL_S = float(os.getenv('NPS_CACHE_TTL_S', 5))
+    NPS_CACHE_MAX_ITENS = int(os.getenv('NPS_CACHE_MAX_ITENS', 1000))
+    NPS_CACHE_REDIS_URL = os.getenv('NPS_CACHE_REDIS_URL') or None
+    
+    # Controle de admissão das rotas NPS: baldes de tokens por IP e por filial
+    # (429) e limite de requisições em andamento por worker (503); com
+    # NPS_ADMISSAO_REDIS_URL os baldes são compartilhados entre os workers
+    NPS_ADMISSAO_ATIVO = os.getenv('NPS_ADMISSAO_ATIVO', 'false').lower() == 'true'
+    NPS_ADMISSAO_IP_RPS = float(os.getenv('NPS_ADMISSAO_IP_RPS', 20))
+    NPS_ADMISSAO_IP_RAJADA = float(os.getenv('NPS_ADMISSAO_IP_RAJADA', 40))
+    NPS_ADMISSAO_FILIAL_RPS = float(os.getenv('NPS_ADMISSAO_FILIAL_RPS', 100))
+    NPS_ADMISSAO_FILIAL_RAJADA = float(os.getenv('NPS_ADMISSAO_FILIAL_RAJADA', 200))
+    NPS_ADMISSAO_MAX_EM_ANDAMENTO = int(os.getenv('NPS_ADMISSAO_MAX_EM_ANDAMENTO', 64))
+    NPS_ADMISSAO_REDIS_URL = os.getenv('NPS_ADMISSAO_REDIS_URL') or None
+    # Usa o primeiro endereço de X-Forwarded-For como IP do cliente (atrás de proxy)
+    NPS_ADMISSAO_CONFIAR_PROXY = os.getenv('NPS_ADMISSAO_CONFIAR_PROXY', 'false').lower() == 'true'
+    
+    # Supressão de reenvios do POST /api/nps: respostas guardadas por chave
+    # (Idempotency-Key ou hash de filial/score/email-CNPJ/minuto)
+    NPS_IDEMPOTENCIA_ATIVO = os.getenv('NPS_IDEMPOTENCIA_ATIVO', 'true').lower() == 'true'
+    NPS_IDEMPOTENCIA_MAX_ITENS = int(os.getenv('NPS_IDEMPOTENCIA_MAX_ITENS', 10000))
+    NPS_IDEMPOTENCIA_TTL_S = float(os.getenv('NPS_IDEMPOTENCIA_TTL_S', 3600))
+    NPS_IDEMPOTENCIA_CONTEUDO = os.getenv('NPS_IDEMPOTENCIA_CONTEUDO', 'true').lower() == 'true'
+    NPS_IDEMPOTENCIA_BLOOM = os.getenv('NPS_IDEMPOTENCIA_BLOOM', 'false').lower() == 'true'
+    
+    # Métricas do Prometheus em GET /api/metrics; com vários workers (gunicorn),
+    # NPS_METRICAS_DIR é o diretório onde cada worker grava o seu total
+    NPS_METRICAS_ATIVO = os.getenv('NPS_METRICAS_ATIVO', 'true').lower() == 'true'
+    NPS_METRICAS_DIR = os.getenv('NPS_METRICAS_DIR') or None
+    NPS_METRICAS_INTERVALO_S = float(os.getenv('NPS_METRICAS_INTERVALO_S', 5))
+    
+    # Perfilamento sob demanda das rotas NPS (cProfile): requisições com o
+    # cabeçalho X-NPS-Profile igual a NPS_PERFIL_TOKEN ou sorteadas pela taxa
+    # NPS_PERFIL_AMOSTRAGEM; os perfis mais recentes ficam em NPS_PERFIL_DIR
+    NPS_PERFIL_ATIVO = os.getenv('NPS_PERFIL_ATIVO', 'false').lower() == 'true'
+    NPS_PERFIL_TOKEN = os.getenv('NPS_PERFIL_TOKEN') or None
+    NPS_PERFIL_AMOSTRAGEM = float(os.getenv('NPS_PERFIL_AMOSTRAGEM', 0))
+    NPS_PERFIL_DIR = os.getenv('NPS_PERFIL_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'perfis'))
+    NPS_PERFIL_MAX_ARQUIVOS = int(os.getenv('NPS_PERFIL_MAX_ARQUIVOS', 200))
+    
+    # Sonda de saúde do banco em segundo plano (GET /api/nps/health responde do
+    # último resultado): intervalo entre checagens e amostras de latência mantidas
+    NPS_SAUDE_INTERVALO_S = float(os.getenv('NPS_SAUDE_INTERVALO_S', 5))
+    NPS_SAUDE_JANELA = int(os.getenv('NPS_SAUDE_JANELA', 60))
+    
+    # Aquecimento em segundo plano logo após a subida do app: cria o serviço,
+    # abre as conexões do pool e espera a primeira carga dos contadores (até
+    # NPS_AQUECIMENTO_TEMPO_MAX_S). Desativado, tudo é criado na primeira requisição
+    NPS_AQUECIMENTO = os.getenv('NPS_AQUECIMENTO', 'true').lower() == 'true'
+    NPS_AQUECIMENTO_TEMPO_MAX_S = float(os.getenv('NPS_AQUECIMENTO_TEMPO_MAX_S', 10))
+    
+    # Frontend em src/static servido da memória, com variantes br/gzip prontas;
+    # arquivos maiores que o limite são lidos do disco a cada requisição
+    NPS_ESTATICOS_MEMORIA_MAX_KB = int(os.getenv('NPS_ESTATICOS_MEMORIA_MAX_KB', 2048))
+    
     @staticmethod
     def validate_config():
         """Valida se as configurações necessárias estão presentes"""
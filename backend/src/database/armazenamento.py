@@ -0,0 +1,50 @@
+from typing import Any, Dict, List, Protocol, Tuple
+from src.config import Config
+
+# Backends aceitos em NPS_ARMAZENAMENTO
+ARMAZENAMENTOS = ('supabase', 'sqlite')
+
+class ArmazenamentoNPS(Protocol):
+    """Interface de armazenamento usada pelo `NPSServiceSimple`
+    
+    Segue a API do `SimpleSupabaseClient`: cada operação retorna
+    (sucesso, resultado) e, em caso de falha, um dicionário com `error` (e
+    `status_code` quando o erro é dos dados enviados, 4xx, ou do banco, 5xx).
+    `select` aceita filtros de igualdade, ordenação no formato do PostgREST
+    ('timestamp.desc,id.desc'), paginação por chave (`after`) e intervalos
+    [início, fim) por coluna.
+    """
+    
+    def insert(self, table: str, data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]: ...
+    
+    def insert_many(self, table: str, rows: List[Dict[str, Any]], on_conflict: str = None) -> Tuple[bool, Any]: ...
+    
+    def select(self, table: str, filters: Dict[str, Any] = None, limit: int = 100, columns: str = '*',
+               order: str = None, after: Any = None, ranges: Dict[str, Tuple[Any, Any]] = None) -> Tuple[bool, Any]: ...
+    
+    def count(self, table: str, filters: Dict[str, Any] = None, method: str = 'exact') -> Tuple[bool, Any]: ...
+    
+    def rpc(self, function: str, params: Dict[str, Any] = None) -> Tuple[bool, Any]: ...
+    
+    def test_connection(self) -> Tuple[bool, str]: ...
+    
+    def pre_conectar(self, conexoes: int = None) -> int: ...
+    
+    def pool_stats(self) -> Dict[str, Any]: ...
+    
+    def close(self): ...
+
+def criar_armazenamento() -> ArmazenamentoNPS:
+    """Backend de armazenamento escolhido em Config.NPS_ARMAZENAMENTO"""
+    if Config.NPS_ARMAZENAMENTO == 'sqlite':
+        from src.database.sqlite_client import SQLiteClient
+        return SQLiteClient(Config.NPS_SQLITE_PATH, synchronous=Config.NPS_SQLITE_SYNCHRONOUS,
+                            pool_size=Config.NPS_SQLITE_POOL_SIZE)
+    
+    if Config.NPS_ARMAZENAMENTO != 'supabase':
+        raise ValueError(
+            f"NPS_ARMAZENAMENTO inválido: {Config.NPS_ARMAZENAMENTO} (use {' ou '.join(ARMAZENAMENTOS)})"
+        )
+    
+    from src.database.supabase_client_simple import simple_supabase_client
+    return simple_supabase_client.obter()
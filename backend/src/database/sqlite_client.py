@@ -0,0 +1,443 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List, Tuple
+from src.services.nps_metricas import metricas
+
+# Mesmo esquema e índices de docs/SUPABASE_SETUP.md (id_envio: deduplicação do
+# spool), mais (filial, categoria_nps), que cobre as contagens agrupadas, e
+# (filial, timestamp), que entrega a listagem de uma filial já ordenada. Os
+# índices do SQLite terminam no id (rowid): (timestamp) já ordena por (timestamp, id)
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS nps_pesquisas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filial VARCHAR(50) NOT NULL,
+    score INTEGER NOT NULL CHECK (score >= 0 AND score <= 10),
+    categoria_nps VARCHAR(20) NOT NULL CHECK (categoria_nps IN ('promotor', 'neutro', 'detrator')),
+    nome VARCHAR(100),
+    email VARCHAR(100),
+    telefone VARCHAR(20),
+    cnpj VARCHAR(20),
+    comentario TEXT,
+    timestamp TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    id_envio VARCHAR(32) UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_nps_filial ON nps_pesquisas(filial);
+CREATE INDEX IF NOT EXISTS idx_nps_score ON nps_pesquisas(score);
+CREATE INDEX IF NOT EXISTS idx_nps_categoria ON nps_pesquisas(categoria_nps);
+CREATE INDEX IF NOT EXISTS idx_nps_timestamp ON nps_pesquisas(timestamp);
+CREATE INDEX IF NOT EXISTS idx_nps_filial_categoria ON nps_pesquisas(filial, categoria_nps);
+CREATE INDEX IF NOT EXISTS idx_nps_filial_timestamp ON nps_pesquisas(filial, timestamp);
+"""
+
+# Colunas de cada tabela, na ordem do INSERT (nomes de fora desta lista são recusados)
+TABELAS = {
+    'nps_pesquisas': (
+        'id', 'filial', 'score', 'categoria_nps', 'nome', 'email', 'telefone',
+        'cnpj', 'comentario', 'timestamp', 'created_at', 'id_envio'
+    )
+}
+
+# Colunas preenchidas com o horário da gravação quando não informadas
+COLUNAS_HORARIO = ('timestamp', 'created_at')
+
+# Formato gravado nas colunas de horário: UTC com microssegundos de largura fixa,
+# para que a ordem do texto seja a ordem cronológica (como o TIMESTAMPTZ do Postgres)
+FORMATO_HORARIO = '%Y-%m-%dT%H:%M:%S.%f+00:00'
+_PADRAO_HORARIO = '????-??-??T??:??:??.??????+00:00'
+
+# PRAGMA user_version dos arquivos com os horários já no formato acima
+VERSAO_HORARIOS = 1
+
+SYNCHRONOUS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+def horario_utc(valor: Any) -> str:
+    """Normaliza um horário ISO 8601 (ou datetime) para `FORMATO_HORARIO`
+    
+    Sem fuso, o horário é tomado como UTC, como faz o Supabase. Lança ValueError
+    se o valor não for uma data ISO.
+    """
+    if not isinstance(valor, datetime):
+        try:
+            valor = datetime.fromisoformat(str(valor))
+        except ValueError:
+            raise ValueError(f"Horário inválido: {valor}")
+    if valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    return valor.astimezone(timezone.utc).strftime(FORMATO_HORARIO)
+
+def _horario_ou_original(valor: Any) -> Any:
+    # Migração das linhas antigas: um valor ilegível fica como está
+    try:
+        return horario_utc(valor)
+    except ValueError:
+        return valor
+
+def _dicionario(cursor: sqlite3.Cursor, linha: tuple) -> Dict[str, Any]:
+    return {coluna[0]: valor for coluna, valor in zip(cursor.description, linha)}
+
+def _erro(e: Exception) -> Dict[str, Any]:
+    """Erro no formato do cliente Supabase, com o status que o PostgREST usaria"""
+    if isinstance(e, sqlite3.IntegrityError):
+        status_code = 409 if 'UNIQUE' in str(e) else 400
+    elif isinstance(e, ValueError):
+        status_code = 400
+    elif isinstance(e, sqlite3.OperationalError) and 'locked' in str(e):
+        status_code = 503
+    else:
+        status_code = 500
+    return {'error': str(e), 'status_code': status_code}
+
+class SQLiteClient:
+    """Armazenamento local em SQLite para instalações de um único servidor
+    
+    Implementa a mesma API do `SimpleSupabaseClient` sobre um arquivo em modo
+    WAL: leituras não bloqueiam a gravação e vários workers do gunicorn podem
+    abrir o mesmo arquivo. As conexões ficam num pool compartilhado pelas
+    threads (até `pool_size` livres): cada operação empresta uma e a devolve,
+    e o cache de statements da conexão reaproveita as consultas já preparadas
+    (os valores sempre vão como parâmetros, então o texto SQL se repete), mesmo
+    com o servidor de desenvolvimento criando uma thread por requisição.
+    `synchronous=NORMAL` não faz fsync a cada commit: uma queda de energia pode
+    perder as últimas gravações, mas não corrompe o banco; use FULL para fsync
+    por commit.
+    """
+    
+    def __init__(self, caminho: str, timeout: float = 5.0, synchronous: str = 'NORMAL',
+                 pool_size: int = 4):
+        if synchronous.upper() not in SYNCHRONOUS:
+            raise ValueError(f"synchronous inválido: {synchronous} (use {', '.join(SYNCHRONOUS)})")
+        self.caminho = caminho
+        self.timeout = timeout
+        self.synchronous = synchronous.upper()
+        self.pool_size = max(pool_size, 1)
+        
+        self._livres = []
+        self._lock = threading.Lock()
+        self._conexoes_novas = 0
+        self._emprestimos = 0
+        # Conexões abertas antes de um fork, que o processo filho não pode usar nem fechar
+        self._herdadas = []
+        
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        conexao = sqlite3.connect(caminho, timeout=timeout, isolation_level=None)
+        try:
+            # O modo WAL fica gravado no arquivo; as conexões seguintes já o usam
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.executescript(ESQUEMA)
+            self._normalizar_horarios(conexao)
+        finally:
+            conexao.close()
+        
+        os.register_at_fork(after_in_child=self._reiniciar)
+    
+    @staticmethod
+    def _normalizar_horarios(conexao: sqlite3.Connection):
+        """Reescreve no formato UTC fixo os horários gravados antes da normalização
+        
+        Roda uma única vez por arquivo: ao terminar grava `VERSAO_HORARIOS` no
+        `PRAGMA user_version`, e as aberturas seguintes só leem esse número.
+        """
+        if conexao.execute('PRAGMA user_version').fetchone()[0] >= VERSAO_HORARIOS:
+            return
+        
+        conexao.create_function('nps_horario_utc', 1, _horario_ou_original, deterministic=True)
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            # Outro worker pode ter migrado enquanto este esperava o lock
+            if conexao.execute('PRAGMA user_version').fetchone()[0] < VERSAO_HORARIOS:
+                for table, colunas in TABELAS.items():
+                    for coluna in COLUNAS_HORARIO:
+                        if coluna in colunas:
+                            conexao.execute(
+                                f"UPDATE {table} SET {coluna} = nps_horario_utc({coluna}) WHERE {coluna} NOT GLOB ?",
+                                (_PADRAO_HORARIO,)
+                            )
+                conexao.execute(f'PRAGMA user_version = {VERSAO_HORARIOS}')
+            conexao.execute('COMMIT')
+        except BaseException:
+            conexao.execute('ROLLBACK')
+            raise
+    
+    def _reiniciar(self):
+        self._herdadas.append(self._livres)
+        self._livres = []
+        self._lock = threading.Lock()
+        self._conexoes_novas = 0
+        self._emprestimos = 0
+    
+    def _abrir(self) -> sqlite3.Connection:
+        # isolation_level=None: autocommit, com BEGIN explícito nos lotes;
+        # check_same_thread=False: a conexão passa de thread em thread pelo pool
+        conexao = sqlite3.connect(self.caminho, timeout=self.timeout, isolation_level=None,
+                                  cached_statements=256, check_same_thread=False)
+        conexao.row_factory = _dicionario
+        conexao.execute(f'PRAGMA synchronous={self.synchronous}')
+        with self._lock:
+            self._conexoes_novas += 1
+        return conexao
+    
+    @contextmanager
+    def _conexao(self) -> Iterator[sqlite3.Connection]:
+        """Empresta uma conexão livre do pool (aberta agora se não houver) e a devolve no fim"""
+        with self._lock:
+            self._emprestimos += 1
+            conexao = self._livres.pop() if self._livres else None
+        if conexao is None:
+            conexao = self._abrir()
+        
+        try:
+            yield conexao
+        finally:
+            # Uma conexão com transação aberta (erro no meio do ROLLBACK) não volta ao pool
+            devolvida = False
+            if not conexao.in_transaction:
+                with self._lock:
+                    if len(self._livres) < self.pool_size:
+                        self._livres.append(conexao)
+                        devolvida = True
+            if not devolvida:
+                conexao.close()
+    
+    @staticmethod
+    def _colunas(table: str) -> Tuple[str, ...]:
+        colunas = TABELAS.get(table)
+        if colunas is None:
+            raise ValueError(f"Tabela desconhecida: {table}")
+        return colunas
+    
+    @staticmethod
+    def _coluna(colunas: Tuple[str, ...], coluna: str) -> str:
+        if coluna not in colunas:
+            raise ValueError(f"Coluna desconhecida: {coluna}")
+        return coluna
+    
+    @staticmethod
+    def _parametro(coluna: str, valor: Any) -> Any:
+        """Valor comparado com a coluna, no formato gravado se ela for de horário"""
+        return horario_utc(valor) if coluna in COLUNAS_HORARIO else valor
+    
+    def _valores(self, colunas: Tuple[str, ...], data: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Valores de uma linha na ordem de `colunas` (ausentes viram NULL)"""
+        for coluna in data:
+            self._coluna(colunas, coluna)
+        agora = None
+        valores = []
+        for coluna in colunas:
+            valor = data.get(coluna)
+            if coluna in COLUNAS_HORARIO:
+                if valor is None:
+                    agora = agora or horario_utc(datetime.now(timezone.utc))
+                    valor = agora
+                else:
+                    valor = horario_utc(valor)
+            valores.append(valor)
+        return tuple(valores)
+    
+    @staticmethod
+    def _sql_insert(table: str, colunas: Tuple[str, ...], on_conflict: str = None) -> str:
+        # id NULL numa INTEGER PRIMARY KEY recebe o próximo id
+        sql = f"INSERT INTO {table} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})"
+        if on_conflict:
+            sql += f" ON CONFLICT ({on_conflict}) DO NOTHING"
+        return sql + " RETURNING *"
+    
+    @metricas.medir_supabase('insert')
+    def insert(self, table: str, data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """Insere uma linha e retorna a linha gravada (com id)"""
+        try:
+            colunas = self._colunas(table)
+            with self._conexao() as conexao:
+                linhas = conexao.execute(self._sql_insert(table, colunas), self._valores(colunas, data)).fetchall()
+            return True, linhas[0]
+        except Exception as e:
+            return False, _erro(e)
+    
+    @metricas.medir_supabase('insert_many')
+    def insert_many(self, table: str, rows: List[Dict[str, Any]], on_conflict: str = None) -> Tuple[bool, Any]:
+        """Insere várias linhas numa única transação (todas ou nenhuma)
+        
+        Com `on_conflict`, linhas que violam a restrição única dessa coluna são
+        ignoradas e ficam fora do retorno, como no PostgREST.
+        """
+        if not rows:
+            return True, []
+        
+        try:
+            colunas = self._colunas(table)
+            sql = self._sql_insert(table, colunas, self._coluna(colunas, on_conflict) if on_conflict else None)
+            valores = [self._valores(colunas, linha) for linha in rows]
+        except Exception as e:
+            return False, _erro(e)
+        
+        try:
+            with self._conexao() as conexao:
+                conexao.execute('BEGIN IMMEDIATE')
+                try:
+                    gravadas = []
+                    for linha in valores:
+                        gravadas.extend(conexao.execute(sql, linha).fetchall())
+                    conexao.execute('COMMIT')
+                except BaseException:
+                    conexao.execute('ROLLBACK')
+                    raise
+            return True, gravadas
+        except Exception as e:
+            return False, _erro(e)
+    
+    def _filtros(self, colunas: Tuple[str, ...], filters: Dict[str, Any] = None,
+                 ranges: Dict[str, Tuple[Any, Any]] = None) -> Tuple[List[str], List[Any]]:
+        condicoes, parametros = [], []
+        for coluna, valor in (filters or {}).items():
+            condicoes.append(f'{self._coluna(colunas, coluna)} = ?')
+            parametros.append(self._parametro(coluna, valor))
+        for coluna, (inicio, fim) in (ranges or {}).items():
+            self._coluna(colunas, coluna)
+            if inicio is not None:
+                condicoes.append(f'{coluna} >= ?')
+                parametros.append(self._parametro(coluna, inicio))
+            if fim is not None:
+                condicoes.append(f'{coluna} < ?')
+                parametros.append(self._parametro(coluna, fim))
+        return condicoes, parametros
+    
+    def _ordenacao(self, colunas: Tuple[str, ...], order: str, after: Any,
+                   condicoes: List[str], parametros: List[Any]) -> str:
+        """ORDER BY equivalente a `order` e, com `after`, a condição de paginação por chave"""
+        termos = []
+        for termo in order.split(','):
+            coluna, _, direcao = termo.strip().partition('.')
+            termos.append((self._coluna(colunas, coluna), direcao.startswith('desc')))
+        
+        if after is not None:
+            valores = after if isinstance(after, (list, tuple)) else (after,)
+            chave = termos[:len(valores)]
+            valores = [self._parametro(coluna, valor) for (coluna, _), valor in zip(chave, valores)]
+            direcoes = {desc for _, desc in chave}
+            if len(direcoes) == 1:
+                # Mesma direção em todas as colunas: comparação de tuplas, que usa o índice
+                condicoes.append(f"({', '.join(c for c, _ in chave)}) {'<' if direcoes.pop() else '>'} "
+                                 f"({', '.join('?' * len(chave))})")
+                parametros.extend(valores[:len(chave)])
+            else:
+                # (a, b) após (x, y): a > x OR (a = x AND b > y), com < nas colunas desc
+                alternativas = []
+                for indice, (coluna, desc) in enumerate(chave):
+                    partes = [f'{c} = ?' for c, _ in chave[:indice]] + [f"{coluna} {'<' if desc else '>'} ?"]
+                    alternativas.append(f"({' AND '.join(partes)})")
+                    parametros.extend(valores[:indice + 1])
+                condicoes.append(f"({' OR '.join(alternativas)})")
+        
+        return ' ORDER BY ' + ', '.join(f"{coluna} {'DESC' if desc else 'ASC'}" for coluna, desc in termos)
+    
+    @metricas.medir_supabase('select')
+    def select(self, table: str, filters: Dict[str, Any] = None, limit: int = 100, columns: str = '*',
+               order: str = None, after: Any = None, ranges: Dict[str, Tuple[Any, Any]] = None) -> Tuple[bool, Any]:
+        """Seleciona linhas com a mesma semântica do `SimpleSupabaseClient.select`"""
+        try:
+            colunas = self._colunas(table)
+            selecionadas = '*'
+            if columns and columns != '*':
+                selecionadas = ', '.join(self._coluna(colunas, c.strip()) for c in columns.split(','))
+            
+            condicoes, parametros = self._filtros(colunas, filters, ranges)
+            ordenacao = self._ordenacao(colunas, order, after, condicoes, parametros) if order else ''
+            
+            sql = f"SELECT {selecionadas} FROM {table}"
+            if condicoes:
+                sql += ' WHERE ' + ' AND '.join(condicoes)
+            sql += ordenacao + ' LIMIT ?'
+            parametros.append(limit)
+            
+            with self._conexao() as conexao:
+                return True, conexao.execute(sql, parametros).fetchall()
+        except Exception as e:
+            return False, _erro(e)
+    
+    @metricas.medir_supabase('count')
+    def count(self, table: str, filters: Dict[str, Any] = None, method: str = 'exact') -> Tuple[bool, Any]:
+        """Conta as linhas do filtro (sempre exata: `method` existe só pela compatibilidade)"""
+        try:
+            colunas = self._colunas(table)
+            condicoes, parametros = self._filtros(colunas, filters)
+            sql = f"SELECT COUNT(*) AS total FROM {table}"
+            if condicoes:
+                sql += ' WHERE ' + ' AND '.join(condicoes)
+            with self._conexao() as conexao:
+                return True, conexao.execute(sql, parametros).fetchall()[0]['total']
+        except Exception as e:
+            return False, _erro(e)
+    
+    @metricas.medir_supabase('rpc')
+    def rpc(self, function: str, params: Dict[str, Any] = None) -> Tuple[bool, Any]:
+        """Executa as funções de banco de docs/SUPABASE_SETUP.md (hoje, `nps_contagens`)"""
+        try:
+            if function != 'nps_contagens':
+                return False, {'error': f'Função desconhecida: {function}', 'status_code': 404}
+            
+            filial = (params or {}).get('p_filial')
+            sql = "SELECT filial, categoria_nps, COUNT(*) AS total FROM nps_pesquisas"
+            parametros = []
+            if filial:
+                sql += " WHERE filial = ?"
+                parametros.append(filial)
+            sql += " GROUP BY filial, categoria_nps"
+            with self._conexao() as conexao:
+                return True, conexao.execute(sql, parametros).fetchall()
+        except Exception as e:
+            return False, _erro(e)
+    
+    @metricas.medir_supabase('test_connection')
+    def test_connection(self) -> Tuple[bool, str]:
+        """Testa o acesso ao arquivo do banco"""
+        try:
+            with self._conexao() as conexao:
+                conexao.execute("SELECT id FROM nps_pesquisas LIMIT 1").fetchall()
+            return True, f"Banco SQLite disponível em {self.caminho}"
+        except Exception as e:
+            return False, f"Erro na conexão: {str(e)}"
+    
+    def pre_conectar(self, conexoes: int = None) -> int:
+        """Abre até `conexoes` (padrão: o tamanho do pool) conexões livres no pool
+        
+        As conexões do SQLite abrem sem rede; aqui se antecipa a verificação
+        do arquivo e o PRAGMA de cada conexão. Retorna quantas estão livres.
+        """
+        sucesso, _ = self.test_connection()
+        if not sucesso:
+            return 0
+        
+        conexoes = min(conexoes or self.pool_size, self.pool_size)
+        with self._lock:
+            faltam = conexoes - len(self._livres)
+        abertas = [self._abrir() for _ in range(max(faltam, 0))]
+        with self._lock:
+            for conexao in abertas:
+                if len(self._livres) < self.pool_size:
+                    self._livres.append(conexao)
+                else:
+                    conexao.close()
+            return len(self._livres)
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Retorna o arquivo do banco e os contadores de conexões do pool"""
+        with self._lock:
+            return {
+                'backend': 'sqlite',
+                'caminho': self.caminho,
+                'pool_size': self.pool_size,
+                'livres': len(self._livres),
+                'requisicoes': self._emprestimos,
+                'conexoes_novas': self._conexoes_novas
+            }
+    
+    def close(self):
+        """Fecha as conexões livres do pool (as emprestadas fecham ao voltar, se o pool estiver cheio)"""
+        with self._lock:
+            livres, self._livres = self._livres, []
+        for conexao in livres:
+            conexao.close()
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import httpx
+from typing import Dict, Any, List, Tuple
+from src.config import Config
+from src.services.nps_inicializacao import Preguicoso
+from src.services.nps_metricas import metricas
+from src.database.supabase_client_simple import parametros_filtros, parametros_insert, parametros_select
+
+# O httpx registra cada requisição em INFO; o volume do app ASGI inundaria o log
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+class AsyncSupabaseClient:
+    """Cliente Supabase assíncrono (httpx) com o mesmo contrato do SimpleSupabaseClient
+    
+    Os métodos são corrotinas que retornam as mesmas tuplas (sucesso, resultado).
+    O `httpx.AsyncClient` é criado na primeira chamada, dentro do event loop que
+    o usa, e mantém um pool compartilhado de conexões keep-alive. As requisições
+    além do tamanho do pool esperam num semáforo: a fila interna do pool do
+    httpcore custa CPU proporcional a requisições x conexões a cada liberação.
+    """
+    
+    def __init__(self, pool_size: int = None, connect_timeout: float = None, read_timeout: float = None):
+        self.url = os.getenv('SUPABASE_URL')
+        self.key = os.getenv('SUPABASE_KEY')
+        self.headers = {
+            'apikey': self.key,
+            'Authorization': f'Bearer {self.key}',
+            'Content-Type': 'application/json',
+            'Prefer': 'return=representation'
+        }
+        
+        connect = connect_timeout if connect_timeout is not None else Config.SUPABASE_CONNECT_TIMEOUT
+        read = read_timeout if read_timeout is not None else Config.SUPABASE_READ_TIMEOUT
+        # Espera por uma conexão livre do pool limitada ao mesmo tempo da leitura
+        self.timeout = httpx.Timeout(read, connect=connect, pool=read)
+        
+        self.pool_size = pool_size or Config.SUPABASE_ASYNC_POOL_SIZE
+        self._client = None
+        self._semaforo = None
+        self._requisicoes = 0
+        self._em_andamento = 0
+    
+    def _obter_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+            self._semaforo = asyncio.Semaphore(self.pool_size)
+        return self._client
+    
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        client = self._obter_client()
+        self._requisicoes += 1
+        self._em_andamento += 1
+        try:
+            if self._semaforo.locked():
+                try:
+                    await asyncio.wait_for(self._semaforo.acquire(), timeout=self.timeout.pool)
+                except asyncio.TimeoutError:
+                    raise httpx.PoolTimeout("Tempo esgotado aguardando uma conexão do pool")
+            else:
+                await self._semaforo.acquire()
+            try:
+                return await client.request(method, url, **kwargs)
+            finally:
+                self._semaforo.release()
+        finally:
+            self._em_andamento -= 1
+    
+    @metricas.medir_supabase('insert')
+    async def insert(self, table: str, data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """Insere dados em uma tabela"""
+        try:
+            if not self.url or not self.key:
+                return False, {'error': 'Configurações do Supabase não encontradas'}
+            
+            url = f"{self.url}/rest/v1/{table}"
+            response = await self._request('POST', url, json=data)
+            
+            if response.status_code in [200, 201]:
+                return True, response.json()[0] if response.json() else data
+            else:
+                return False, {'error': f'HTTP {response.status_code}: {response.text}'}
+        
+        except Exception as e:
+            return False, {'error': str(e) or type(e).__name__}
+    
+    @metricas.medir_supabase('insert_many')
+    async def insert_many(self, table: str, rows: List[Dict[str, Any]], on_conflict: str = None) -> Tuple[bool, Any]:
+        """Insere várias linhas em uma única requisição (bulk insert)"""
+        try:
+            if not self.url or not self.key:
+                return False, {'error': 'Configurações do Supabase não encontradas'}
+            
+            if not rows:
+                return True, []
+            
+            url = f"{self.url}/rest/v1/{table}"
+            params, headers = parametros_insert(rows, on_conflict)
+            response = await self._request('POST', url, json=rows, params=params, headers=headers)
+            
+            if response.status_code in [200, 201]:
+                return True, response.json() or rows
+            else:
+                return False, {
+                    'error': f'HTTP {response.status_code}: {response.text}',
+                    'status_code': response.status_code
+                }
+        
+        except Exception as e:
+            return False, {'error': str(e) or type(e).__name__}
+    
+    @metricas.medir_supabase('select')
+    async def select(self, table: str, filters: Dict[str, Any] = None, limit: int = 100, columns: str = '*',
+                     order: str = None, after: Any = None, ranges: Dict[str, Tuple[Any, Any]] = None) -> Tuple[bool, Any]:
+        """Seleciona dados de uma tabela (mesmos parâmetros de `SimpleSupabaseClient.select`)"""
+        try:
+            if not self.url or not self.key:
+                return False, {'error': 'Configurações do Supabase não encontradas'}
+            
+            url = f"{self.url}/rest/v1/{table}"
+            params = parametros_select(filters, limit, columns, order, after, ranges)
+            
+            response = await self._request('GET', url, params=params)
+            
+            if response.status_code == 200:
+                return True, response.json()
+            else:
+                return False, {'error': f'HTTP {response.status_code}: {response.text}'}
+        
+        except Exception as e:
+            return False, {'error': str(e) or type(e).__name__}
+    
+    @metricas.medir_supabase('count')
+    async def count(self, table: str, filters: Dict[str, Any] = None, method: str = 'exact') -> Tuple[bool, Any]:
+        """Conta as linhas de uma tabela sem transferir os dados (HEAD com `Prefer: count`)"""
+        try:
+            if not self.url or not self.key:
+                return False, {'error': 'Configurações do Supabase não encontradas'}
+            
+            url = f"{self.url}/rest/v1/{table}"
+            params = {'select': 'id', **parametros_filtros(filters)}
+            
+            response = await self._request('HEAD', url, params=params, headers={'Prefer': f'count={method}'})
+            
+            if response.status_code in [200, 206]:
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                return True, int(total)
+            else:
+                return False, {'error': f'HTTP {response.status_code}', 'status_code': response.status_code}
+        
+        except Exception as e:
+            return False, {'error': str(e) or type(e).__name__}
+    
+    @metricas.medir_supabase('rpc')
+    async def rpc(self, function: str, params: Dict[str, Any] = None) -> Tuple[bool, Any]:
+        """Executa uma função do banco exposta pelo PostgREST (/rest/v1/rpc)"""
+        try:
+            if not self.url or not self.key:
+                return False, {'error': 'Configurações do Supabase não encontradas'}
+            
+            url = f"{self.url}/rest/v1/rpc/{function}"
+            response = await self._request('POST', url, json=params or {})
+            
+            if response.status_code == 200:
+                return True, response.json()
+            else:
+                return False, {
+                    'error': f'HTTP {response.status_code}: {response.text}',
+                    'status_code': response.status_code
+                }
+        
+        except Exception as e:
+            return False, {'error': str(e) or type(e).__name__}
+    
+    @metricas.medir_supabase('test_connection')
+    async def test_connection(self) -> Tuple[bool, str]:
+        """Testa a conexão com o Supabase"""
+        if not self.url or not self.key:
+            return False, "Configurações do Supabase não encontradas"
+        
+        success, result = await self.select('nps_pesquisas', limit=1, columns='id')
+        
+        if success:
+            return True, "Conexão com Supabase estabelecida com sucesso"
+        else:
+            return False, f"Erro na conexão: {result.get('error', 'Erro desconhecido')}"
+    
+    def pool_stats(self) -> Dict[str, int]:
+        """Retorna o tamanho do pool e os contadores de requisições"""
+        return {
+            'pool_size': self.pool_size,
+            'requisicoes': self._requisicoes,
+            'em_andamento': self._em_andamento
+        }
+    
+    async def aclose(self):
+        """Fecha as conexões mantidas pelo pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaforo = None
+
+# Instância global do cliente, criada no primeiro uso
+async_supabase_client = Preguicoso('async_supabase_client', AsyncSupabaseClient)
@@ -1,11 +1,99 @@
 import os
 import requests
-from typing import Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Tuple
+from src.config import Config
+from src.services.nps_inicializacao import Preguicoso
+from src.services.nps_metricas import metricas
+
+def _valor_filtro(valor: Any) -> str:
+    # Valores dentro de or=(...) vão entre aspas por causa de ',', ':' e '()'
+    return '"' + str(valor).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def filtro_keyset(order: str, after: Any) -> Dict[str, str]:
+    """Monta o filtro do PostgREST para as linhas após `after` na ordenação `order`
+    
+    Para 'timestamp.desc,id.desc' e after=(ts, id) gera
+    or=(timestamp.lt.ts,and(timestamp.eq.ts,id.lt.id)).
+    """
+    termos = []
+    for termo in order.split(','):
+        coluna, _, direcao = termo.partition('.')
+        termos.append((coluna, 'lt' if direcao.startswith('desc') else 'gt'))
+    
+    valores = after if isinstance(after, (list, tuple)) else (after,)
+    termos = termos[:len(valores)]
+    
+    if len(termos) == 1:
+        coluna, operador = termos[0]
+        return {coluna: f'{operador}.{valores[0]}'}
+    
+    condicoes = []
+    for indice, (coluna, operador) in enumerate(termos):
+        partes = [f'{c}.eq.{_valor_filtro(v)}' for (c, _), v in zip(termos[:indice], valores[:indice])]
+        partes.append(f'{coluna}.{operador}.{_valor_filtro(valores[indice])}')
+        condicoes.append(partes[0] if len(partes) == 1 else f"and({','.join(partes)})")
+    return {'or': f"({','.join(condicoes)})"}
+
+def parametros_filtros(filters: Dict[str, Any] = None) -> Dict[str, str]:
+    """Filtros de igualdade no formato do PostgREST (coluna=eq.valor)"""
+    return {f'{key}': f'eq.{value}' for key, value in (filters or {}).items()}
+
+def parametros_insert(rows: List[Dict[str, Any]], on_conflict: str = None) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Query string e cabeçalho Prefer de um bulk insert
+    
+    O PostgREST rejeita (PGRST102) um lote cujos objetos não têm as mesmas
+    chaves, o que acontece com os campos opcionais (nome, email, comentario...).
+    Nesse caso `columns` lista a união das chaves e `missing=default` grava o
+    valor padrão da coluna (NULL, now(), o id da sequência) onde a chave falta.
+    """
+    params = {}
+    prefer = ['return=representation']
+    if on_conflict:
+        params['on_conflict'] = on_conflict
+        prefer.append('resolution=ignore-duplicates')
+    
+    chaves = set(rows[0])
+    if any(set(row) != chaves for row in rows):
+        # Ordem da primeira aparição de cada chave
+        colunas = dict.fromkeys(chave for row in rows for chave in row)
+        params['columns'] = ','.join(colunas)
+        prefer.append('missing=default')
+    return params, {'Prefer': ','.join(prefer)}
+
+def parametros_select(filters: Dict[str, Any] = None, limit: int = 100, columns: str = '*',
+                      order: str = None, after: Any = None,
+                      ranges: Dict[str, Tuple[Any, Any]] = None) -> Dict[str, Any]:
+    """Monta a query string de um select (ver `SimpleSupabaseClient.select`)"""
+    params = {'limit': limit}
+    
+    if columns and columns != '*':
+        params['select'] = columns
+    
+    params.update(parametros_filtros(filters))
+    
+    if ranges:
+        condicoes = []
+        for coluna, (inicio, fim) in ranges.items():
+            if inicio is not None:
+                condicoes.append(f'{coluna}.gte.{_valor_filtro(inicio)}')
+            if fim is not None:
+                condicoes.append(f'{coluna}.lt.{_valor_filtro(fim)}')
+        if condicoes:
+            params['and'] = f"({','.join(condicoes)})"
+    
+    if order:
+        params['order'] = order
+        if after is not None:
+            params.update(filtro_keyset(order, after))
+    
+    return params
 
 class SimpleSupabaseClient:
     """Cliente Supabase simplificado usando apenas requests"""
     
-    def __init__(self):
+    def __init__(self, pool_size: int = None, connect_timeout: float = None, read_timeout: float = None):
         self.url = os.getenv('SUPABASE_URL')
         self.key = os.getenv('SUPABASE_KEY')
         self.headers = {
@@ -14,7 +102,34 @@ class SimpleSupabaseClient:
             'Content-Type': 'application/json',
             'Prefer': 'return=representation'
         }
+        
+        # Timeouts separados: (conexão, leitura)
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else Config.SUPABASE_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else Config.SUPABASE_READ_TIMEOUT
+        )
+        
+        # Sessão compartilhada entre threads: o pool do urllib3 mantém as
+        # conexões keep-alive abertas e as reutiliza entre requisições
+        self.pool_size = pool_size or Config.SUPABASE_POOL_SIZE
+        # Sessões abertas antes de um fork, que o processo filho não deve usar nem fechar
+        self._herdadas = []
+        self._criar_sessao()
+        os.register_at_fork(after_in_child=self._reiniciar)
+    
+    def _criar_sessao(self):
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers.update(self.headers)
     
+    def _reiniciar(self):
+        # Conexões keep-alive herdadas seriam compartilhadas com o processo pai
+        self._herdadas.append(self.session)
+        self._criar_sessao()
+    
+    @metricas.medir_supabase('insert')
     def insert(self, table: str, data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
         """Insere dados em uma tabela"""
         try:
@@ -22,7 +137,7 @@ class SimpleSupabaseClient:
                 return False, {'error': 'Configurações do Supabase não encontradas'}
             
             url = f"{self.url}/rest/v1/{table}"
-            response = requests.post(url, json=data, headers=self.headers, timeout=10)
+            response = self.session.post(url, json=data, timeout=self.timeout)
             
             if response.status_code in [200, 201]:
                 return True, response.json()[0] if response.json() else data
@@ -32,20 +147,54 @@ class SimpleSupabaseClient:
         except Exception as e:
             return False, {'error': str(e)}
     
-    def select(self, table: str, filters: Dict[str, Any] = None, limit: int = 100) -> Tuple[bool, Dict[str, Any]]:
-        """Seleciona dados de uma tabela"""
+    @metricas.medir_supabase('insert_many')
+    def insert_many(self, table: str, rows: List[Dict[str, Any]], on_conflict: str = None) -> Tuple[bool, Any]:
+        """Insere várias linhas em uma única requisição (bulk insert)
+        
+        Com `on_conflict`, linhas que violam a restrição única dessa coluna são
+        ignoradas em vez de rejeitar o lote (reenvio idempotente).
+        """
         try:
             if not self.url or not self.key:
                 return False, {'error': 'Configurações do Supabase não encontradas'}
             
+            if not rows:
+                return True, []
+            
             url = f"{self.url}/rest/v1/{table}"
-            params = {'limit': limit}
+            params, headers = parametros_insert(rows, on_conflict)
+            response = self.session.post(url, json=rows, params=params, headers=headers, timeout=self.timeout)
+            
+            if response.status_code in [200, 201]:
+                return True, response.json() or rows
+            else:
+                return False, {
+                    'error': f'HTTP {response.status_code}: {response.text}',
+                    'status_code': response.status_code
+                }
+                
+        except Exception as e:
+            return False, {'error': str(e)}
+    
+    @metricas.medir_supabase('select')
+    def select(self, table: str, filters: Dict[str, Any] = None, limit: int = 100, columns: str = '*',
+               order: str = None, after: Any = None, ranges: Dict[str, Tuple[Any, Any]] = None) -> Tuple[bool, Dict[str, Any]]:
+        """Seleciona dados de uma tabela
+        
+        `order` usa a sintaxe do PostgREST (ex.: 'timestamp.desc,id.desc'). Com
+        `after` (um valor ou uma tupla com um valor por coluna de `order`),
+        retorna apenas as linhas posteriores a essa chave na ordenação
+        (paginação por chave, sem OFFSET). `ranges` mapeia coluna -> (início, fim)
+        e filtra início <= coluna < fim (qualquer lado pode ser None).
+        """
+        try:
+            if not self.url or not self.key:
+                return False, {'error': 'Configurações do Supabase não encontradas'}
             
-            if filters:
-                for key, value in filters.items():
-                    params[f'{key}'] = f'eq.{value}'
+            url = f"{self.url}/rest/v1/{table}"
+            params = parametros_select(filters, limit, columns, order, after, ranges)
             
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
+            response = self.session.get(url, params=params, timeout=self.timeout)
             
             if response.status_code == 200:
                 return True, response.json()
@@ -55,6 +204,55 @@ class SimpleSupabaseClient:
         except Exception as e:
             return False, {'error': str(e)}
     
+    @metricas.medir_supabase('count')
+    def count(self, table: str, filters: Dict[str, Any] = None, method: str = 'exact') -> Tuple[bool, Any]:
+        """Conta as linhas de uma tabela sem transferir os dados
+        
+        Faz um HEAD com `Prefer: count=<method>` e lê o total do cabeçalho
+        Content-Range. `method` pode ser 'exact', 'planned' ou 'estimated'.
+        """
+        try:
+            if not self.url or not self.key:
+                return False, {'error': 'Configurações do Supabase não encontradas'}
+            
+            url = f"{self.url}/rest/v1/{table}"
+            params = {'select': 'id', **parametros_filtros(filters)}
+            
+            response = self.session.head(url, params=params, headers={'Prefer': f'count={method}'},
+                                         timeout=self.timeout)
+            
+            if response.status_code in [200, 206]:
+                # Content-Range: 0-24/1234 ou */1234
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                return True, int(total)
+            else:
+                return False, {'error': f'HTTP {response.status_code}', 'status_code': response.status_code}
+                
+        except Exception as e:
+            return False, {'error': str(e)}
+    
+    @metricas.medir_supabase('rpc')
+    def rpc(self, function: str, params: Dict[str, Any] = None) -> Tuple[bool, Any]:
+        """Executa uma função do banco exposta pelo PostgREST (/rest/v1/rpc)"""
+        try:
+            if not self.url or not self.key:
+                return False, {'error': 'Configurações do Supabase não encontradas'}
+            
+            url = f"{self.url}/rest/v1/rpc/{function}"
+            response = self.session.post(url, json=params or {}, timeout=self.timeout)
+            
+            if response.status_code == 200:
+                return True, response.json()
+            else:
+                return False, {
+                    'error': f'HTTP {response.status_code}: {response.text}',
+                    'status_code': response.status_code
+                }
+                
+        except Exception as e:
+            return False, {'error': str(e)}
+    
+    @metricas.medir_supabase('test_connection')
     def test_connection(self) -> Tuple[bool, str]:
         """Testa a conexão com o Supabase"""
         try:
@@ -62,7 +260,7 @@ class SimpleSupabaseClient:
                 return False, "Configurações do Supabase não encontradas"
             
             # Tenta fazer uma consulta simples
-            success, result = self.select('nps_pesquisas', limit=1)
+            success, result = self.select('nps_pesquisas', limit=1, columns='id')
             
             if success:
                 return True, "Conexão com Supabase estabelecida com sucesso"
@@ -71,7 +269,45 @@ class SimpleSupabaseClient:
                 
         except Exception as e:
             return False, f"Erro na conexão: {str(e)}"
+    
+    def pre_conectar(self, conexoes: int = None) -> int:
+        """Abre até `conexoes` (padrão: o tamanho do pool) conexões keep-alive
+        
+        Faz selects de uma linha em paralelo, para que cada um ocupe uma conexão
+        do pool, e retorna quantos tiveram sucesso. As primeiras requisições
+        do app deixam de pagar o handshake TCP/TLS.
+        """
+        conexoes = min(conexoes or self.pool_size, self.pool_size)
+        with ThreadPoolExecutor(max_workers=conexoes, thread_name_prefix='nps-pre-conexao') as executor:
+            resultados = list(executor.map(
+                lambda _: self.select('nps_pesquisas', limit=1, columns='id')[0], range(conexoes)
+            ))
+        return sum(resultados)
+    
+    def pool_stats(self) -> Dict[str, int]:
+        """Retorna contadores de conexões novas e reutilizadas do pool"""
+        requisicoes = 0
+        conexoes_novas = 0
+        
+        pools = self.adapter.poolmanager.pools
+        for chave in list(pools.keys()):
+            pool = pools.get(chave)
+            if pool is None:
+                continue
+            requisicoes += pool.num_requests
+            conexoes_novas += pool.num_connections
+        
+        return {
+            'pool_size': self.pool_size,
+            'requisicoes': requisicoes,
+            'conexoes_novas': conexoes_novas,
+            'conexoes_reutilizadas': max(requisicoes - conexoes_novas, 0)
+        }
+    
+    def close(self):
+        """Fecha as conexões mantidas pelo pool"""
+        self.session.close()
 
-# Instância global do cliente
-simple_supabase_client = SimpleSupabaseClient()
+# Instância global do cliente, criada no primeiro uso
+simple_supabase_client = Preguicoso('simple_supabase_client', SimpleSupabaseClient)
 
@@ -1,22 +1,74 @@
+import logging
 import os
 import sys
+import threading
+import time
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
-from flask_cors import CORS
-from src.routes.nps_simple import nps_simple_bp
+# Cada etapa da subida é medida (GET /api/inicializacao). Serviços e clientes
+# são criados no primeiro uso: importar o app não abre conexões nem threads
+from src.services.nps_inicializacao import Preguicoso, inicializacao
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+# O .env precisa estar no ambiente antes do primeiro import de src.config
+with inicializacao.medir('dotenv'):
+    from dotenv import load_dotenv
+    load_dotenv()
 
-# Configurar CORS para permitir requisições do frontend
-CORS(app, origins="*")
+with inicializacao.medir('flask'):
+    from flask import Flask, Response, g, request, send_from_directory, jsonify
+    from flask_cors import CORS
 
-# Configurações
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+with inicializacao.medir('rotas'):
+    from src.config import Config
+    from src.routes.nps_simple import nps_simple_bp
+    from src.services.nps_estaticos import ArquivosEstaticos
+    from src.services.nps_metricas import metricas, CONTENT_TYPE as METRICAS_CONTENT_TYPE
+    from src.services.nps_service_simple import nps_service_simple
 
-# Registrar blueprints
-app.register_blueprint(nps_simple_bp, url_prefix='/api')
+logger = logging.getLogger(__name__)
+
+with inicializacao.medir('app'):
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    
+    # Configurar CORS para permitir requisições do frontend
+    CORS(app, origins="*")
+    
+    # Configurações
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+    
+    # Registrar blueprints
+    app.register_blueprint(nps_simple_bp, url_prefix='/api')
+
+# Frontend compilado, lido para a memória no primeiro acesso (ou no aquecimento)
+estaticos = Preguicoso('arquivos_estaticos', lambda: ArquivosEstaticos(
+    app.static_folder,
+    memoria_max_bytes=Config.NPS_ESTATICOS_MEMORIA_MAX_KB * 1024
+))
+
+@app.before_request
+def iniciar_medicao():
+    g.inicio_requisicao = time.perf_counter()
+
+@app.after_request
+def registrar_medicao(response):
+    """Registra duração, status e tamanho do corpo por rota (regra do Flask, não a URL)"""
+    inicio = g.pop('inicio_requisicao', None)
+    if inicio is not None:
+        rota = request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+        metricas.registrar_requisicao(rota, request.method, response.status_code,
+                                      time.perf_counter() - inicio, request.content_length)
+    return response
+
+@app.route('/api/metrics')
+def metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    return Response(metricas.texto(), content_type=METRICAS_CONTENT_TYPE)
+
+@app.route('/api/inicializacao')
+def relatorio_inicializacao():
+    """Duração de cada etapa da inicialização deste worker"""
+    return jsonify(inicializacao.dados())
 
 @app.route('/api/health')
 def health():
@@ -30,31 +82,72 @@ def health():
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    """Servir arquivos estáticos do frontend"""
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+    """Servir arquivos estáticos do frontend (da memória; rotas da SPA recebem o index.html)"""
+    if app.static_folder is None:
         return jsonify({
             'error': 'Static folder not configured',
             'message': 'Frontend não configurado'
         }), 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return jsonify({
-                'message': 'API de Pesquisas Digital Sat',
-                'endpoints': {
-                    'health': '/api/health',
-                    'nps_health': '/api/nps/health',
-                    'criar_nps': 'POST /api/nps',
-                    'listar_nps': 'GET /api/nps',
-                    'estatisticas_nps': 'GET /api/nps/estatisticas'
-                }
-            })
+    arquivo = estaticos.arquivo(path) or estaticos.index
+    if arquivo is None:
+        return jsonify({
+            'message': 'API de Pesquisas Digital Sat',
+            'endpoints': {
+                'health': '/api/health',
+                'nps_health': '/api/nps/health',
+                'criar_nps': 'POST /api/nps',
+                'listar_nps': 'GET /api/nps',
+                'estatisticas_nps': 'GET /api/nps/estatisticas'
+            }
+        })
+
+    if not arquivo.em_memoria:
+        # Acima de NPS_ESTATICOS_MEMORIA_MAX_KB: lido do disco a cada requisição
+        return send_from_directory(app.static_folder, arquivo.caminho)
+
+    variante = arquivo.variante(request.accept_encodings)
+    if request.if_none_match.contains(variante.etag):
+        return Response(status=304, headers=variante.cabecalhos_304)
+    return Response(variante.corpo, headers=variante.cabecalhos)
+
+def aquecer():
+    """Cria o serviço, abre as conexões do pool, espera a carga dos contadores e lê o frontend"""
+    try:
+        servico = nps_service_simple.obter()
+        with inicializacao.medir('aquecimento', 'aquecimento'):
+            resultado = servico.aquecer(Config.NPS_AQUECIMENTO_TEMPO_MAX_S)
+        estaticos.obter()
+        logger.info(f"Aquecimento concluído: {resultado}")
+    except Exception as e:
+        logger.error(f"Erro no aquecimento: {str(e)}")
+
+_aquecimento = None
+
+def iniciar_aquecimento():
+    """Executa `aquecer` em segundo plano
+    
+    A subida não espera o banco, e as requisições que chegarem antes do fim só
+    aguardam a criação do serviço.
+    """
+    global _aquecimento
+    _aquecimento = threading.Thread(target=aquecer, name='nps-aquecimento', daemon=True)
+    _aquecimento.start()
+
+def _aguardar_aquecimento():
+    # Um fork no meio do aquecimento (gunicorn --preload) levaria aos workers
+    # imports pela metade; cada worker descarta as instâncias herdadas e aquece
+    # de novo ao nascer. A espera é limitada: um banco que não responde não
+    # pode travar a criação dos workers
+    if _aquecimento is not None:
+        _aquecimento.join(Config.NPS_AQUECIMENTO_TEMPO_MAX_S)
+
+metricas.registrar_coletor(inicializacao.medicoes)
+logger.info(f"App carregado ({inicializacao.resumo()})")
+
+if Config.NPS_AQUECIMENTO:
+    iniciar_aquecimento()
+    os.register_at_fork(before=_aguardar_aquecimento, after_in_child=iniciar_aquecimento)
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,289 @@
+"""
+Entrada ASGI da API de Pesquisas Digital Sat.
+
+As rotas de maior volume (POST/GET /api/nps, /api/nps/estatisticas e os
+health checks) são atendidas por corrotinas com o cliente Supabase
+assíncrono: uma requisição aguardando o PostgREST não prende um worker, e um
+único processo sustenta milhares de requisições em andamento. As demais rotas
+(exportação, tendência, recibos, arquivos do frontend...) são repassadas ao
+app Flask de `main.py`, com o mesmo contrato de requisição e resposta.
+
+Execução:
+    uvicorn src.main_asgi:app --host 0.0.0.0 --port 5001
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import json
+import logging
+import time
+from urllib.parse import parse_qsl
+
+from werkzeug.http import parse_etags, quote_etag
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    # Implementação WSGI do próprio uvicorn (obsoleta, mas sem dependência extra)
+    import warnings
+    warnings.filterwarnings('ignore', category=DeprecationWarning, module='uvicorn.middleware.wsgi')
+    from uvicorn.middleware.wsgi import WSGIMiddleware
+
+# O .env precisa estar no ambiente antes do primeiro import de src.config
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.config import Config
+from src.main import app as flask_app
+from src.routes.nps_simple import ip_cliente
+from src.database.supabase_client_async import async_supabase_client
+from src.services.nps_service_async import nps_service_async
+from src.services.nps_service_simple import nps_service_simple
+from src.services.nps_metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+class _Requisicao:
+    def __init__(self, scope, corpo: bytes):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.client = (scope.get('client') or ('-', 0))[0]
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        self.headers = {nome.decode('latin-1').lower(): valor.decode('latin-1') for nome, valor in scope['headers']}
+        self.corpo = corpo
+    
+    def arg_int(self, nome: str, padrao: int) -> int:
+        # Mesmo comportamento de request.args.get(nome, padrao, type=int)
+        try:
+            return int(self.args[nome])
+        except (KeyError, ValueError):
+            return padrao
+    
+    @property
+    def is_json(self) -> bool:
+        mimetype = self.headers.get('content-type', '').split(';')[0].strip().lower()
+        return mimetype == 'application/json' or (mimetype.startswith('application/') and mimetype.endswith('+json'))
+    
+    def etag_confere(self, etag: str) -> bool:
+        return bool(etag) and parse_etags(self.headers.get('if-none-match')).contains(etag)
+    
+    def filial(self):
+        """Filial da requisição (query string ou corpo JSON), para o controle de admissão"""
+        filial = self.args.get('filial')
+        if self.method == 'POST' and self.is_json:
+            try:
+                corpo = json.loads(self.corpo)
+            except ValueError:
+                corpo = None
+            if isinstance(corpo, dict):
+                filial = corpo.get('filial')
+        return filial if isinstance(filial, str) else None
+
+def _json(status: int, dados, headers=None):
+    return status, dados, headers or {}
+
+def _erro_interno(endpoint: str, e: Exception):
+    logger.error(f"Erro no endpoint {endpoint}: {str(e)}")
+    return _json(500, {
+        'success': False,
+        'message': 'Erro interno do servidor',
+        'error': str(e)
+    })
+
+def _cabecalhos_etag(etag):
+    return {'ETag': quote_etag(etag), 'Cache-Control': 'no-cache'} if etag else {}
+
+async def health(requisicao):
+    """Endpoint de saúde geral da API"""
+    return _json(200, {
+        'status': 'ok',
+        'message': 'API de Pesquisas Digital Sat funcionando',
+        'version': '1.0.0'
+    })
+
+async def criar_pesquisa_nps(requisicao):
+    """Endpoint para criar uma nova pesquisa NPS"""
+    try:
+        if not requisicao.is_json:
+            return _json(400, {
+                'success': False,
+                'message': 'Content-Type deve ser application/json',
+                'error': 'Invalid content type'
+            })
+        
+        dados = json.loads(requisicao.corpo) if requisicao.corpo else None
+        
+        if not dados:
+            return _json(400, {
+                'success': False,
+                'message': 'Nenhum dado foi enviado',
+                'error': 'Empty request body'
+            })
+        
+        resultado, repetida = await nps_service_async.receber_pesquisa(
+            dados, requisicao.headers.get('idempotency-key')
+        )
+        
+        status_code = resultado.status_code or (201 if resultado.success else 400)
+        
+        return _json(status_code, resultado.to_dict(), {'Idempotent-Replayed': 'true'} if repetida else None)
+    
+    except Exception as e:
+        return _erro_interno('criar_pesquisa_nps', e)
+
+async def listar_pesquisas_nps(requisicao):
+    """Endpoint para listar pesquisas NPS"""
+    try:
+        filial = requisicao.args.get('filial')
+        limite = min(max(requisicao.arg_int('limite', 100), 1), 1000)
+        cursor = requisicao.args.get('cursor')
+        
+        etag = await nps_service_async.etag('listar', filial, limite=limite, cursor=cursor)
+        if requisicao.etag_confere(etag):
+            return _json(304, None, _cabecalhos_etag(etag))
+        
+        resultado = await nps_service_async.listar_pesquisas(filial=filial, limite=limite, cursor=cursor)
+        
+        if not resultado.success:
+            return _json(400, resultado.to_dict())
+        return _json(200, resultado.to_dict(), _cabecalhos_etag(etag))
+    
+    except Exception as e:
+        return _erro_interno('listar_pesquisas_nps', e)
+
+async def obter_estatisticas_nps(requisicao):
+    """Endpoint para obter estatísticas das pesquisas NPS"""
+    try:
+        filial = requisicao.args.get('filial')
+        
+        etag = await nps_service_async.etag('estatisticas', filial)
+        if requisicao.etag_confere(etag):
+            return _json(304, None, _cabecalhos_etag(etag))
+        
+        resultado = await nps_service_async.obter_estatisticas(filial=filial)
+        
+        if not resultado.success:
+            return _json(400, resultado.to_dict())
+        return _json(200, resultado.to_dict(), _cabecalhos_etag(etag))
+    
+    except Exception as e:
+        return _erro_interno('obter_estatisticas_nps', e)
+
+async def health_check(requisicao):
+    """Endpoint para verificar saúde da API (responde do último resultado da sonda do banco)"""
+    try:
+        saude = nps_service_simple.saude.estado()
+        
+        return _json(200, {
+            'success': True,
+            'message': 'API NPS funcionando',
+            'database_status': saude['status'],
+            'database_message': saude['mensagem'],
+            'database_check': saude,
+            'database_pool': async_supabase_client.pool_stats(),
+            'admissao': nps_service_simple.admissao.estatisticas() if nps_service_simple.admissao else None,
+            'snapshot': nps_service_simple.snapshot.estatisticas() if nps_service_simple.snapshot else None
+        })
+    
+    except Exception as e:
+        logger.error(f"Erro no health check: {str(e)}")
+        return _json(500, {
+            'success': False,
+            'message': 'Erro no health check',
+            'error': str(e)
+        })
+
+async def liveness_check(requisicao):
+    """Endpoint de liveness: confirma que o processo responde, sem tocar no banco"""
+    return _json(200, {'status': 'ok'})
+
+# Rotas atendidas de forma nativa; o restante segue para o app Flask
+# (que aplica o controle de admissão nas próprias rotas)
+ROTAS = {
+    ('GET', '/api/health'): health,
+    ('POST', '/api/nps'): criar_pesquisa_nps,
+    ('GET', '/api/nps'): listar_pesquisas_nps,
+    ('GET', '/api/nps/estatisticas'): obter_estatisticas_nps,
+    ('GET', '/api/nps/health'): health_check,
+    ('GET', '/api/nps/health/live'): liveness_check,
+}
+
+# O cliente assíncrono só fala com o Supabase: com outro armazenamento, as
+# rotas que consultam o banco seguem para o app Flask
+if Config.NPS_ARMAZENAMENTO != 'supabase':
+    ROTAS = {chave: rota for chave, rota in ROTAS.items() if rota in (health, liveness_check)}
+
+# Mesmas exceções do controle de admissão do blueprint Flask
+ROTAS_SEM_ADMISSAO = {health, health_check, liveness_check}
+
+_flask_asgi = WSGIMiddleware(flask_app)
+
+async def _executar(rota, requisicao):
+    admissao = nps_service_simple.admissao
+    if admissao is None or rota in ROTAS_SEM_ADMISSAO:
+        return await rota(requisicao)
+    
+    recusa = admissao.admitir(ip_cliente(requisicao.client, requisicao.headers.get('x-forwarded-for')),
+                              requisicao.filial())
+    if recusa is not None:
+        return _json(recusa.status_code, recusa.to_dict(), recusa.headers)
+    try:
+        return await rota(requisicao)
+    finally:
+        admissao.liberar()
+
+async def _ler_corpo(receive) -> bytes:
+    partes = []
+    while True:
+        mensagem = await receive()
+        partes.append(mensagem.get('body', b''))
+        if not mensagem.get('more_body'):
+            return b''.join(partes)
+
+async def _lifespan(receive, send):
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif mensagem['type'] == 'lifespan.shutdown':
+            if async_supabase_client.carregado:
+                await async_supabase_client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    """Aplicação ASGI"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    
+    rota = ROTAS.get((scope.get('method'), scope.get('path', '').rstrip('/') or '/'))
+    if scope['type'] != 'http' or rota is None:
+        return await _flask_asgi(scope, receive, send)
+    
+    inicio = time.perf_counter()
+    requisicao = _Requisicao(scope, await _ler_corpo(receive))
+    status, dados, headers = await _executar(rota, requisicao)
+    
+    # Mesmos cabeçalhos CORS do Flask-CORS (origins="*")
+    cabecalhos = [(b'access-control-allow-origin', b'*')]
+    cabecalhos += [(nome.lower().encode('latin-1'), valor.encode('latin-1')) for nome, valor in headers.items()]
+    corpo = b''
+    if dados is not None:
+        corpo = (json.dumps(dados, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+        cabecalhos.append((b'content-type', b'application/json'))
+    cabecalhos.append((b'content-length', str(len(corpo)).encode('latin-1')))
+    
+    await send({'type': 'http.response.start', 'status': status, 'headers': cabecalhos})
+    await send({'type': 'http.response.body', 'body': corpo})
+    
+    # As rotas repassadas ao Flask são medidas pelo próprio app Flask
+    metricas.registrar_requisicao(requisicao.path.rstrip('/') or '/', requisicao.method, status,
+                                  time.perf_counter() - inicio, len(requisicao.corpo))
+
+if __name__ == '__main__':
+    import uvicorn
+    
+    port = int(os.getenv('PORT', 5001))
+    print("🚀 Iniciando API de Pesquisas Digital Sat (ASGI)...")
+    uvicorn.run(app, host='0.0.0.0', port=port)
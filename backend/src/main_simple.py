@@ -3,6 +3,10 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
+# O .env precisa estar no ambiente antes do primeiro import de src.config
+from dotenv import load_dotenv
+load_dotenv()
+
 from flask import Flask, send_from_directory, jsonify
 from flask_cors import CORS
 from src.routes.nps_simple import nps_simple_bp
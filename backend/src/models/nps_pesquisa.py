@@ -1,7 +1,9 @@
 from datetime import datetime
 from typing import Optional, Dict, Any
 from pydantic import BaseModel, validator, Field
-import re
+from src.models.nps_pesquisa_simple import (
+    EMAIL_REGEX, NAO_DIGITOS_REGEX, CNPJ_FORMATADO_REGEX, TELEFONE_FORMATADO_REGEX, categorizar_score
+)
 
 class NPSPesquisaModel(BaseModel):
     """Modelo para validação de dados de pesquisa NPS"""
@@ -22,45 +24,34 @@ class NPSPesquisaModel(BaseModel):
     
     @validator('email')
     def validate_email(cls, v):
-        if v and v.strip():
-            email_pattern = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
-            if not re.match(email_pattern, v):
-                raise ValueError('Email inválido')
+        if v and v.strip() and not EMAIL_REGEX.match(v):
+            raise ValueError('Email inválido')
         return v
     
     @validator('cnpj')
     def validate_cnpj(cls, v):
-        if v and v.strip():
-            # Remove caracteres especiais
-            cnpj_clean = re.sub(r'[^\d]', '', v)
-            if len(cnpj_clean) != 14:
-                raise ValueError('CNPJ deve ter 14 dígitos')
+        if v and v.strip() and not CNPJ_FORMATADO_REGEX.fullmatch(v.strip()) and len(NAO_DIGITOS_REGEX.sub('', v)) != 14:
+            raise ValueError('CNPJ deve ter 14 dígitos')
         return v
     
     @validator('telefone')
     def validate_telefone(cls, v):
-        if v and v.strip():
-            # Remove caracteres especiais
-            tel_clean = re.sub(r'[^\d]', '', v)
-            if len(tel_clean) < 10 or len(tel_clean) > 11:
-                raise ValueError('Telefone deve ter 10 ou 11 dígitos')
+        if (v and v.strip() and not TELEFONE_FORMATADO_REGEX.fullmatch(v.strip())
+                and not 10 <= len(NAO_DIGITOS_REGEX.sub('', v)) <= 11):
+            raise ValueError('Telefone deve ter 10 ou 11 dígitos')
         return v
     
     def to_dict(self) -> Dict[str, Any]:
         """Converte o modelo para dicionário para inserção no banco"""
-        data = self.dict(exclude_none=True)
+        # No Pydantic 2, .dict() emite um aviso de depreciação a cada chamada
+        data = self.model_dump(exclude_none=True) if hasattr(self, 'model_dump') else self.dict(exclude_none=True)
         
         # Adiciona timestamp se não existir
         if 'timestamp' not in data or data['timestamp'] is None:
             data['timestamp'] = datetime.utcnow().isoformat()
         
         # Determina categoria NPS
-        if self.score >= 9:
-            data['categoria_nps'] = 'promotor'
-        elif self.score >= 7:
-            data['categoria_nps'] = 'neutro'
-        else:
-            data['categoria_nps'] = 'detrator'
+        data['categoria_nps'] = categorizar_score(self.score)
         
         return data
 
@@ -68,6 +59,7 @@ class NPSPesquisaResponse(BaseModel):
     """Modelo para resposta da API"""
     success: bool
     message: str
-    data: Optional[Dict[str, Any]] = None
+    data: Optional[Any] = None
     error: Optional[str] = None
+    next_cursor: Optional[str] = None
 
@@ -1,9 +1,49 @@
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 import re
 
+# Padrões compilados uma vez no import (também usados pelo modelo Pydantic)
+EMAIL_REGEX = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+NAO_DIGITOS_REGEX = re.compile(r'[^\d]')
+# Formatos usuais de CNPJ (14 dígitos) e telefone (10 ou 11 dígitos): quando
+# casam, dispensam a contagem de dígitos com NAO_DIGITOS_REGEX
+CNPJ_FORMATADO_REGEX = re.compile(r'\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}')
+TELEFONE_FORMATADO_REGEX = re.compile(r'\(?\d{2}\)? ?\d{4,5}-?\d{4}')
+
+def categorizar_score(score: int) -> str:
+    """Retorna a categoria NPS de um score de 0 a 10"""
+    if score >= 9:
+        return 'promotor'
+    elif score >= 7:
+        return 'neutro'
+    return 'detrator'
+
+def montar_estatisticas(promotores: int, neutros: int, detratores: int) -> Dict[str, Any]:
+    """Monta o dicionário de estatísticas NPS a partir das contagens por categoria"""
+    total = promotores + neutros + detratores
+    
+    # Calcular NPS Score
+    nps_score = ((promotores - detratores) / total) * 100 if total > 0 else 0
+    
+    return {
+        'total': total,
+        'promotores': promotores,
+        'neutros': neutros,
+        'detratores': detratores,
+        'nps_score': round(nps_score, 2),
+        'percentual_promotores': round((promotores / total) * 100, 2) if total > 0 else 0,
+        'percentual_neutros': round((neutros / total) * 100, 2) if total > 0 else 0,
+        'percentual_detratores': round((detratores / total) * 100, 2) if total > 0 else 0
+    }
+
 class NPSPesquisaSimple:
-    """Modelo simplificado para validação de dados de pesquisa NPS"""
+    """Modelo simplificado para validação de dados de pesquisa NPS
+    
+    `validate` normaliza os campos uma única vez e guarda a linha pronta para
+    inserção, que `to_dict` reaproveita.
+    """
+    
+    __slots__ = ('filial', 'score', 'nome', 'email', 'telefone', 'cnpj', 'comentario', 'timestamp', '_dados')
     
     def __init__(self, **kwargs):
         self.filial = kwargs.get('filial', '')
@@ -14,42 +54,43 @@ class NPSPesquisaSimple:
         self.cnpj = kwargs.get('cnpj', '')
         self.comentario = kwargs.get('comentario', '')
         self.timestamp = kwargs.get('timestamp')
+        self._dados = None
     
     def validate(self) -> tuple[bool, str]:
         """Valida os dados da pesquisa"""
+        self._dados = None
         
         # Validar campos obrigatórios
-        if not self.filial or not self.filial.strip():
+        filial = self.filial.strip() if self.filial else ''
+        if not filial:
             return False, "Filial é obrigatória"
         
         if self.score is None:
             return False, "Score é obrigatório"
         
         try:
-            score_int = int(self.score)
-            if score_int < 0 or score_int > 10:
-                return False, "Score deve estar entre 0 e 10"
-            self.score = score_int
+            score = int(self.score)
         except (ValueError, TypeError):
             return False, "Score deve ser um número entre 0 e 10"
+        if score < 0 or score > 10:
+            return False, "Score deve estar entre 0 e 10"
+        self.score = score
         
         # Validar email se fornecido
-        if self.email and self.email.strip():
-            email_pattern = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
-            if not re.match(email_pattern, self.email):
-                return False, "Email inválido"
+        email = self.email.strip() if self.email else ''
+        if email and not EMAIL_REGEX.match(self.email):
+            return False, "Email inválido"
         
         # Validar CNPJ se fornecido
-        if self.cnpj and self.cnpj.strip():
-            cnpj_clean = re.sub(r'[^\d]', '', self.cnpj)
-            if len(cnpj_clean) != 14:
-                return False, "CNPJ deve ter 14 dígitos"
+        cnpj = self.cnpj.strip() if self.cnpj else ''
+        if cnpj and not CNPJ_FORMATADO_REGEX.fullmatch(cnpj) and len(NAO_DIGITOS_REGEX.sub('', cnpj)) != 14:
+            return False, "CNPJ deve ter 14 dígitos"
         
         # Validar telefone se fornecido
-        if self.telefone and self.telefone.strip():
-            tel_clean = re.sub(r'[^\d]', '', self.telefone)
-            if len(tel_clean) < 10 or len(tel_clean) > 11:
-                return False, "Telefone deve ter 10 ou 11 dígitos"
+        telefone = self.telefone.strip() if self.telefone else ''
+        if (telefone and not TELEFONE_FORMATADO_REGEX.fullmatch(telefone)
+                and not 10 <= len(NAO_DIGITOS_REGEX.sub('', telefone)) <= 11):
+            return False, "Telefone deve ter 10 ou 11 dígitos"
         
         # Validar tamanhos
         if len(self.filial) > 50:
@@ -64,56 +105,75 @@ class NPSPesquisaSimple:
         if self.comentario and len(self.comentario) > 500:
             return False, "Comentário deve ter no máximo 500 caracteres"
         
-        return True, "Dados válidos"
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Converte o modelo para dicionário para inserção no banco"""
-        
-        # Adiciona timestamp se não existir
+        # Linha para inserção no banco, com os campos já normalizados
         if not self.timestamp:
             self.timestamp = datetime.utcnow().isoformat()
         
-        # Determina categoria NPS
-        if self.score >= 9:
-            categoria_nps = 'promotor'
-        elif self.score >= 7:
-            categoria_nps = 'neutro'
-        else:
-            categoria_nps = 'detrator'
-        
-        data = {
-            'filial': self.filial.strip(),
-            'score': self.score,
-            'categoria_nps': categoria_nps,
+        dados = {
+            'filial': filial,
+            'score': score,
+            'categoria_nps': categorizar_score(score),
             'timestamp': self.timestamp
         }
         
         # Adicionar campos opcionais apenas se não estiverem vazios
-        if self.nome and self.nome.strip():
-            data['nome'] = self.nome.strip()
-        
-        if self.email and self.email.strip():
-            data['email'] = self.email.strip()
-        
-        if self.telefone and self.telefone.strip():
-            data['telefone'] = self.telefone.strip()
-        
-        if self.cnpj and self.cnpj.strip():
-            data['cnpj'] = self.cnpj.strip()
-        
-        if self.comentario and self.comentario.strip():
-            data['comentario'] = self.comentario.strip()
-        
-        return data
+        nome = self.nome.strip() if self.nome else ''
+        if nome:
+            dados['nome'] = nome
+        if email:
+            dados['email'] = email
+        if telefone:
+            dados['telefone'] = telefone
+        if cnpj:
+            dados['cnpj'] = cnpj
+        comentario = self.comentario.strip() if self.comentario else ''
+        if comentario:
+            dados['comentario'] = comentario
+        
+        self._dados = dados
+        return True, "Dados válidos"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte o modelo para dicionário para inserção no banco"""
+        if self._dados is None:
+            valido, mensagem = self.validate()
+            if not valido:
+                raise ValueError(mensagem)
+        return dict(self._dados)
+
+def validar_pesquisas(itens: Iterable[Any]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """Valida várias pesquisas em uma chamada
+    
+    Retorna, na ordem recebida, (linha para inserção, None) para cada item
+    válido e (None, mensagem de erro) para os demais.
+    """
+    resultados = []
+    for item in itens:
+        if not isinstance(item, dict):
+            resultados.append((None, "Item deve ser um objeto JSON"))
+            continue
+        try:
+            pesquisa = NPSPesquisaSimple(**item)
+            valido, mensagem = pesquisa.validate()
+        except Exception as e:
+            resultados.append((None, f"Item inválido: {str(e)}"))
+            continue
+        resultados.append((pesquisa._dados, None) if valido else (None, mensagem))
+    return resultados
 
 class NPSResponse:
     """Classe para padronizar respostas da API"""
     
-    def __init__(self, success: bool, message: str, data: Any = None, error: str = None):
+    def __init__(self, success: bool, message: str, data: Any = None, error: str = None, status_code: int = None,
+                 next_cursor: str = None, headers: Dict[str, str] = None):
         self.success = success
         self.message = message
         self.data = data
         self.error = error
+        self.next_cursor = next_cursor
+        # Status HTTP e cabeçalhos sugeridos para a rota (não são serializados)
+        self.status_code = status_code
+        self.headers = headers
     
     def to_dict(self) -> Dict[str, Any]:
         result = {
@@ -127,5 +187,8 @@ class NPSResponse:
         if self.error is not None:
             result['error'] = self.error
         
+        if self.next_cursor is not None:
+            result['next_cursor'] = self.next_cursor
+        
         return result
 
@@ -56,13 +56,16 @@ def listar_pesquisas_nps():
         # Obter parâmetros de query
         filial = request.args.get('filial')
         limite = request.args.get('limite', 100, type=int)
+        cursor = request.args.get('cursor')
         
         # Validar limite
         if limite > 1000:
             limite = 1000
+        if limite < 1:
+            limite = 1
         
         # Listar pesquisas usando o serviço
-        resultado = nps_service.listar_pesquisas(filial=filial, limite=limite)
+        resultado = nps_service.listar_pesquisas(filial=filial, limite=limite, cursor=cursor)
         
         status_code = 200 if resultado.success else 400
         
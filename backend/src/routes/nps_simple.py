@@ -1,7 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, g, request, jsonify, send_file, stream_with_context
 from flask_cors import cross_origin
+from src.config import Config
+from src.services.nps_estaticos import qualidades_codificacao
 from src.services.nps_service_simple import nps_service_simple
+import csv
+import io
+import json
 import logging
+import time
+import zlib
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -9,6 +16,88 @@ logger = logging.getLogger(__name__)
 # Criar blueprint para rotas NPS
 nps_simple_bp = Blueprint('nps_simple', __name__)
 
+# Rotas fora do controle de admissão (sondas do balanceador)
+_ROTAS_SEM_ADMISSAO = {'nps_simple.health_check', 'nps_simple.liveness_check'}
+
+def ip_cliente(remote_addr, x_forwarded_for=None):
+    """IP do cliente; atrás de proxy (NPS_ADMISSAO_CONFIAR_PROXY) o primeiro de X-Forwarded-For"""
+    if Config.NPS_ADMISSAO_CONFIAR_PROXY and x_forwarded_for:
+        return x_forwarded_for.split(',')[0].strip()
+    return remote_addr or '-'
+
+@nps_simple_bp.before_request
+def admitir_requisicao():
+    """Aplica os limites por IP/filial e de requisições em andamento antes da rota"""
+    admissao = nps_service_simple.admissao
+    if admissao is None or request.method == 'OPTIONS' or request.endpoint in _ROTAS_SEM_ADMISSAO:
+        return None
+    
+    filial = request.args.get('filial')
+    if request.method == 'POST':
+        corpo = request.get_json(silent=True)
+        if isinstance(corpo, dict):
+            filial = corpo.get('filial')
+    
+    recusa = admissao.admitir(ip_cliente(request.remote_addr, request.headers.get('X-Forwarded-For')),
+                              filial if isinstance(filial, str) else None)
+    if recusa is not None:
+        return jsonify(recusa.to_dict()), recusa.status_code, recusa.headers
+    g.nps_admitida = True
+    return None
+
+@nps_simple_bp.teardown_request
+def liberar_admissao(exc):
+    if g.pop('nps_admitida', False):
+        nps_service_simple.admissao.liberar()
+
+# Cabeçalho que pede o perfil da requisição (valor: NPS_PERFIL_TOKEN)
+CABECALHO_PERFIL = 'X-NPS-Profile'
+
+# As consultas aos perfis não são perfiladas
+_ROTAS_SEM_PERFIL = {'nps_simple.listar_perfis', 'nps_simple.baixar_perfil'}
+
+def iniciar_perfil():
+    """Liga o cProfile para a requisição pedida pelo cabeçalho ou sorteada na amostragem"""
+    if request.endpoint in _ROTAS_SEM_PERFIL:
+        return None
+    motivo = nps_service_simple.perfilador.motivo(request.headers.get(CABECALHO_PERFIL))
+    if motivo is not None:
+        g.nps_perfil = (nps_service_simple.perfilador.iniciar(), motivo, time.perf_counter())
+    return None
+
+def encerrar_perfil(resposta):
+    """Grava o perfil da requisição e informa o id em X-Profile-Id"""
+    item = g.pop('nps_perfil', None)
+    if item is None:
+        return resposta
+    
+    perfil, motivo, inicio = item
+    perfil.disable()
+    perfilador = nps_service_simple.perfilador
+    perfil_id = perfilador.id_requisicao(request.headers.get('X-Request-ID'))
+    perfilador.salvar(perfil, perfil_id, {
+        'rota': request.url_rule.rule if request.url_rule is not None else request.path,
+        'metodo': request.method,
+        'status': resposta.status_code,
+        'duracao_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        'motivo': motivo
+    })
+    resposta.headers['X-Profile-Id'] = perfil_id
+    return resposta
+
+def descartar_perfil(exc):
+    # Requisição interrompida antes do after_request: só desliga o profiler
+    item = g.pop('nps_perfil', None)
+    if item is not None:
+        item[0].disable()
+
+# Sem perfilamento ativo os ganchos nem são instalados (custo zero por requisição).
+# Decidido pela configuração, sem criar o serviço na importação do blueprint
+if Config.NPS_PERFIL_ATIVO:
+    nps_simple_bp.before_request(iniciar_perfil)
+    nps_simple_bp.after_request(encerrar_perfil)
+    nps_simple_bp.teardown_request(descartar_perfil)
+
 @nps_simple_bp.route('/nps', methods=['POST'])
 @cross_origin()
 def criar_pesquisa_nps():
@@ -32,22 +121,84 @@ def criar_pesquisa_nps():
                 'error': 'Empty request body'
             }), 400
         
-        # Criar pesquisa usando o serviço
-        resultado = nps_service_simple.criar_pesquisa(dados)
+        # Criar pesquisa usando o serviço (ou enfileirar, no modo em lote);
+        # reenvios recebem a resposta original sem gravar de novo
+        resultado, repetida = nps_service_simple.receber_pesquisa(dados, request.headers.get('Idempotency-Key'))
         
         # Determinar status code baseado no resultado
-        status_code = 201 if resultado.success else 400
+        status_code = resultado.status_code or (201 if resultado.success else 400)
+        
+        resposta = jsonify(resultado.to_dict())
+        if repetida:
+            resposta.headers['Idempotent-Replayed'] = 'true'
+        return resposta, status_code
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint criar_pesquisa_nps: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor',
+            'error': str(e)
+        }), 500
+
+@nps_simple_bp.route('/nps/lote', methods=['POST'])
+@cross_origin()
+def criar_pesquisas_lote_nps():
+    """Endpoint para enviar várias pesquisas NPS de uma vez (coletores offline)"""
+    try:
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'message': 'Content-Type deve ser application/json',
+                'error': 'Invalid content type'
+            }), 400
+        
+        resultado = nps_service_simple.criar_pesquisas_lote(request.get_json())
+        
+        status_code = resultado.status_code or (201 if resultado.success else 500)
         
         return jsonify(resultado.to_dict()), status_code
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint criar_pesquisas_lote_nps: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor',
+            'error': str(e)
+        }), 500
+
+@nps_simple_bp.route('/nps/recibos/<recibo>', methods=['GET'])
+@cross_origin()
+def status_recibo_nps(recibo):
+    """Endpoint para consultar o status de uma pesquisa enviada em modo lote"""
+    try:
+        resultado = nps_service_simple.status_recibo(recibo)
+        
+        status_code = resultado.status_code or (200 if resultado.success else 400)
         
+        return jsonify(resultado.to_dict()), status_code
+    
     except Exception as e:
-        logger.error(f"Erro no endpoint criar_pesquisa_nps: {str(e)}")
+        logger.error(f"Erro no endpoint status_recibo_nps: {str(e)}")
         return jsonify({
             'success': False,
             'message': 'Erro interno do servidor',
             'error': str(e)
         }), 500
 
+def _nao_modificado(etag):
+    """Resposta 304 sem corpo para um If-None-Match que confere"""
+    resposta = Response(status=304)
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
+def _com_etag(resposta, etag):
+    if etag:
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
 @nps_simple_bp.route('/nps', methods=['GET'])
 @cross_origin()
 def listar_pesquisas_nps():
@@ -56,18 +207,28 @@ def listar_pesquisas_nps():
         # Obter parâmetros de query
         filial = request.args.get('filial')
         limite = request.args.get('limite', 100, type=int)
+        cursor = request.args.get('cursor')
         
         # Validar limite
         if limite > 1000:
             limite = 1000
+        if limite < 1:
+            limite = 1
+        
+        # Responder 304 antes de consultar o banco se o cliente já tem esta versão
+        etag = nps_service_simple.etag('listar', filial, limite=limite, cursor=cursor)
+        if etag and request.if_none_match.contains(etag):
+            return _nao_modificado(etag)
         
         # Listar pesquisas usando o serviço
-        resultado = nps_service_simple.listar_pesquisas(filial=filial, limite=limite)
+        resultado = nps_service_simple.listar_pesquisas(filial=filial, limite=limite, cursor=cursor)
         
         status_code = 200 if resultado.success else 400
         
-        return jsonify(resultado.to_dict()), status_code
-        
+        if not resultado.success:
+            return jsonify(resultado.to_dict()), status_code
+        return _com_etag(jsonify(resultado.to_dict()), etag), status_code
+    
     except Exception as e:
         logger.error(f"Erro no endpoint listar_pesquisas_nps: {str(e)}")
         return jsonify({
@@ -76,6 +237,99 @@ def listar_pesquisas_nps():
             'error': str(e)
         }), 500
 
+# Colunas da exportação CSV, na ordem da tabela nps_pesquisas
+COLUNAS_EXPORTACAO = [
+    'id', 'filial', 'score', 'categoria_nps', 'nome', 'email',
+    'telefone', 'cnpj', 'comentario', 'timestamp', 'created_at'
+]
+
+def _codificar_ndjson(paginas):
+    for pagina in paginas:
+        yield ''.join(json.dumps(linha, ensure_ascii=False) + '\n' for linha in pagina).encode('utf-8')
+
+def _codificar_csv(paginas):
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=COLUNAS_EXPORTACAO, extrasaction='ignore')
+    escritor.writeheader()
+    for pagina in paginas:
+        escritor.writerows(pagina)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def _comprimir_gzip(blocos):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloco in blocos:
+        comprimido = compressor.compress(bloco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+def _interromper_em_erro(blocos):
+    # Depois que o streaming começou não dá para mudar o status: registra e
+    # propaga, para o servidor cortar a conexão sem o chunk final (nem o trailer
+    # do gzip) e o cliente ver a transferência incompleta, não um arquivo truncado
+    try:
+        yield from blocos
+    except Exception as e:
+        logger.error(f"Erro durante a exportação NPS: {str(e)}")
+        raise
+
+@nps_simple_bp.route('/nps/export', methods=['GET'])
+@cross_origin()
+def exportar_pesquisas_nps():
+    """Endpoint para exportar todas as pesquisas NPS em NDJSON ou CSV (streaming)"""
+    try:
+        formato = request.args.get('format', 'ndjson')
+        if formato not in ('ndjson', 'csv'):
+            return jsonify({
+                'success': False,
+                'message': 'Parâmetros inválidos',
+                'error': 'format deve ser ndjson ou csv'
+            }), 400
+        
+        try:
+            paginas = nps_service_simple.exportar_pesquisas(
+                filial=request.args.get('filial'),
+                de=request.args.get('de'),
+                ate=request.args.get('ate')
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': 'Parâmetros inválidos',
+                'error': str(e)
+            }), 400
+        
+        if formato == 'csv':
+            blocos = _codificar_csv(paginas)
+            mimetype = 'text/csv'
+        else:
+            blocos = _codificar_ndjson(paginas)
+            mimetype = 'application/x-ndjson'
+        
+        blocos = _interromper_em_erro(blocos)
+        headers = {
+            'Content-Disposition': f'attachment; filename=nps_pesquisas.{formato}',
+            'Vary': 'Accept-Encoding'
+        }
+        
+        if qualidades_codificacao(request.accept_encodings)('gzip') > 0:
+            blocos = _comprimir_gzip(blocos)
+            headers['Content-Encoding'] = 'gzip'
+        
+        return Response(stream_with_context(blocos), mimetype=mimetype, headers=headers)
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint exportar_pesquisas_nps: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor',
+            'error': str(e)
+        }), 500
+
 @nps_simple_bp.route('/nps/estatisticas', methods=['GET'])
 @cross_origin()
 def obter_estatisticas_nps():
@@ -84,15 +338,110 @@ def obter_estatisticas_nps():
         # Obter parâmetros de query
         filial = request.args.get('filial')
         
+        # Responder 304 antes de consultar o banco se o cliente já tem esta versão
+        etag = nps_service_simple.etag('estatisticas', filial)
+        if etag and request.if_none_match.contains(etag):
+            return _nao_modificado(etag)
+        
         # Obter estatísticas usando o serviço
         resultado = nps_service_simple.obter_estatisticas(filial=filial)
         
         status_code = 200 if resultado.success else 400
         
+        if not resultado.success:
+            return jsonify(resultado.to_dict()), status_code
+        return _com_etag(jsonify(resultado.to_dict()), etag), status_code
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint obter_estatisticas_nps: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor',
+            'error': str(e)
+        }), 500
+
+@nps_simple_bp.route('/nps/estatisticas/filiais', methods=['GET'])
+@cross_origin()
+def obter_estatisticas_filiais_nps():
+    """Endpoint para comparar as estatísticas de todas as filiais"""
+    try:
+        # Responder 304 antes de consultar o banco se o cliente já tem esta versão
+        etag = nps_service_simple.etag('estatisticas_filiais', None)
+        if etag and request.if_none_match.contains(etag):
+            return _nao_modificado(etag)
+        
+        resultado = nps_service_simple.obter_estatisticas_filiais()
+        
+        status_code = 200 if resultado.success else 400
+        
+        if not resultado.success:
+            return jsonify(resultado.to_dict()), status_code
+        return _com_etag(jsonify(resultado.to_dict()), etag), status_code
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint obter_estatisticas_filiais_nps: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor',
+            'error': str(e)
+        }), 500
+
+@nps_simple_bp.route('/nps/tendencia', methods=['GET'])
+@cross_origin()
+def obter_tendencia_nps():
+    """Endpoint para obter a evolução do NPS por dia, semana ou mês"""
+    try:
+        # Obter parâmetros de query
+        filial = request.args.get('filial')
+        granularidade = request.args.get('granularidade', 'dia')
+        de = request.args.get('de')
+        ate = request.args.get('ate')
+        
+        # Calcular tendência usando o serviço
+        resultado = nps_service_simple.obter_tendencia(
+            filial=filial, granularidade=granularidade, de=de, ate=ate
+        )
+        
+        status_code = 200 if resultado.success else 400
+        
         return jsonify(resultado.to_dict()), status_code
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint obter_tendencia_nps: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor',
+            'error': str(e)
+        }), 500
+
+@nps_simple_bp.route('/nps/cache', methods=['GET'])
+@cross_origin()
+def estatisticas_cache_nps():
+    """Endpoint com os contadores do cache de respostas (hits, misses, evictions)"""
+    try:
+        resultado = nps_service_simple.estatisticas_cache()
         
+        return jsonify(resultado.to_dict()), 200
+    
     except Exception as e:
-        logger.error(f"Erro no endpoint obter_estatisticas_nps: {str(e)}")
+        logger.error(f"Erro no endpoint estatisticas_cache_nps: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor',
+            'error': str(e)
+        }), 500
+
+@nps_simple_bp.route('/nps/idempotencia', methods=['GET'])
+@cross_origin()
+def estatisticas_idempotencia_nps():
+    """Endpoint com os contadores da supressão de reenvios"""
+    try:
+        resultado = nps_service_simple.estatisticas_idempotencia()
+        
+        return jsonify(resultado.to_dict()), 200
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint estatisticas_idempotencia_nps: {str(e)}")
         return jsonify({
             'success': False,
             'message': 'Erro interno do servidor',
@@ -102,19 +451,21 @@ def obter_estatisticas_nps():
 @nps_simple_bp.route('/nps/health', methods=['GET'])
 @cross_origin()
 def health_check():
-    """Endpoint para verificar saúde da API"""
+    """Endpoint para verificar saúde da API (responde do último resultado da sonda do banco)"""
     try:
-        # Testar conexão com Supabase
-        from src.database.supabase_client_simple import simple_supabase_client
-        sucesso, mensagem = simple_supabase_client.test_connection()
+        saude = nps_service_simple.saude.estado()
         
         return jsonify({
             'success': True,
             'message': 'API NPS funcionando',
-            'database_status': 'conectado' if sucesso else 'erro',
-            'database_message': mensagem
+            'database_status': saude['status'],
+            'database_message': saude['mensagem'],
+            'database_check': saude,
+            'database_pool': nps_service_simple.client.pool_stats(),
+            'admissao': nps_service_simple.admissao.estatisticas() if nps_service_simple.admissao else None,
+            'snapshot': nps_service_simple.snapshot.estatisticas() if nps_service_simple.snapshot else None
         }), 200
-        
+    
     except Exception as e:
         logger.error(f"Erro no health check: {str(e)}")
         return jsonify({
@@ -123,3 +474,50 @@ def health_check():
             'error': str(e)
         }), 500
 
+@nps_simple_bp.route('/nps/health/live', methods=['GET'])
+@cross_origin()
+def liveness_check():
+    """Endpoint de liveness: confirma que o processo responde, sem tocar no banco"""
+    return jsonify({'status': 'ok'}), 200
+
+@nps_simple_bp.route('/nps/perfis', methods=['GET'])
+@cross_origin()
+def listar_perfis():
+    """Endpoint para listar os perfis de requisições mais recentes"""
+    try:
+        limite = min(max(request.args.get('limite', 50, type=int), 1), 1000)
+        
+        resultado = nps_service_simple.listar_perfis(request.headers.get(CABECALHO_PERFIL), limite)
+        
+        return jsonify(resultado.to_dict()), resultado.status_code or 200
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint listar_perfis: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor',
+            'error': str(e)
+        }), 500
+
+@nps_simple_bp.route('/nps/perfis/<perfil_id>', methods=['GET'])
+@cross_origin()
+def baixar_perfil(perfil_id):
+    """Endpoint para baixar um perfil (formato=pstats para o .prof, formato=texto para o resumo)"""
+    try:
+        formato = request.args.get('formato', 'pstats')
+        
+        caminho, erro = nps_service_simple.arquivo_perfil(request.headers.get(CABECALHO_PERFIL), perfil_id, formato)
+        if erro is not None:
+            return jsonify(erro.to_dict()), erro.status_code
+        
+        if formato == 'texto':
+            return send_file(caminho, mimetype='text/plain')
+        return send_file(caminho, mimetype='application/octet-stream', as_attachment=True)
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint baixar_perfil: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor',
+            'error': str(e)
+        }), 500
@@ -0,0 +1,172 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+from src.models.nps_pesquisa_simple import NPSResponse
+
+logger = logging.getLogger(__name__)
+
+class MemoriaLimiteBackend:
+    """Baldes de tokens em processo, limitados a `max_baldes` chaves (LRU)
+    
+    Um balde descartado por LRU equivale a um balde cheio, que é o estado de
+    uma chave sem tráfego recente.
+    """
+    
+    def __init__(self, max_baldes: int = 100000):
+        self.max_baldes = max_baldes
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def consumir(self, chave: str, taxa: float, capacidade: float, custo: float = 1.0) -> Tuple[bool, float]:
+        """Retira `custo` tokens do balde; retorna (permitido, segundos até haver tokens)"""
+        agora = time.monotonic()
+        with self._lock:
+            tokens, atualizado_em = self._baldes.get(chave, (capacidade, agora))
+            tokens = min(capacidade, tokens + (agora - atualizado_em) * taxa)
+            
+            if tokens >= custo:
+                permitido, espera = True, 0.0
+                tokens -= custo
+            else:
+                permitido, espera = False, (custo - tokens) / taxa
+            
+            self._baldes[chave] = (tokens, agora)
+            self._baldes.move_to_end(chave)
+            while len(self._baldes) > self.max_baldes:
+                self._baldes.popitem(last=False)
+            return permitido, espera
+
+# Balde de tokens atômico no Redis: KEYS[1] = balde; ARGV = taxa, capacidade, custo
+_SCRIPT_BALDE = """
+local taxa = tonumber(ARGV[1])
+local capacidade = tonumber(ARGV[2])
+local custo = tonumber(ARGV[3])
+local relogio = redis.call('TIME')
+local agora = tonumber(relogio[1]) + tonumber(relogio[2]) / 1000000
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(estado[1]) or capacidade
+local ts = tonumber(estado[2]) or agora
+tokens = math.min(capacidade, tokens + math.max(0, agora - ts) * taxa)
+local permitido = 0
+local espera = 0
+if tokens >= custo then
+    tokens = tokens - custo
+    permitido = 1
+else
+    espera = (custo - tokens) / taxa
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(agora))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidade / taxa * 1000) + 1000)
+return {permitido, tostring(espera)}
+"""
+
+class RedisLimiteBackend:
+    """Baldes de tokens compartilhados entre workers (requer o pacote `redis`)
+    
+    Cada consumo é um script Lua atômico que usa o relógio do Redis. Se o
+    Redis estiver indisponível a requisição é admitida: o limite deixa de
+    valer, mas a API continua respondendo.
+    """
+    
+    def __init__(self, url: str, prefixo: str = 'nps:limite:'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("Instale o pacote 'redis' para usar NPS_ADMISSAO_REDIS_URL")
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._script = self._redis.register_script(_SCRIPT_BALDE)
+        self.prefixo = prefixo
+    
+    def consumir(self, chave: str, taxa: float, capacidade: float, custo: float = 1.0) -> Tuple[bool, float]:
+        try:
+            permitido, espera = self._script(keys=[self.prefixo + chave], args=[taxa, capacidade, custo])
+            return bool(int(permitido)), float(espera)
+        except Exception as e:
+            logger.error(f"Erro no limite de requisições (Redis): {str(e)}")
+            return True, 0.0
+
+class ControleAdmissao:
+    """Controle de admissão das rotas NPS
+    
+    Antes de cada requisição consome um token do balde do IP do cliente e,
+    quando a requisição informa a filial, do balde da filial, recusando com
+    429 quando o balde está vazio. Também limita as requisições em andamento
+    no worker (e, portanto, as chamadas simultâneas ao Supabase) a
+    `max_em_andamento`, recusando o excedente com 503 na hora, sem fila.
+    Ambas as recusas informam `Retry-After`.
+    
+    Uma requisição admitida ocupa uma vaga até `liberar()`.
+    """
+    
+    def __init__(self, backend, taxa_ip: float = 20.0, rajada_ip: float = 40.0,
+                 taxa_filial: float = 100.0, rajada_filial: float = 200.0,
+                 max_em_andamento: int = 64):
+        self.backend = backend
+        self.taxa_ip = taxa_ip
+        self.rajada_ip = rajada_ip
+        self.taxa_filial = taxa_filial
+        self.rajada_filial = rajada_filial
+        self.max_em_andamento = max_em_andamento
+        
+        self._lock = threading.Lock()
+        self._em_andamento = 0
+        self.admitidas = 0
+        self.recusadas_ip = 0
+        self.recusadas_filial = 0
+        self.recusadas_concorrencia = 0
+    
+    @staticmethod
+    def _recusa(status_code: int, espera: float, message: str, error: str) -> NPSResponse:
+        return NPSResponse(
+            success=False,
+            message=message,
+            error=error,
+            status_code=status_code,
+            headers={'Retry-After': str(max(1, int(math.ceil(espera))))}
+        )
+    
+    def admitir(self, ip: str, filial: str = None) -> Optional[NPSResponse]:
+        """Retorna None se a requisição foi admitida (ocupando uma vaga) ou a resposta de recusa"""
+        if self.taxa_ip > 0:
+            permitido, espera = self.backend.consumir(f"ip:{ip}", self.taxa_ip, self.rajada_ip)
+            if not permitido:
+                with self._lock:
+                    self.recusadas_ip += 1
+                return self._recusa(429, espera, "Muitas requisições", "Limite de requisições por IP excedido")
+        
+        if filial and self.taxa_filial > 0:
+            permitido, espera = self.backend.consumir(f"filial:{filial}", self.taxa_filial, self.rajada_filial)
+            if not permitido:
+                with self._lock:
+                    self.recusadas_filial += 1
+                return self._recusa(429, espera, "Muitas requisições", "Limite de requisições da filial excedido")
+        
+        with self._lock:
+            if self._em_andamento >= self.max_em_andamento:
+                self.recusadas_concorrencia += 1
+                return self._recusa(
+                    503, 1, "Serviço temporariamente sobrecarregado", "Limite de requisições simultâneas atingido"
+                )
+            self._em_andamento += 1
+            self.admitidas += 1
+        return None
+    
+    def liberar(self):
+        """Devolve a vaga de uma requisição admitida"""
+        with self._lock:
+            self._em_andamento -= 1
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'em_andamento': self._em_andamento,
+                'max_em_andamento': self.max_em_andamento,
+                'admitidas': self.admitidas,
+                'recusadas_ip': self.recusadas_ip,
+                'recusadas_filial': self.recusadas_filial,
+                'recusadas_concorrencia': self.recusadas_concorrencia
+            }
@@ -0,0 +1,142 @@
+import threading
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+_INDICE_CATEGORIA = {'promotor': 0, 'neutro': 1, 'detrator': 2}
+
+class NPSAgregados:
+    """Contadores NPS em memória por filial (e total geral)
+    
+    Mantém [promotores, neutros, detratores] por filial, atualizados em O(1) a
+    cada pesquisa gravada. Os contadores são semeados na inicialização por uma
+    varredura paginada da tabela e reconciliados periodicamente com o banco,
+    o que também incorpora pesquisas gravadas por outros workers.
+    
+    `carregar_pagina(apos_id, limite)` deve retornar as linhas (com `id`,
+    `filial` e `categoria_nps`) com id maior que `apos_id`, em ordem de id,
+    e lançar exceção em caso de erro. A varredura só termina numa página
+    vazia: o PostgREST corta as respostas em `max-rows` (1000 no Supabase),
+    e uma página menor que o pedido não indica o fim da tabela.
+    
+    `contar()`, opcional, retorna o total de linhas da tabela; uma reconciliação
+    que leia menos linhas do que havia no início dela é descartada.
+    """
+    
+    def __init__(self, carregar_pagina: Callable[[int, int], List[Dict[str, Any]]],
+                 tamanho_pagina: int = 1000, intervalo_reconciliacao: float = 60.0,
+                 contar: Callable[[], int] = None):
+        self.carregar_pagina = carregar_pagina
+        self.contar = contar
+        self.tamanho_pagina = tamanho_pagina
+        self.intervalo_reconciliacao = intervalo_reconciliacao
+        
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._pronto = False
+        self._semeado = threading.Event()
+        # Gravações feitas durante uma varredura: (id, filial, categoria)
+        self._durante_varredura = None
+        self._parar = threading.Event()
+        self._thread = None
+    
+    @property
+    def pronto(self) -> bool:
+        return self._pronto
+    
+    def aguardar(self, tempo_max: float = None) -> bool:
+        """Espera a primeira carga dos contadores; False se não terminar em `tempo_max` segundos"""
+        return self._semeado.wait(tempo_max)
+    
+    def iniciar(self) -> 'NPSAgregados':
+        """Semeia os contadores e reconcilia periodicamente em segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name='nps-agregados', daemon=True)
+            self._thread.start()
+        return self
+    
+    def encerrar(self):
+        self._parar.set()
+    
+    def registrar(self, linhas: Iterable[Dict[str, Any]]):
+        """Contabiliza pesquisas recém-gravadas"""
+        with self._lock:
+            for linha in linhas:
+                indice = _INDICE_CATEGORIA.get(linha.get('categoria_nps'))
+                if indice is None:
+                    continue
+                filial = linha.get('filial')
+                self._contadores.setdefault(filial, [0, 0, 0])[indice] += 1
+                if self._durante_varredura is not None:
+                    self._durante_varredura.append((linha.get('id'), filial, indice))
+    
+    def contagens(self, filial: str = None) -> Optional[Tuple[int, int, int]]:
+        """Retorna (promotores, neutros, detratores) da filial ou do total; None se não semeado"""
+        if not self._pronto:
+            return None
+        
+        with self._lock:
+            if filial:
+                return tuple(self._contadores.get(filial, (0, 0, 0)))
+            
+            totais = [0, 0, 0]
+            for contador in self._contadores.values():
+                totais[0] += contador[0]
+                totais[1] += contador[1]
+                totais[2] += contador[2]
+            return tuple(totais)
+    
+    def contagens_por_filial(self) -> Optional[Dict[str, Tuple[int, int, int]]]:
+        """Retorna as contagens de todas as filiais; None se não semeado"""
+        if not self._pronto:
+            return None
+        
+        with self._lock:
+            return {filial: tuple(contador) for filial, contador in self._contadores.items()}
+    
+    def reconciliar(self):
+        """Recalcula os contadores com uma varredura paginada e substitui os atuais"""
+        with self._lock:
+            self._durante_varredura = []
+        
+        try:
+            # A tabela só recebe inserções: a varredura tem de ler ao menos esse total
+            total = self.contar() if self.contar is not None else None
+            
+            novos = {}
+            ultimo_id = 0
+            lidas = 0
+            while True:
+                pagina = self.carregar_pagina(ultimo_id, self.tamanho_pagina)
+                if not pagina:
+                    break
+                for linha in pagina:
+                    indice = _INDICE_CATEGORIA.get(linha.get('categoria_nps'))
+                    if indice is not None:
+                        novos.setdefault(linha.get('filial'), [0, 0, 0])[indice] += 1
+                ultimo_id = pagina[-1]['id']
+                lidas += len(pagina)
+            
+            if total is not None and lidas < total:
+                raise Exception(f"Agregados incompletos: {lidas} linhas lidas de {total}")
+            
+            with self._lock:
+                # Reaplica o que foi gravado depois do trecho já varrido
+                for id_linha, filial, indice in self._durante_varredura:
+                    if id_linha is None or id_linha > ultimo_id:
+                        novos.setdefault(filial, [0, 0, 0])[indice] += 1
+                self._contadores = novos
+                self._pronto = True
+            self._semeado.set()
+        finally:
+            with self._lock:
+                self._durante_varredura = None
+    
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                self.reconciliar()
+            except Exception as e:
+                logger.error(f"Erro ao reconciliar agregados NPS: {str(e)}")
+            self._parar.wait(self.intervalo_reconciliacao)
@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+from src.models.nps_pesquisa_simple import NPSResponse
+
+logger = logging.getLogger(__name__)
+
+class MemoriaCacheBackend:
+    """Backend de cache em processo: LRU limitado por tamanho, com TTL por item"""
+    
+    # Versões só deste processo: não servem de versão dos dados entre workers
+    compartilhado = False
+    
+    def __init__(self, max_itens: int = 1000):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._contadores = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+    
+    def get(self, chave: str) -> Optional[str]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+    
+    def set(self, chave: str, valor: str, ttl: float):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.evictions += 1
+    
+    def versoes(self, *chaves: str) -> list:
+        with self._lock:
+            return [self._contadores.get(chave, 0) for chave in chaves]
+    
+    def incrementar(self, *chaves: str):
+        with self._lock:
+            for chave in chaves:
+                self._contadores[chave] = self._contadores.get(chave, 0) + 1
+    
+    def tamanho(self) -> int:
+        return len(self._itens)
+
+class RedisCacheBackend:
+    """Backend de cache compartilhado entre workers (requer o pacote `redis`)
+    
+    O Redis aplica o LRU (`maxmemory-policy allkeys-lru`) e o TTL de cada chave.
+    """
+    
+    compartilhado = True
+    
+    def __init__(self, url: str, prefixo: str = 'nps:'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("Instale o pacote 'redis' para usar NPS_CACHE_REDIS_URL")
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.prefixo = prefixo
+    
+    @property
+    def evictions(self) -> int:
+        try:
+            return int(self._redis.info('stats').get('evicted_keys', 0))
+        except Exception:
+            return 0
+    
+    def get(self, chave: str) -> Optional[str]:
+        valor = self._redis.get(self.prefixo + chave)
+        return valor.decode('utf-8') if valor is not None else None
+    
+    def set(self, chave: str, valor: str, ttl: float):
+        self._redis.set(self.prefixo + chave, valor, px=int(ttl * 1000))
+    
+    def versoes(self, *chaves: str) -> list:
+        valores = self._redis.mget([self.prefixo + chave for chave in chaves])
+        return [int(valor) if valor is not None else 0 for valor in valores]
+    
+    def incrementar(self, *chaves: str):
+        pipeline = self._redis.pipeline()
+        for chave in chaves:
+            pipeline.incr(self.prefixo + chave)
+        pipeline.execute()
+    
+    def tamanho(self) -> int:
+        return self._redis.dbsize()
+
+class NPSCache:
+    """Cache de respostas do serviço NPS com TTL e invalidação por filial
+    
+    As chaves incluem a versão da filial consultada (ou a versão global, nas
+    consultas sem filial). Uma gravação incrementa a versão da filial e a
+    global, o que invalida de uma vez todas as respostas afetadas sem
+    percorrer o cache; as entradas antigas saem por LRU ou TTL.
+    """
+    
+    def __init__(self, backend, ttl: float = 5.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+        # `+= 1` não é atômico entre threads: os contadores só mudam com o lock
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _chave_versao(filial: str = None) -> str:
+        return f"versao:{filial or '*'}"
+    
+    @property
+    def compartilhado(self) -> bool:
+        """As versões valem para todos os workers (backend Redis)"""
+        return self.backend.compartilhado
+    
+    def versao(self, filial: str = None) -> int:
+        """Versão atual dos dados da filial (ou do total, sem filial)"""
+        return self.backend.versoes(self._chave_versao(filial))[0]
+    
+    def consultar(self, endpoint: str, filial: str,
+                  params: Dict[str, Any]) -> Tuple[Optional[str], Optional[NPSResponse]]:
+        """Retorna (chave, resposta em cache ou None); a chave é None com o cache indisponível"""
+        try:
+            versao = self.versao(filial)
+            parametros = '&'.join(f'{k}={v}' for k, v in sorted(params.items()) if v is not None)
+            chave = f"{endpoint}:{filial or '*'}:v{versao}:{parametros}"
+            
+            valor = self.backend.get(chave)
+        except Exception as e:
+            # Cache indisponível não pode derrubar a consulta
+            logger.error(f"Erro ao consultar cache NPS: {str(e)}")
+            return None, None
+        
+        if valor is None:
+            with self._lock:
+                self.misses += 1
+            return chave, None
+        
+        with self._lock:
+            self.hits += 1
+        dados = json.loads(valor)
+        return chave, NPSResponse(
+            success=dados['success'],
+            message=dados['message'],
+            data=dados.get('data'),
+            error=dados.get('error'),
+            next_cursor=dados.get('next_cursor')
+        )
+    
+    def guardar(self, chave: Optional[str], resposta: NPSResponse):
+        """Guarda a resposta calculada para a chave de `consultar` (apenas sucessos)"""
+        if chave is None or not resposta.success or resposta.status_code is not None:
+            return
+        try:
+            self.backend.set(chave, json.dumps(resposta.to_dict()), self.ttl)
+        except Exception as e:
+            logger.error(f"Erro ao gravar no cache NPS: {str(e)}")
+    
+    def obter_ou_calcular(self, endpoint: str, filial: str, params: Dict[str, Any],
+                          calcular: Callable[[], NPSResponse]) -> NPSResponse:
+        """Retorna a resposta em cache ou calcula, guardando apenas respostas de sucesso"""
+        chave, resposta = self.consultar(endpoint, filial, params)
+        if resposta is None:
+            resposta = calcular()
+            self.guardar(chave, resposta)
+        return resposta
+    
+    def invalidar(self, filial: str = None):
+        """Invalida as respostas da filial e as consultas sem filial"""
+        chaves = {self._chave_versao(None)}
+        if filial:
+            chaves.add(self._chave_versao(filial))
+        try:
+            self.backend.incrementar(*chaves)
+            with self._lock:
+                self.invalidacoes += 1
+        except Exception as e:
+            logger.error(f"Erro ao invalidar cache NPS: {str(e)}")
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses, invalidacoes = self.hits, self.misses, self.invalidacoes
+        consultas = hits + misses
+        return {
+            'backend': type(self.backend).__name__,
+            'ttl_s': self.ttl,
+            'itens': self.backend.tamanho(),
+            'hits': hits,
+            'misses': misses,
+            'evictions': self.backend.evictions,
+            'invalidacoes': invalidacoes,
+            'taxa_acerto': round(hits / consultas, 4) if consultas else 0
+        }
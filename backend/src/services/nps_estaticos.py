@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from werkzeug.http import quote_etag
+import logging
+
+try:
+    import brotli
+except ImportError:
+    # Sem o pacote `brotli`, só as variantes gzip (e os .br gerados no build)
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Arquivos do Vite com hash do conteúdo no nome (assets/index-BpZ2ycW4.js):
+# o conteúdo de uma URL nunca muda, então o navegador não precisa revalidar
+_NOME_COM_HASH = re.compile(r'(^|/)assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'no-cache'
+
+# Tipos comprimíveis; imagens, fontes woff2 e vídeos já vêm comprimidos
+_COMPRIMIVEIS = {
+    'application/javascript', 'application/json', 'application/manifest+json', 'application/wasm',
+    'application/xml', 'font/otf', 'font/ttf', 'image/svg+xml', 'image/vnd.microsoft.icon', 'image/x-icon'
+}
+
+# Uma variante comprimida só é guardada se economizar ao menos 10%
+_ECONOMIA_MIN = 0.9
+
+# Extensões das variantes pré-comprimidas pelo build (vite-plugin-compression)
+_EXTENSOES = {'br': '.br', 'gzip': '.gz'}
+
+def qualidades_codificacao(accept_encodings: Iterable[Tuple[str, float]]) -> Callable[[str], float]:
+    """Função que dá o q de uma codificação no Accept-Encoding
+    
+    `accept_encodings` são os pares (codificação, q) do cabeçalho, como
+    `request.accept_encodings` do Werkzeug. Uma entrada explícita vale mais
+    que `*`, e q=0 recusa a codificação.
+    """
+    qualidades = {codificacao.lower(): q for codificacao, q in accept_encodings}
+    return lambda codificacao: qualidades.get(codificacao, qualidades.get('*', 0))
+
+class VarianteEstatica:
+    """Corpo e cabeçalhos prontos de uma codificação (identidade, br ou gzip) de um arquivo"""
+    
+    __slots__ = ('corpo', 'etag', 'cabecalhos', 'cabecalhos_304')
+    
+    def __init__(self, corpo: bytes, etag: str, tipo: str, cache_control: str,
+                 codificacao: str = None, vary: bool = False):
+        self.corpo = corpo
+        self.etag = etag
+        self.cabecalhos_304 = [('ETag', quote_etag(etag)), ('Cache-Control', cache_control)]
+        if vary:
+            self.cabecalhos_304.append(('Vary', 'Accept-Encoding'))
+        self.cabecalhos = [('Content-Type', tipo)] + self.cabecalhos_304
+        if codificacao:
+            self.cabecalhos.append(('Content-Encoding', codificacao))
+
+class ArquivoEstatico:
+    """Um arquivo de `static/` com as variantes por codificação
+    
+    Arquivos maiores que o limite de memória ficam sem variantes e são
+    servidos do disco (`em_memoria` falso).
+    """
+    
+    __slots__ = ('caminho', 'tamanho', 'variantes')
+    
+    def __init__(self, caminho: str, tamanho: int, variantes: Dict[Optional[str], VarianteEstatica]):
+        self.caminho = caminho
+        self.tamanho = tamanho
+        self.variantes = variantes
+    
+    @property
+    def em_memoria(self) -> bool:
+        return bool(self.variantes)
+    
+    def variante(self, accept_encodings: Iterable[Tuple[str, float]]) -> VarianteEstatica:
+        """Variante de maior q aceita pelo cliente (br no empate), ou o original
+        
+        `accept_encodings` segue `qualidades_codificacao`.
+        """
+        qualidade = qualidades_codificacao(accept_encodings)
+        melhor, melhor_q = None, 0
+        for codificacao in ('br', 'gzip'):
+            q = qualidade(codificacao)
+            if codificacao in self.variantes and q > melhor_q:
+                melhor, melhor_q = codificacao, q
+        return self.variantes[melhor]
+
+class ArquivosEstaticos:
+    """Manifesto em memória do frontend compilado (`static/`), montado uma vez
+    
+    Lê todos os arquivos na criação e guarda, para cada um, o corpo, as
+    variantes br/gzip (as geradas pelo build ou comprimidas aqui no nível
+    máximo) e os cabeçalhos prontos: Content-Type, ETag forte por variante e
+    Cache-Control (imutável por um ano para os assets com hash no nome;
+    revalidação por ETag para o index.html e os demais). Servir um arquivo não
+    faz nenhuma chamada ao sistema de arquivos. Um novo build copiado para
+    `static/` só aparece depois de reiniciar o processo.
+    """
+    
+    def __init__(self, diretorio: str, memoria_max_bytes: int = 2 * 1024 * 1024):
+        self.diretorio = diretorio
+        self.memoria_max_bytes = memoria_max_bytes
+        self.arquivos: Dict[str, ArquivoEstatico] = {}
+        
+        if diretorio and os.path.isdir(diretorio):
+            for caminho in self._listar():
+                self.arquivos[caminho] = self._carregar(caminho)
+        
+        self.index = self.arquivos.get('index.html')
+        estatisticas = self.estatisticas()
+        logger.info(
+            f"{estatisticas['arquivos']} arquivos estáticos ({estatisticas['bytes_em_memoria'] // 1024} KB em memória, "
+            f"{estatisticas['variantes_comprimidas']} variantes comprimidas)"
+        )
+    
+    def _listar(self) -> List[str]:
+        """Caminhos relativos (com '/') dos arquivos, sem as variantes .br/.gz de outro arquivo"""
+        caminhos = set()
+        for raiz, _, nomes in os.walk(self.diretorio):
+            for nome in nomes:
+                relativo = os.path.relpath(os.path.join(raiz, nome), self.diretorio).replace(os.sep, '/')
+                caminhos.add(relativo)
+        return sorted(
+            caminho for caminho in caminhos
+            if not any(caminho.endswith(extensao) and caminho[:-len(extensao)] in caminhos
+                       for extensao in _EXTENSOES.values())
+        )
+    
+    def _carregar(self, caminho: str) -> ArquivoEstatico:
+        completo = os.path.join(self.diretorio, caminho)
+        tamanho = os.path.getsize(completo)
+        if tamanho > self.memoria_max_bytes:
+            return ArquivoEstatico(caminho, tamanho, {})
+        
+        with open(completo, 'rb') as arquivo:
+            corpo = arquivo.read()
+        
+        tipo, _ = mimetypes.guess_type(caminho)
+        tipo = tipo or 'application/octet-stream'
+        comprimivel = tipo.startswith('text/') or tipo in _COMPRIMIVEIS
+        if tipo.startswith('text/') or tipo in ('application/javascript', 'application/json'):
+            tipo += '; charset=utf-8'
+        
+        cache_control = CACHE_IMUTAVEL if _NOME_COM_HASH.search(caminho) else CACHE_REVALIDAR
+        etag = hashlib.sha1(corpo).hexdigest()[:24]
+        
+        comprimidos = self._comprimir(completo, corpo) if comprimivel else {}
+        vary = bool(comprimidos)
+        variantes = {None: VarianteEstatica(corpo, etag, tipo, cache_control, vary=vary)}
+        for codificacao, dados in comprimidos.items():
+            # ETag forte distinto por codificação: os bytes enviados são outros
+            variantes[codificacao] = VarianteEstatica(
+                dados, f'{etag}-{codificacao}', tipo, cache_control, codificacao=codificacao, vary=vary
+            )
+        return ArquivoEstatico(caminho, tamanho, variantes)
+    
+    @staticmethod
+    def _comprimir(completo: str, corpo: bytes) -> Dict[str, bytes]:
+        """Variantes br e gzip que economizam espaço, do build ou comprimidas agora"""
+        variantes = {}
+        for codificacao, extensao in _EXTENSOES.items():
+            if os.path.isfile(completo + extensao):
+                with open(completo + extensao, 'rb') as arquivo:
+                    dados = arquivo.read()
+            elif codificacao == 'br':
+                if brotli is None:
+                    continue
+                dados = brotli.compress(corpo, quality=11)
+            else:
+                # mtime=0: a mesma entrada gera os mesmos bytes em todos os workers
+                dados = gzip.compress(corpo, compresslevel=9, mtime=0)
+            if len(dados) < len(corpo) * _ECONOMIA_MIN:
+                variantes[codificacao] = dados
+        return variantes
+    
+    def arquivo(self, caminho: str) -> Optional[ArquivoEstatico]:
+        return self.arquivos.get(caminho)
+    
+    def estatisticas(self) -> Dict[str, int]:
+        memoria = [arquivo for arquivo in self.arquivos.values() if arquivo.em_memoria]
+        return {
+            'arquivos': len(self.arquivos),
+            'bytes_em_memoria': sum(len(v.corpo) for arquivo in memoria for v in arquivo.variantes.values()),
+            'variantes_comprimidas': sum(len(arquivo.variantes) - 1 for arquivo in memoria)
+        }
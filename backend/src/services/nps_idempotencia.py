@@ -0,0 +1,181 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from src.models.nps_pesquisa_simple import NPSResponse
+
+logger = logging.getLogger(__name__)
+
+# Resultado de NPSIdempotencia.reservar
+NOVA = 'nova'
+REPETIDA = 'repetida'
+EM_ANDAMENTO = 'em_andamento'
+
+_PENDENTE = object()
+
+class FiltroBloom:
+    """Filtro de Bloom: responde "certamente ausente" sem consultar o armazenamento
+    
+    Usa `k` posições por chave derivadas de um único blake2b (hashing duplo).
+    Não remove chaves: deve ser limpo quando `inseridos` passa da capacidade.
+    """
+    
+    def __init__(self, capacidade: int, taxa_falso_positivo: float = 0.01):
+        self.capacidade = capacidade
+        self.bits = max(8, int(math.ceil(-capacidade * math.log(taxa_falso_positivo) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.bits / capacidade * math.log(2))))
+        self._mapa = bytearray((self.bits + 7) // 8)
+        self.inseridos = 0
+    
+    def _posicoes(self, chave: str):
+        digest = hashlib.blake2b(chave.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+    
+    def adicionar(self, chave: str):
+        for posicao in self._posicoes(chave):
+            self._mapa[posicao >> 3] |= 1 << (posicao & 7)
+        self.inseridos += 1
+    
+    def contem(self, chave: str) -> bool:
+        return all(self._mapa[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(chave))
+    
+    def limpar(self):
+        self._mapa = bytearray(len(self._mapa))
+        self.inseridos = 0
+
+class NPSIdempotencia:
+    """Supressão de envios repetidos do POST /api/nps
+    
+    Cada envio é identificado pelo cabeçalho `Idempotency-Key` ou, na falta
+    dele, por um hash do conteúdo (filial, score, email/CNPJ e minuto de
+    recebimento). A primeira requisição reserva a chave; ao terminar com
+    sucesso, a resposta fica guardada num LRU limitado a `max_itens` chaves por
+    `ttl` segundos, e as repetições recebem a mesma resposta sem acessar o
+    Supabase. Uma repetição que chega enquanto a original ainda está em
+    andamento recebe `EM_ANDAMENTO`. Respostas de erro liberam a chave para uma
+    nova tentativa.
+    
+    Com `bloom=True`, um filtro de Bloom descarta as chaves nunca vistas antes
+    da consulta ao LRU. O filtro comporta o dobro de `max_itens`: refeito com
+    as chaves guardadas (no máximo `max_itens`), ele recebe ao menos outras
+    `max_itens` chaves antes do próximo refazer, o que dilui o custo de cada
+    refazer por todas essas reservas.
+    """
+    
+    def __init__(self, max_itens: int = 10000, ttl: float = 3600.0, bloom: bool = False,
+                 por_conteudo: bool = True):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.por_conteudo = por_conteudo
+        self.bloom = FiltroBloom(2 * max_itens) if bloom else None
+        
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+        self.repetidas = 0
+        self.novas = 0
+        self.em_andamento = 0
+        self.bloom_negativos = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _hash(*partes: Any) -> str:
+        return hashlib.sha1('|'.join(str(parte) for parte in partes).encode('utf-8')).hexdigest()
+    
+    def chaves(self, cabecalho: Optional[str], dados: Dict[str, Any]) -> List[str]:
+        """Chaves candidatas do envio; a primeira é a usada para guardar a resposta
+        
+        Sem cabeçalho, o hash de conteúdo só é usado quando há email ou CNPJ:
+        respostas anônimas iguais na mesma loja e no mesmo minuto podem ser de
+        clientes diferentes. O minuto anterior também é consultado, para que um
+        reenvio logo após a virada do minuto ainda seja reconhecido.
+        """
+        if cabecalho:
+            return ['chave:' + self._hash(cabecalho)]
+        
+        if not self.por_conteudo or not isinstance(dados, dict):
+            return []
+        identidade = str(dados.get('email') or dados.get('cnpj') or '').strip().lower()
+        if not identidade:
+            return []
+        
+        minuto = int(time.time() // 60)
+        filial = str(dados.get('filial') or '').strip()
+        return [
+            'conteudo:' + self._hash(filial, dados.get('score'), identidade, bucket)
+            for bucket in (minuto, minuto - 1)
+        ]
+    
+    def _consultar(self, chave: str, agora: float):
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        valor, expira_em = item
+        if expira_em <= agora:
+            del self._itens[chave]
+            return None
+        self._itens.move_to_end(chave)
+        return valor
+    
+    def reservar(self, chaves: List[str]) -> Tuple[str, Optional[NPSResponse]]:
+        """Retorna (NOVA, None) e reserva chaves[0], (REPETIDA, resposta) ou (EM_ANDAMENTO, None)"""
+        agora = time.monotonic()
+        with self._lock:
+            for chave in chaves:
+                if self.bloom is not None and not self.bloom.contem(chave):
+                    self.bloom_negativos += 1
+                    continue
+                valor = self._consultar(chave, agora)
+                if valor is _PENDENTE:
+                    self.em_andamento += 1
+                    return EM_ANDAMENTO, None
+                if valor is not None:
+                    self.repetidas += 1
+                    return REPETIDA, valor
+            
+            self.novas += 1
+            self._guardar(chaves[0], _PENDENTE, agora)
+            if self.bloom is not None:
+                if self.bloom.inseridos >= self.bloom.capacidade:
+                    # Refaz o filtro só com as chaves ainda guardadas
+                    self.bloom.limpar()
+                    for existente in self._itens:
+                        self.bloom.adicionar(existente)
+                else:
+                    self.bloom.adicionar(chaves[0])
+            return NOVA, None
+    
+    def _guardar(self, chave: str, valor: Any, agora: float):
+        self._itens[chave] = (valor, agora + self.ttl)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self.evictions += 1
+    
+    def concluir(self, chave: str, resposta: NPSResponse):
+        """Guarda a resposta de sucesso da chave reservada ou libera a chave em caso de erro"""
+        with self._lock:
+            if resposta is not None and resposta.success:
+                self._guardar(chave, resposta, time.monotonic())
+            else:
+                self._itens.pop(chave, None)
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.repetidas + self.novas + self.em_andamento
+            return {
+                'itens': len(self._itens),
+                'max_itens': self.max_itens,
+                'ttl_s': self.ttl,
+                'repetidas': self.repetidas,
+                'novas': self.novas,
+                'em_andamento': self.em_andamento,
+                'taxa_repeticao': round(self.repetidas / consultas, 4) if consultas else 0.0,
+                'bloom_negativos': self.bloom_negativos if self.bloom is not None else None,
+                'evictions': self.evictions
+            }
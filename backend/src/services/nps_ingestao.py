@@ -0,0 +1,214 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Status dos recibos de ingestão assíncrona
+STATUS_PENDENTE = 'pendente'
+STATUS_GRAVADO = 'gravado'
+STATUS_ERRO = 'erro'
+
+def inserir_isolando_falhas(client, tabela: str, linhas: List[Dict[str, Any]],
+                            on_conflict: str = None) -> List[Tuple[bool, Dict[str, Any]]]:
+    """Insere as linhas em lote e, se o lote for rejeitado, isola as linhas com erro
+    
+    O PostgREST grava um bulk insert em uma única transação: uma linha inválida
+    rejeita o lote inteiro. Nesse caso o lote é dividido ao meio até chegar nas
+    linhas problemáticas, sem reenviar uma a uma as linhas válidas.
+    Retorna um resultado (sucesso, linha gravada ou erro) por linha, na mesma ordem.
+    """
+    if not linhas:
+        return []
+    
+    sucesso, resultado = client.insert_many(tabela, linhas, on_conflict=on_conflict)
+    
+    if sucesso:
+        if isinstance(resultado, list) and len(resultado) == len(linhas):
+            return [(True, linha) for linha in resultado]
+        return [(True, linha) for linha in linhas]
+    
+    # Erros que não são de dados (timeout, 5xx) valem para o lote inteiro
+    status_code = resultado.get('status_code') or 0
+    if len(linhas) == 1 or not 400 <= status_code < 500:
+        return [(False, resultado) for _ in linhas]
+    
+    meio = len(linhas) // 2
+    return (inserir_isolando_falhas(client, tabela, linhas[:meio], on_conflict) +
+            inserir_isolando_falhas(client, tabela, linhas[meio:], on_conflict))
+
+class NPSIngestaoLote:
+    """Ingestão write-behind: enfileira pesquisas validadas e grava em lote
+    
+    Uma thread de fundo agrupa as linhas da fila e envia um bulk insert ao
+    atingir `tamanho_lote` linhas ou `intervalo_ms` desde a primeira linha do
+    lote, o que vier primeiro. Cada linha recebe um recibo cujo status pode
+    ser consultado depois.
+    
+    O recibo é o id de envio gravado na `coluna_dedup` da linha: as novas
+    tentativas usam `on_conflict` nessa coluna (uma linha gravada antes de a
+    resposta se perder não é duplicada) e o recibo de outro worker é
+    confirmado buscando a linha no banco.
+    """
+    
+    STATUS_PENDENTE = STATUS_PENDENTE
+    STATUS_GRAVADO = STATUS_GRAVADO
+    STATUS_ERRO = STATUS_ERRO
+    
+    def __init__(self, client, table_name: str, tamanho_lote: int = 100, intervalo_ms: int = 200,
+                 fila_max: int = 10000, tentativas: int = 3, max_recibos: int = 50000,
+                 coluna_dedup: str = 'id_envio', ao_gravar: Callable[[List[Dict[str, Any]]], None] = None):
+        if not coluna_dedup:
+            raise ValueError("A ingestão em lote exige uma coluna única de deduplicação (NPS_INGESTAO_DEDUP_COLUNA)")
+        self.client = client
+        self.table_name = table_name
+        self.coluna_dedup = coluna_dedup
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo_ms / 1000.0
+        self.tentativas = max(tentativas, 1)
+        self.max_recibos = max_recibos
+        self.ao_gravar = ao_gravar
+        
+        self._fila = queue.Queue(maxsize=fila_max)
+        self._recibos = OrderedDict()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+    
+    def iniciar(self) -> 'NPSIngestaoLote':
+        """Inicia a thread de gravação em segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name='nps-ingestao-lote', daemon=True)
+            self._thread.start()
+        return self
+    
+    def enfileirar(self, linha: Dict[str, Any]) -> Optional[str]:
+        """Enfileira uma linha validada e retorna o recibo (None se a fila estiver cheia)"""
+        if self._parar.is_set():
+            return None
+        
+        recibo = uuid.uuid4().hex
+        with self._lock:
+            self._recibos[recibo] = {'status': self.STATUS_PENDENTE}
+            self._descartar_recibos_antigos()
+        
+        try:
+            self._fila.put_nowait((recibo, dict(linha, **{self.coluna_dedup: recibo})))
+        except queue.Full:
+            with self._lock:
+                self._recibos.pop(recibo, None)
+            return None
+        
+        return recibo
+    
+    def status_recibo(self, recibo: str) -> Optional[Dict[str, Any]]:
+        """Retorna o status de um recibo ou None se ele não for conhecido
+        
+        Recibos deste processo vêm da memória; os demais (outro worker, ou já
+        descartados da memória) são procurados no banco pela coluna de
+        deduplicação e só são encontrados depois de gravados.
+        """
+        with self._lock:
+            status = self._recibos.get(recibo)
+            if status is not None:
+                return dict(status)
+        
+        if len(recibo) != 32 or any(c not in '0123456789abcdef' for c in recibo):
+            return None
+        
+        sucesso, resultado = self.client.select(self.table_name, filters={self.coluna_dedup: recibo}, limit=1)
+        if not sucesso:
+            raise Exception(f"Erro ao consultar o recibo: {resultado.get('error', 'Erro desconhecido')}")
+        if not resultado:
+            return None
+        return {'status': self.STATUS_GRAVADO, 'data': resultado[0]}
+    
+    def pendentes(self) -> int:
+        """Quantidade aproximada de linhas aguardando gravação"""
+        return self._fila.qsize()
+    
+    def encerrar(self, timeout: float = 30.0):
+        """Para de aceitar novas linhas e drena a fila antes de encerrar"""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _descartar_recibos_antigos(self):
+        # Mantém a memória limitada descartando os recibos já finalizados mais antigos
+        excesso = len(self._recibos) - self.max_recibos
+        if excesso <= 0:
+            return
+        for recibo in list(self._recibos.keys()):
+            if excesso <= 0:
+                break
+            if self._recibos[recibo]['status'] != self.STATUS_PENDENTE:
+                del self._recibos[recibo]
+                excesso -= 1
+    
+    def _proximo_lote(self) -> List[Tuple[str, Dict[str, Any]]]:
+        lote = []
+        try:
+            lote.append(self._fila.get(timeout=self.intervalo))
+        except queue.Empty:
+            return lote
+        
+        prazo = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            restante = prazo - time.monotonic()
+            try:
+                # Ao encerrar, drena o que já está na fila sem esperar o prazo
+                if restante <= 0 or self._parar.is_set():
+                    lote.append(self._fila.get_nowait())
+                else:
+                    lote.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+    
+    def _executar(self):
+        while True:
+            lote = self._proximo_lote()
+            if lote:
+                self._gravar(lote)
+            elif self._parar.is_set():
+                break
+    
+    def _gravar(self, lote: List[Tuple[str, Dict[str, Any]]]):
+        recibos = [recibo for recibo, _ in lote]
+        linhas = [linha for _, linha in lote]
+        
+        resultados = []
+        for tentativa in range(self.tentativas):
+            try:
+                resultados = inserir_isolando_falhas(self.client, self.table_name, linhas,
+                                                     on_conflict=self.coluna_dedup)
+            except Exception as e:
+                resultados = [(False, {'error': str(e)}) for _ in linhas]
+            
+            # Só repete quando o lote inteiro falhou por erro transitório
+            transitorio = all(not ok and not 400 <= (r.get('status_code') or 0) < 500 for ok, r in resultados)
+            if not transitorio or tentativa == self.tentativas - 1:
+                break
+            time.sleep(min(0.5 * 2 ** tentativa, 5.0))
+        
+        gravadas = 0
+        with self._lock:
+            for recibo, (sucesso, resultado) in zip(recibos, resultados):
+                if sucesso:
+                    gravadas += 1
+                    self._recibos[recibo] = {'status': self.STATUS_GRAVADO, 'data': resultado}
+                else:
+                    self._recibos[recibo] = {
+                        'status': self.STATUS_ERRO,
+                        'error': resultado.get('error', 'Erro desconhecido')
+                    }
+        
+        logger.info(f"Lote NPS gravado: {gravadas}/{len(lote)} pesquisas")
+        
+        if self.ao_gravar and gravadas:
+            self.ao_gravar([resultado for sucesso, resultado in resultados if sucesso])
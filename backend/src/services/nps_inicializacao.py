@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RelatorioInicializacao:
+    """Tempo gasto em cada etapa da inicialização do processo
+    
+    As etapas são de três tipos: 'import' (módulos carregados pelo ponto de
+    entrada), 'init' (instâncias globais criadas no primeiro uso, ver
+    `Preguicoso`) e 'aquecimento' (pré-conexão do pool e carga dos contadores).
+    `inicio_ms` conta a partir da importação deste módulo, o primeiro passo
+    do ponto de entrada.
+    """
+    
+    def __init__(self):
+        self._origem = time.perf_counter()
+        self._lock = threading.Lock()
+        self._etapas = []
+    
+    def registrar(self, etapa: str, tipo: str, inicio: float, duracao: float):
+        with self._lock:
+            self._etapas.append({
+                'etapa': etapa,
+                'tipo': tipo,
+                'inicio_ms': round((inicio - self._origem) * 1000, 1),
+                'duracao_ms': round(duracao * 1000, 1)
+            })
+    
+    @contextmanager
+    def medir(self, etapa: str, tipo: str = 'import'):
+        """Registra a duração do bloco como uma etapa (também quando ele falha)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, tipo, inicio, time.perf_counter() - inicio)
+    
+    def dados(self) -> Dict[str, Any]:
+        with self._lock:
+            etapas = sorted(self._etapas, key=lambda etapa: etapa['inicio_ms'])
+        totais = {}
+        for etapa in etapas:
+            totais[etapa['tipo']] = round(totais.get(etapa['tipo'], 0) + etapa['duracao_ms'], 1)
+        return {'pid': os.getpid(), 'totais_ms': totais, 'etapas': etapas}
+    
+    def resumo(self) -> str:
+        """Uma linha com as etapas e durações, para o log"""
+        with self._lock:
+            return ', '.join(f"{e['etapa']} {e['duracao_ms']:.0f} ms" for e in self._etapas)
+    
+    def medicoes(self) -> List[Tuple[str, Tuple, float]]:
+        """Duração de cada etapa para GET /api/metrics"""
+        with self._lock:
+            return [
+                ('nps_inicializacao_segundos', (('etapa', e['etapa']), ('tipo', e['tipo'])), round(e['duracao_ms'] / 1000, 4))
+                for e in self._etapas
+            ]
+
+class Preguicoso:
+    """Instância global criada só no primeiro acesso a um de seus atributos
+    
+    Substitui `objeto = Classe()` no fim dos módulos: o import deixa de abrir
+    pools, iniciar threads ou exigir o Supabase configurado, e o custo sai da
+    subida do processo para a primeira requisição (ou para o aquecimento).
+    Leituras e atribuições de atributos são repassadas à instância; a criação
+    é protegida por lock e, se falhar, é tentada de novo no próximo acesso.
+    
+    Num fork (workers do `gunicorn --preload`), o processo filho recebe um
+    lock novo e cria a própria instância: a herdada do pai não tem as threads
+    de fundo (reconciliação, gravação em lote, fsync do spool), que não
+    sobrevivem ao fork, e pode estar pela metade se o fork ocorreu durante a
+    criação.
+    """
+    
+    __slots__ = ('_nome', '_fabrica', '_objeto', '_lock')
+    
+    def __init__(self, nome: str, fabrica: Callable[[], Any]):
+        object.__setattr__(self, '_nome', nome)
+        object.__setattr__(self, '_fabrica', fabrica)
+        object.__setattr__(self, '_objeto', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+        os.register_at_fork(after_in_child=self._reiniciar)
+    
+    def _reiniciar(self):
+        object.__setattr__(self, '_lock', threading.Lock())
+        object.__setattr__(self, '_objeto', None)
+    
+    @property
+    def carregado(self) -> bool:
+        return self._objeto is not None
+    
+    def obter(self) -> Any:
+        """A instância, criada agora se ainda não existir"""
+        objeto = self._objeto
+        if objeto is None:
+            with self._lock:
+                if self._objeto is None:
+                    with inicializacao.medir(self._nome, 'init'):
+                        object.__setattr__(self, '_objeto', self._fabrica())
+                    logger.info(f"{self._nome} inicializado")
+                objeto = self._objeto
+        return objeto
+    
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self.obter(), nome)
+    
+    def __setattr__(self, nome: str, valor: Any):
+        setattr(self.obter(), nome, valor)
+    
+    def __repr__(self) -> str:
+        return f"<Preguicoso {self._nome} {'carregado' if self.carregado else 'pendente'}>"
+
+# Instância global do relatório
+inicializacao = RelatorioInicializacao()
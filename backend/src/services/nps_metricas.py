@@ -0,0 +1,330 @@
+import asyncio
+import atexit
+import bisect
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import logging
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+CONTADOR = 'counter'
+HISTOGRAMA = 'histogram'
+MEDIDOR = 'gauge'
+
+# Limites dos histogramas: latência em segundos e tamanho de corpo em bytes
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (128, 256, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class NPSMetricas:
+    """Métricas da API no formato de exposição do Prometheus
+    
+    Cada thread grava num fragmento próprio (um dicionário de séries), sem lock
+    no caminho da requisição; a coleta soma os fragmentos. Os fragmentos de
+    threads encerradas são incorporados a um acumulado e descartados na coleta
+    e também quando a lista dobra de tamanho ao registrar um fragmento novo,
+    o que limita a memória num servidor com uma thread por requisição.
+    
+    Com `diretorio`, cada processo (worker do gunicorn) grava o seu total em
+    `<diretorio>/nps_metricas_<pid>.json` a cada `intervalo` segundos e a
+    coleta soma os arquivos de todos os workers. Contadores e histogramas de
+    workers encerrados continuam somados; medidores aparecem por worker vivo,
+    com o rótulo `pid`.
+    O diretório deve ser esvaziado antes de iniciar o servidor.
+    """
+    
+    def __init__(self, ativo: bool = True, diretorio: str = None, intervalo: float = 5.0):
+        self.ativo = ativo
+        self.diretorio = diretorio
+        self.intervalo = intervalo
+        
+        self._definicoes = {}
+        self._buckets = {}
+        self._coletores = []
+        self._lock = threading.Lock()
+        self._reiniciar()
+        os.register_at_fork(after_in_child=self._reiniciar)
+    
+    def _reiniciar(self):
+        # Também chamado no processo filho após um fork: começa do zero e
+        # inicia a própria exportação ao gravar a primeira série
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._fragmentos = []
+        self._limite_fragmentos = 64
+        self._acumulado = {}
+        self._parar = threading.Event()
+        self._thread = None
+    
+    def definir(self, nome: str, tipo: str, ajuda: str, buckets: Tuple[float, ...] = None):
+        self._definicoes[nome] = (tipo, ajuda)
+        if tipo == HISTOGRAMA:
+            self._buckets[nome] = tuple(buckets or BUCKETS_LATENCIA)
+    
+    def registrar_coletor(self, coletor: Callable[[], Iterable[Tuple[str, Tuple, float]]]):
+        """Registra uma função lida a cada coleta que retorna (nome, rótulos, valor)
+        
+        Para valores que já são mantidos por outros componentes (contadores da
+        idempotência, da admissão...), sem gravá-los a cada requisição.
+        """
+        self._coletores.append(coletor)
+    
+    def _fragmento(self) -> Dict:
+        fragmento = {}
+        with self._lock:
+            if len(self._fragmentos) >= self._limite_fragmentos:
+                self._incorporar_encerrados()
+                # Varre de novo só quando a lista dobrar: custo amortizado O(1)
+                self._limite_fragmentos = max(64, 2 * len(self._fragmentos))
+            self._fragmentos.append((threading.current_thread(), fragmento))
+            if self.diretorio and self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name='nps-metricas', daemon=True)
+                self._thread.start()
+        self._local.fragmento = fragmento
+        return fragmento
+    
+    def incrementar(self, nome: str, rotulos: Tuple = (), valor: float = 1):
+        if not self.ativo:
+            return
+        try:
+            fragmento = self._local.fragmento
+        except AttributeError:
+            fragmento = self._fragmento()
+        chave = (nome, rotulos)
+        fragmento[chave] = fragmento.get(chave, 0) + valor
+    
+    def observar(self, nome: str, valor: float, rotulos: Tuple = ()):
+        if not self.ativo:
+            return
+        try:
+            fragmento = self._local.fragmento
+        except AttributeError:
+            fragmento = self._fragmento()
+        buckets = self._buckets[nome]
+        chave = (nome, rotulos)
+        # [contagem por bucket (o último é +Inf)..., soma, total]
+        serie = fragmento.get(chave)
+        if serie is None:
+            serie = fragmento[chave] = [0] * (len(buckets) + 3)
+        serie[bisect.bisect_left(buckets, valor)] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+    
+    def registrar_requisicao(self, rota: str, metodo: str, status: int, duracao: float, tamanho: Optional[int]):
+        """Registra uma requisição HTTP atendida (duração em segundos, corpo em bytes)"""
+        self.observar('nps_http_request_duration_seconds', duracao, (('rota', rota), ('metodo', metodo), ('status', str(status))))
+        if tamanho:
+            self.observar('nps_http_request_size_bytes', tamanho, (('rota', rota), ('metodo', metodo)))
+    
+    def registrar_validacao_invalida(self, mensagem: str):
+        # "Item inválido: <detalhe da exceção>" vira só "Item inválido"
+        self.incrementar('nps_validacao_falhas_total', (('motivo', str(mensagem).split(':', 1)[0]),))
+    
+    def medir_supabase(self, operacao: str):
+        """Decorador para métodos do cliente Supabase que retornam (sucesso, resultado)
+        
+        Registra a latência da operação e conta como erro os retornos com
+        sucesso falso. Aceita métodos síncronos e corrotinas.
+        """
+        rotulos = (('operacao', operacao),)
+        
+        def decorador(funcao):
+            if asyncio.iscoroutinefunction(funcao):
+                @functools.wraps(funcao)
+                async def medir_async(*args, **kwargs):
+                    inicio = time.perf_counter()
+                    resultado = await funcao(*args, **kwargs)
+                    self.observar('nps_supabase_duration_seconds', time.perf_counter() - inicio, rotulos)
+                    if not resultado[0]:
+                        self.incrementar('nps_supabase_errors_total', rotulos)
+                    return resultado
+                return medir_async
+            
+            @functools.wraps(funcao)
+            def medir(*args, **kwargs):
+                inicio = time.perf_counter()
+                resultado = funcao(*args, **kwargs)
+                self.observar('nps_supabase_duration_seconds', time.perf_counter() - inicio, rotulos)
+                if not resultado[0]:
+                    self.incrementar('nps_supabase_errors_total', rotulos)
+                return resultado
+            return medir
+        return decorador
+    
+    @staticmethod
+    def _somar(destino: Dict, origem: Iterable):
+        for chave, valor in origem:
+            if isinstance(valor, list):
+                atual = destino.get(chave)
+                destino[chave] = list(valor) if atual is None else [a + b for a, b in zip(atual, valor)]
+            else:
+                destino[chave] = destino.get(chave, 0) + valor
+    
+    def _incorporar_encerrados(self):
+        # Chamado com o lock: threads encerradas não gravam mais no fragmento
+        vivos = []
+        for thread, fragmento in self._fragmentos:
+            if thread.is_alive():
+                vivos.append((thread, fragmento))
+            else:
+                self._somar(self._acumulado, fragmento.items())
+        self._fragmentos = vivos
+    
+    def _series_processo(self) -> Tuple[Dict, Dict]:
+        """Séries gravadas por este processo e medições dos coletores"""
+        with self._lock:
+            self._incorporar_encerrados()
+            
+            series = {}
+            self._somar(series, self._acumulado.items())
+            for _, fragmento in self._fragmentos:
+                # dict.copy é atômico sob o GIL; as threads seguem gravando
+                self._somar(series, fragmento.copy().items())
+        
+        medicoes = {}
+        for coletor in self._coletores:
+            try:
+                for nome, rotulos, valor in coletor():
+                    if valor is not None:
+                        medicoes[(nome, tuple(rotulos))] = valor
+            except Exception as e:
+                logger.error(f"Erro ao coletar métricas: {str(e)}")
+        return series, medicoes
+    
+    def _arquivo(self, pid: int) -> str:
+        return os.path.join(self.diretorio, f'nps_metricas_{pid}.json')
+    
+    def exportar_arquivo(self):
+        """Grava o total deste processo no diretório compartilhado entre os workers"""
+        series, medicoes = self._series_processo()
+        dados = {
+            'pid': os.getpid(),
+            'series': [[nome, [list(par) for par in rotulos], valor] for (nome, rotulos), valor in series.items()],
+            'medicoes': [[nome, [list(par) for par in rotulos], valor] for (nome, rotulos), valor in medicoes.items()]
+        }
+        caminho = self._arquivo(os.getpid())
+        temporario = caminho + '.tmp'
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(temporario, 'w') as arquivo:
+            json.dump(dados, arquivo)
+        os.replace(temporario, caminho)
+    
+    @staticmethod
+    def _processo_vivo(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+    
+    def _series_todos_processos(self) -> Tuple[Dict, Dict]:
+        self.exportar_arquivo()
+        series, medicoes = {}, {}
+        for caminho in glob.glob(os.path.join(self.diretorio, 'nps_metricas_*.json')):
+            try:
+                with open(caminho) as arquivo:
+                    dados = json.load(arquivo)
+            except (OSError, ValueError) as e:
+                logger.error(f"Erro ao ler métricas de {caminho}: {str(e)}")
+                continue
+            
+            self._somar(series, (((nome, tuple(map(tuple, rotulos))), valor) for nome, rotulos, valor in dados['series']))
+            
+            vivo = self._processo_vivo(dados['pid'])
+            for nome, rotulos, valor in dados['medicoes']:
+                rotulos = tuple(map(tuple, rotulos))
+                if self._definicoes.get(nome, (MEDIDOR,))[0] == MEDIDOR:
+                    if not vivo:
+                        continue
+                    rotulos += (('pid', str(dados['pid'])),)
+                self._somar(medicoes, [((nome, rotulos), valor)])
+        return series, medicoes
+    
+    @staticmethod
+    def _formatar_rotulos(rotulos: Iterable[Tuple[str, Any]]) -> str:
+        if not rotulos:
+            return ''
+        partes = []
+        for nome, valor in rotulos:
+            valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            partes.append(f'{nome}="{valor}"')
+        return '{' + ','.join(partes) + '}'
+    
+    @staticmethod
+    def _formatar_valor(valor: float) -> str:
+        return repr(float(valor)) if isinstance(valor, float) else str(valor)
+    
+    def texto(self) -> str:
+        """Todas as métricas (de todos os workers, com `diretorio`) no formato de texto do Prometheus"""
+        if self.diretorio:
+            series, medicoes = self._series_todos_processos()
+        else:
+            series, medicoes = self._series_processo()
+        series.update(medicoes)
+        
+        por_nome = {}
+        for (nome, rotulos), valor in series.items():
+            por_nome.setdefault(nome, []).append((rotulos, valor))
+        
+        linhas = []
+        for nome in sorted(por_nome):
+            tipo, ajuda = self._definicoes.get(nome, (MEDIDOR, ''))
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} {tipo}')
+            for rotulos, valor in sorted(por_nome[nome]):
+                if tipo != HISTOGRAMA:
+                    linhas.append(f'{nome}{self._formatar_rotulos(rotulos)} {self._formatar_valor(valor)}')
+                    continue
+                
+                acumulado = 0
+                for limite, contagem in zip(self._buckets[nome] + ('+Inf',), valor[:-2]):
+                    acumulado += contagem
+                    le = limite if limite == '+Inf' else self._formatar_valor(float(limite))
+                    linhas.append(f'{nome}_bucket{self._formatar_rotulos(rotulos + (("le", le),))} {acumulado}')
+                linhas.append(f'{nome}_sum{self._formatar_rotulos(rotulos)} {self._formatar_valor(float(valor[-2]))}')
+                linhas.append(f'{nome}_count{self._formatar_rotulos(rotulos)} {valor[-1]}')
+        return '\n'.join(linhas) + '\n'
+    
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.exportar_arquivo()
+            except Exception as e:
+                logger.error(f"Erro ao exportar métricas: {str(e)}")
+    
+    def encerrar(self):
+        """Para a exportação periódica gravando o total final do processo"""
+        self._parar.set()
+        if self.diretorio and self._fragmentos:
+            self.exportar_arquivo()
+
+# Instância global das métricas
+metricas = NPSMetricas(
+    ativo=Config.NPS_METRICAS_ATIVO,
+    diretorio=Config.NPS_METRICAS_DIR,
+    intervalo=Config.NPS_METRICAS_INTERVALO_S
+)
+
+metricas.definir('nps_http_request_duration_seconds', HISTOGRAMA,
+                 'Duração das requisições HTTP por rota, método e status (o _count é o número de requisições)')
+metricas.definir('nps_http_request_size_bytes', HISTOGRAMA, 'Tamanho do corpo das requisições HTTP', BUCKETS_BYTES)
+metricas.definir('nps_supabase_duration_seconds', HISTOGRAMA, 'Duração das chamadas ao Supabase por operação')
+metricas.definir('nps_supabase_errors_total', CONTADOR, 'Chamadas ao Supabase que falharam, por operação')
+metricas.definir('nps_validacao_falhas_total', CONTADOR, 'Pesquisas recusadas na validação, por motivo')
+metricas.definir('nps_idempotencia_total', CONTADOR, 'Envios do POST /api/nps por resultado da idempotência')
+metricas.definir('nps_admissao_total', CONTADOR, 'Requisições NPS admitidas e recusadas, por resultado')
+metricas.definir('nps_admissao_em_andamento', MEDIDOR, 'Requisições NPS admitidas em andamento')
+metricas.definir('nps_banco_conectado', MEDIDOR, '1 se a última checagem do banco teve sucesso')
+metricas.definir('nps_inicializacao_segundos', MEDIDOR, 'Duração de cada etapa da inicialização do worker, por tipo')
+
+atexit.register(metricas.encerrar)
@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+# Ordenação estável da listagem: mais recentes primeiro, id desempata
+ORDEM_LISTAGEM = 'timestamp.desc,id.desc'
+
+# Exportação e varreduras completas: ordem cronológica
+ORDEM_CRONOLOGICA = 'timestamp.asc,id.asc'
+
+def codificar_cursor(linha: Dict[str, Any]) -> str:
+    """Gera o cursor opaco que aponta para depois desta linha"""
+    chave = json.dumps([linha['timestamp'], linha['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(chave.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor: str) -> Tuple[str, int]:
+    """Retorna (timestamp, id) do cursor; lança ValueError se for inválido
+    
+    O cursor é só base64 e pode ser montado pelo cliente: o timestamp precisa
+    ser uma data ISO e o id um inteiro antes de entrarem no filtro do PostgREST.
+    """
+    try:
+        dados = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, id_linha = json.loads(dados)
+        if not isinstance(timestamp, str) or type(id_linha) is not int:
+            raise ValueError
+        datetime.fromisoformat(timestamp)
+        return timestamp, id_linha
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+def intervalo_datas(de: str = None, ate: str = None) -> Tuple[Optional[str], Optional[str]]:
+    """Converte os parâmetros `de`/`ate` (ISO, data ou data e hora) em [início, fim)
+    
+    Uma data sem hora em `ate` inclui o dia inteiro. Lança ValueError se alguma
+    data for inválida ou se `de` for posterior a `ate`.
+    """
+    inicio = fim = None
+    try:
+        if de:
+            inicio = datetime.fromisoformat(de)
+        if ate:
+            fim = datetime.fromisoformat(ate)
+            if len(ate) <= 10:
+                fim += timedelta(days=1)
+    except ValueError:
+        raise ValueError("Data inválida: use o formato AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS")
+    
+    if inicio and fim and inicio.replace(tzinfo=None) >= fim.replace(tzinfo=None):
+        raise ValueError("A data inicial deve ser anterior à final")
+    
+    return (inicio.isoformat() if inicio else None, fim.isoformat() if fim else None)
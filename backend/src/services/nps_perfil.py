@@ -0,0 +1,120 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Identificadores aceitos do X-Request-ID (viram nomes de arquivo)
+ID_REQUISICAO_REGEX = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Formatos de download: extensão do arquivo de cada perfil
+FORMATOS = {'pstats': '.prof', 'texto': '.txt'}
+
+class NPSPerfilador:
+    """Perfilamento sob demanda de requisições com cProfile
+
+    Uma requisição é perfilada quando traz o cabeçalho de perfil com o token
+    configurado ou quando é sorteada pela taxa de `amostragem`. Cada perfil é
+    gravado em `diretorio` com o id da requisição como nome: `<id>.prof`
+    (pstats, para snakeviz/flameprof), `<id>.txt` (resumo por tempo
+    acumulado) e `<id>.json` (rota, status, duração). Só os `max_perfis`
+    mais recentes são mantidos.
+    """
+
+    def __init__(self, diretorio: str, max_perfis: int = 200, amostragem: float = 0.0,
+                 token: str = None, linhas_resumo: int = 40):
+        self.diretorio = diretorio
+        self.max_perfis = max_perfis
+        self.amostragem = amostragem
+        self.token = token
+        self.linhas_resumo = linhas_resumo
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def token_valido(self, cabecalho: Optional[str]) -> bool:
+        return bool(self.token) and bool(cabecalho) and hmac.compare_digest(cabecalho, self.token)
+
+    def motivo(self, cabecalho: Optional[str]) -> Optional[str]:
+        """Por que perfilar a requisição ('cabecalho' ou 'amostragem'), ou None"""
+        if cabecalho and self.token_valido(cabecalho):
+            return 'cabecalho'
+        if self.amostragem > 0 and random.random() < self.amostragem:
+            return 'amostragem'
+        return None
+
+    @staticmethod
+    def id_requisicao(cabecalho: Optional[str]) -> str:
+        """Usa o X-Request-ID recebido quando é um nome de arquivo seguro"""
+        if cabecalho and ID_REQUISICAO_REGEX.match(cabecalho):
+            return cabecalho
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def iniciar() -> cProfile.Profile:
+        perfil = cProfile.Profile()
+        perfil.enable()
+        return perfil
+
+    def _caminho(self, perfil_id: str, extensao: str) -> str:
+        return os.path.join(self.diretorio, perfil_id + extensao)
+
+    def salvar(self, perfil: cProfile.Profile, perfil_id: str, metadados: Dict[str, Any]):
+        """Grava o perfil encerrado e descarta os mais antigos além de `max_perfis`"""
+        try:
+            perfil.dump_stats(self._caminho(perfil_id, '.prof'))
+
+            resumo = io.StringIO()
+            estatisticas = pstats.Stats(perfil, stream=resumo)
+            estatisticas.sort_stats('cumulative').print_stats(self.linhas_resumo)
+            with open(self._caminho(perfil_id, '.txt'), 'w') as arquivo:
+                arquivo.write(resumo.getvalue())
+
+            with open(self._caminho(perfil_id, '.json'), 'w') as arquivo:
+                json.dump(dict(metadados, id=perfil_id, criado_em=time.time()), arquivo)
+
+            self._rotacionar()
+        except Exception as e:
+            logger.error(f"Erro ao gravar perfil {perfil_id}: {str(e)}")
+
+    def _indices(self) -> List[str]:
+        """Caminhos dos metadados, do mais recente para o mais antigo"""
+        caminhos = [
+            os.path.join(self.diretorio, nome)
+            for nome in os.listdir(self.diretorio) if nome.endswith('.json')
+        ]
+        return sorted(caminhos, key=lambda caminho: os.stat(caminho).st_mtime, reverse=True)
+
+    def _rotacionar(self):
+        for indice in self._indices()[self.max_perfis:]:
+            base = indice[:-len('.json')]
+            for extensao in ('.json', '.prof', '.txt'):
+                try:
+                    os.remove(base + extensao)
+                except FileNotFoundError:
+                    pass
+
+    def listar(self, limite: int = 50) -> List[Dict[str, Any]]:
+        """Metadados dos perfis mais recentes"""
+        perfis = []
+        for indice in self._indices()[:limite]:
+            try:
+                with open(indice) as arquivo:
+                    perfis.append(json.load(arquivo))
+            except (OSError, ValueError):
+                continue
+        return perfis
+
+    def arquivo(self, perfil_id: str, formato: str = 'pstats') -> Optional[str]:
+        """Caminho do perfil no formato pedido, ou None se não existir"""
+        if not ID_REQUISICAO_REGEX.match(perfil_id) or formato not in FORMATOS:
+            return None
+        caminho = self._caminho(perfil_id, FORMATOS[formato])
+        return caminho if os.path.exists(caminho) else None
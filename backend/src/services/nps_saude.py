@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Any, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MonitorSaude:
+    """Sonda de saúde do banco executada em segundo plano
+    
+    Chama `verificar()` a cada `intervalo` segundos em uma thread própria e
+    guarda o resultado: último status e mensagem, idade da última checagem,
+    latências das últimas `janela` checagens e falhas consecutivas. O health
+    check responde a partir desse estado, sem consultar o banco a cada
+    requisição do balanceador.
+    
+    `verificar()` deve retornar (sucesso, mensagem), como `test_connection`.
+    """
+    
+    def __init__(self, verificar: Callable[[], Tuple[bool, str]],
+                 intervalo: float = 5.0, janela: int = 60):
+        self.verificar = verificar
+        self.intervalo = intervalo
+        
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=janela)
+        self._sucesso = None
+        self._mensagem = "Verificação do banco ainda não executada"
+        self._ultima_checagem = None
+        self._falhas_consecutivas = 0
+        self._checagens = 0
+        self._falhas = 0
+        self._parar = threading.Event()
+        self._thread = None
+    
+    def iniciar(self) -> 'MonitorSaude':
+        """Executa a primeira checagem e as seguintes periodicamente em segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name='nps-saude', daemon=True)
+            self._thread.start()
+        return self
+    
+    def encerrar(self):
+        self._parar.set()
+    
+    def checar(self):
+        """Executa uma checagem e registra o resultado"""
+        inicio = time.perf_counter()
+        try:
+            sucesso, mensagem = self.verificar()
+        except Exception as e:
+            sucesso, mensagem = False, f"Erro na conexão: {str(e)}"
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        
+        with self._lock:
+            self._sucesso = sucesso
+            self._mensagem = mensagem
+            self._ultima_checagem = time.monotonic()
+            self._latencias.append(latencia_ms)
+            self._checagens += 1
+            if sucesso:
+                self._falhas_consecutivas = 0
+            else:
+                self._falhas_consecutivas += 1
+                self._falhas += 1
+        
+        if not sucesso:
+            logger.warning(f"Checagem do banco falhou (falhas seguidas: {self._falhas_consecutivas}): {mensagem}")
+    
+    @staticmethod
+    def _percentil(ordenados, p: float) -> float:
+        indice = min(int(round(p / 100.0 * (len(ordenados) - 1))), len(ordenados) - 1)
+        return round(ordenados[indice], 2)
+    
+    def estado(self) -> Dict[str, Any]:
+        """Último resultado da sonda, sem I/O"""
+        with self._lock:
+            latencias = sorted(self._latencias)
+            idade = None
+            if self._ultima_checagem is not None:
+                idade = round(time.monotonic() - self._ultima_checagem, 3)
+            
+            if self._sucesso is None:
+                status = 'verificando'
+            else:
+                status = 'conectado' if self._sucesso else 'erro'
+            
+            return {
+                'status': status,
+                'sucesso': self._sucesso,
+                'mensagem': self._mensagem,
+                'ultima_checagem_s': idade,
+                'intervalo_s': self.intervalo,
+                'falhas_consecutivas': self._falhas_consecutivas,
+                'checagens': self._checagens,
+                'falhas': self._falhas,
+                'latencia_ms': {
+                    'ultima': round(self._latencias[-1], 2) if latencias else None,
+                    'p50': self._percentil(latencias, 50) if latencias else None,
+                    'p95': self._percentil(latencias, 95) if latencias else None,
+                    'p99': self._percentil(latencias, 99) if latencias else None,
+                    'amostras': len(latencias)
+                }
+            }
+    
+    def _executar(self):
+        while not self._parar.is_set():
+            self.checar()
+            self._parar.wait(self.intervalo)
@@ -1,6 +1,11 @@
 from typing import Dict, Any, List
+from src.config import Config
 from src.database.supabase_client import supabase_client
 from src.models.nps_pesquisa import NPSPesquisaModel, NPSPesquisaResponse
+from src.models.nps_pesquisa_simple import montar_estatisticas
+from src.services.nps_agregados import NPSAgregados
+from src.services.nps_inicializacao import Preguicoso
+from src.services.nps_paginacao import codificar_cursor, decodificar_cursor
 import logging
 
 # Configurar logging
@@ -13,6 +18,67 @@ class NPSService:
     def __init__(self):
         self.client = supabase_client.client
         self.table_name = 'nps_pesquisas'
+        
+        # Contadores em memória para responder estatísticas sem consultar o banco
+        self.agregados = None
+        if Config.NPS_AGREGADOS_ATIVO:
+            self.agregados = NPSAgregados(
+                self._carregar_pagina_agregados,
+                intervalo_reconciliacao=Config.NPS_AGREGADOS_RECONCILIAR_S,
+                contar=self._contar_linhas
+            ).iniciar()
+        
+        # Cópia colunar da tabela para consultas analíticas em memória
+        self.snapshot = None
+        if Config.NPS_SNAPSHOT_ATIVO:
+            from src.services.nps_snapshot import NPSSnapshot
+            self.snapshot = NPSSnapshot(
+                self._carregar_pagina_snapshot,
+                intervalo_reconciliacao=Config.NPS_SNAPSHOT_RECONCILIAR_S,
+                contar=self._contar_linhas
+            ).iniciar()
+    
+    def _carregar_pagina_agregados(self, apos_id: int, limite: int) -> List[Dict[str, Any]]:
+        result = (self.client.table(self.table_name)
+                  .select('id, filial, categoria_nps')
+                  .gt('id', apos_id)
+                  .order('id')
+                  .limit(limite)
+                  .execute())
+        return result.data
+    
+    def _carregar_pagina_snapshot(self, apos_id: int, limite: int) -> List[Dict[str, Any]]:
+        result = (self.client.table(self.table_name)
+                  .select('id, filial, score, timestamp')
+                  .gt('id', apos_id)
+                  .order('id')
+                  .limit(limite)
+                  .execute())
+        return result.data
+    
+    def _contar_linhas(self) -> int:
+        result = self.client.table(self.table_name).select('id', count='exact').limit(1).execute()
+        return result.count
+    
+    def _resposta_estatisticas(self, promotores: int, neutros: int, detratores: int) -> NPSPesquisaResponse:
+        if promotores + neutros + detratores == 0:
+            return NPSPesquisaResponse(
+                success=True,
+                message="Nenhuma pesquisa encontrada",
+                data={
+                    'total': 0,
+                    'promotores': 0,
+                    'neutros': 0,
+                    'detratores': 0,
+                    'nps_score': 0
+                }
+            )
+        
+        return NPSPesquisaResponse(
+            success=True,
+            message="Estatísticas calculadas com sucesso",
+            data=montar_estatisticas(promotores, neutros, detratores)
+        )
     
     def criar_pesquisa(self, dados: Dict[str, Any]) -> NPSPesquisaResponse:
         """Cria uma nova pesquisa NPS"""
@@ -27,6 +93,10 @@ class NPSService:
             result = self.client.table(self.table_name).insert(dados_inserir).execute()
             
             if result.data:
+                if self.agregados is not None:
+                    self.agregados.registrar(result.data)
+                if self.snapshot is not None:
+                    self.snapshot.registrar(result.data)
                 logger.info(f"Pesquisa NPS criada com sucesso: {result.data[0]['id']}")
                 return NPSPesquisaResponse(
                     success=True,
@@ -56,22 +126,42 @@ class NPSService:
                 error=str(e)
             )
     
-    def listar_pesquisas(self, filial: str = None, limite: int = 100) -> NPSPesquisaResponse:
-        """Lista pesquisas NPS com filtros opcionais"""
+    def listar_pesquisas(self, filial: str = None, limite: int = 100, cursor: str = None) -> NPSPesquisaResponse:
+        """Lista pesquisas NPS com filtros opcionais, paginadas por (timestamp, id)"""
         try:
             query = self.client.table(self.table_name).select('*')
             
             if filial:
                 query = query.eq('filial', filial)
             
-            result = query.order('timestamp', desc=True).limit(limite).execute()
+            if cursor:
+                timestamp, id_linha = decodificar_cursor(cursor)
+                query = query.or_(
+                    f'timestamp.lt."{timestamp}",and(timestamp.eq."{timestamp}",id.lt.{id_linha})'
+                )
+            
+            # Uma linha a mais indica se existe próxima página
+            result = query.order('timestamp', desc=True).order('id', desc=True).limit(limite + 1).execute()
+            
+            dados = result.data
+            next_cursor = None
+            if len(dados) > limite:
+                dados = dados[:limite]
+                next_cursor = codificar_cursor(dados[-1])
             
             return NPSPesquisaResponse(
                 success=True,
-                message=f"Encontradas {len(result.data)} pesquisas",
-                data=result.data
+                message=f"Encontradas {len(dados)} pesquisas",
+                data=dados,
+                next_cursor=next_cursor
             )
             
+        except ValueError as e:
+            return NPSPesquisaResponse(
+                success=False,
+                message="Parâmetros inválidos",
+                error=str(e)
+            )
         except Exception as e:
             logger.error(f"Erro ao listar pesquisas: {str(e)}")
             return NPSPesquisaResponse(
@@ -83,6 +173,17 @@ class NPSService:
     def obter_estatisticas(self, filial: str = None) -> NPSPesquisaResponse:
         """Obtém estatísticas das pesquisas NPS"""
         try:
+            # Responder dos contadores em memória quando já semeados
+            if self.agregados is not None:
+                contagens = self.agregados.contagens(filial)
+                if contagens is not None:
+                    return self._resposta_estatisticas(*contagens)
+            
+            if self.snapshot is not None:
+                contagens = self.snapshot.contagens(filial)
+                if contagens is not None:
+                    return self._resposta_estatisticas(*contagens)
+            
             query = self.client.table(self.table_name).select('score, categoria_nps')
             
             if filial:
@@ -90,44 +191,13 @@ class NPSService:
             
             result = query.execute()
             
-            if not result.data:
-                return NPSPesquisaResponse(
-                    success=True,
-                    message="Nenhuma pesquisa encontrada",
-                    data={
-                        'total': 0,
-                        'promotores': 0,
-                        'neutros': 0,
-                        'detratores': 0,
-                        'nps_score': 0
-                    }
-                )
-            
             # Calcular estatísticas
             total = len(result.data)
             promotores = len([p for p in result.data if p['categoria_nps'] == 'promotor'])
             detratores = len([p for p in result.data if p['categoria_nps'] == 'detrator'])
             neutros = total - promotores - detratores
             
-            # Calcular NPS Score
-            nps_score = ((promotores - detratores) / total) * 100 if total > 0 else 0
-            
-            estatisticas = {
-                'total': total,
-                'promotores': promotores,
-                'neutros': neutros,
-                'detratores': detratores,
-                'nps_score': round(nps_score, 2),
-                'percentual_promotores': round((promotores / total) * 100, 2) if total > 0 else 0,
-                'percentual_neutros': round((neutros / total) * 100, 2) if total > 0 else 0,
-                'percentual_detratores': round((detratores / total) * 100, 2) if total > 0 else 0
-            }
-            
-            return NPSPesquisaResponse(
-                success=True,
-                message="Estatísticas calculadas com sucesso",
-                data=estatisticas
-            )
+            return self._resposta_estatisticas(promotores, neutros, detratores)
             
         except Exception as e:
             logger.error(f"Erro ao calcular estatísticas: {str(e)}")
@@ -137,6 +207,6 @@ class NPSService:
                 error=str(e)
             )
 
-# Instância global do serviço
-nps_service = NPSService()
+# Instância global do serviço, criada no primeiro uso
+nps_service = Preguicoso('nps_service', NPSService)
 
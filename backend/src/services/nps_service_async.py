@@ -0,0 +1,227 @@
+import asyncio
+from typing import Dict, Any, Optional, Tuple
+from src.config import Config
+from src.database.supabase_client_async import async_supabase_client
+from src.models.nps_pesquisa_simple import NPSPesquisaSimple, NPSResponse
+from src.services.nps_inicializacao import Preguicoso
+from src.services.nps_metricas import metricas
+from src.services.nps_paginacao import ORDEM_LISTAGEM, codificar_cursor, decodificar_cursor
+from src.services.nps_service_simple import nps_service_simple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class NPSServiceAsync:
+    """Variante assíncrona do NPSServiceSimple para o app ASGI
+    
+    As chamadas ao Supabase usam o cliente assíncrono, sem prender uma thread
+    durante a ida e volta ao PostgREST. O estado em memória (contadores,
+    snapshot, cache, versões para ETag e ingestão em lote/spool) é o do
+    serviço síncrono, compartilhado com as rotas Flask do mesmo processo.
+    """
+    
+    def __init__(self, servico=nps_service_simple, client=async_supabase_client):
+        self.servico = servico
+        self.client = client
+        self.table_name = servico.table_name
+    
+    @property
+    def ingestao_assincrona(self) -> bool:
+        return self.servico.ingestao_assincrona
+    
+    async def etag(self, endpoint: str, filial: str = None, **params) -> Optional[str]:
+        """ETag de `NPSServiceSimple.etag` (a versão vem do cache, sem ida ao banco)"""
+        return self.servico.etag(endpoint, filial, **params)
+    
+    async def criar_pesquisa(self, dados: Dict[str, Any]) -> NPSResponse:
+        """Cria uma nova pesquisa NPS"""
+        try:
+            pesquisa = NPSPesquisaSimple(**dados)
+            
+            valido, mensagem = pesquisa.validate()
+            if not valido:
+                logger.error(f"Erro de validação: {mensagem}")
+                metricas.registrar_validacao_invalida(mensagem)
+                return NPSResponse(
+                    success=False,
+                    message="Dados inválidos",
+                    error=mensagem
+                )
+            
+            sucesso, resultado = await self.client.insert(self.table_name, pesquisa.to_dict())
+            
+            if sucesso:
+                self.servico._registrar_gravacoes([resultado])
+                return NPSResponse(
+                    success=True,
+                    message="Pesquisa NPS salva com sucesso",
+                    data=resultado
+                )
+            else:
+                logger.error(f"Erro ao inserir pesquisa NPS: {resultado}")
+                return NPSResponse(
+                    success=False,
+                    message="Erro ao salvar pesquisa",
+                    error=resultado.get('error', 'Erro desconhecido')
+                )
+        
+        except Exception as e:
+            logger.error(f"Erro ao criar pesquisa NPS: {str(e)}")
+            return NPSResponse(
+                success=False,
+                message="Erro interno do servidor",
+                error=str(e)
+            )
+    
+    async def enfileirar_pesquisa(self, dados: Dict[str, Any]) -> NPSResponse:
+        """Enfileira a pesquisa no modo lote/spool (o spool espera o fsync em grupo numa thread)"""
+        return await asyncio.to_thread(self.servico.enfileirar_pesquisa, dados)
+    
+    async def receber_pesquisa(self, dados: Dict[str, Any], chave_idempotencia: str = None) -> Tuple[NPSResponse, bool]:
+        """Cria (ou enfileira) a pesquisa, respondendo reenvios com a resposta original"""
+        chave, resposta, repetida = self.servico.reservar_envio(dados, chave_idempotencia)
+        if resposta is not None:
+            return resposta, repetida
+        
+        resposta = None
+        try:
+            if self.ingestao_assincrona:
+                resposta = await self.enfileirar_pesquisa(dados)
+            else:
+                resposta = await self.criar_pesquisa(dados)
+            return resposta, False
+        finally:
+            self.servico.concluir_envio(chave, resposta)
+    
+    async def listar_pesquisas(self, filial: str = None, limite: int = 100, cursor: str = None) -> NPSResponse:
+        """Lista pesquisas NPS com filtros opcionais, paginadas por chave"""
+        cache = self.servico.cache
+        chave = None
+        if cache is not None:
+            chave, resposta = cache.consultar('listar', filial, {'limite': limite, 'cursor': cursor})
+            if resposta is not None:
+                return resposta
+        
+        resposta = await self._listar_pesquisas(filial, limite, cursor)
+        if cache is not None:
+            cache.guardar(chave, resposta)
+        return resposta
+    
+    async def _listar_pesquisas(self, filial: str, limite: int, cursor: str) -> NPSResponse:
+        try:
+            filtros = {}
+            if filial:
+                filtros['filial'] = filial
+            
+            apos = None
+            if cursor:
+                try:
+                    apos = decodificar_cursor(cursor)
+                except ValueError as e:
+                    return NPSResponse(
+                        success=False,
+                        message="Parâmetros inválidos",
+                        error=str(e)
+                    )
+            
+            # Uma linha a mais indica se existe próxima página
+            sucesso, resultado = await self.client.select(
+                self.table_name, filtros, limite + 1, order=ORDEM_LISTAGEM, after=apos
+            )
+            
+            if not sucesso:
+                return NPSResponse(
+                    success=False,
+                    message="Erro ao buscar pesquisas",
+                    error=resultado.get('error', 'Erro desconhecido')
+                )
+            
+            next_cursor = None
+            if len(resultado) > limite:
+                resultado = resultado[:limite]
+                next_cursor = codificar_cursor(resultado[-1])
+            
+            return NPSResponse(
+                success=True,
+                message=f"Encontradas {len(resultado)} pesquisas",
+                data=resultado,
+                next_cursor=next_cursor
+            )
+        
+        except Exception as e:
+            logger.error(f"Erro ao listar pesquisas: {str(e)}")
+            return NPSResponse(
+                success=False,
+                message="Erro ao buscar pesquisas",
+                error=str(e)
+            )
+    
+    async def contar_categorias(self, filial: str = None) -> Tuple[bool, Any]:
+        """Conta promotores, neutros e detratores no banco (RPC ou três HEAD concorrentes)"""
+        if Config.NPS_ESTATISTICAS_RPC:
+            sucesso, resultado = await self.client.rpc(Config.NPS_ESTATISTICAS_RPC, {'p_filial': filial})
+            if not sucesso:
+                return False, resultado
+            
+            contagens = {'promotor': 0, 'neutro': 0, 'detrator': 0}
+            for linha in resultado:
+                if linha.get('categoria_nps') in contagens:
+                    contagens[linha['categoria_nps']] += int(linha.get('total') or 0)
+            return True, (contagens['promotor'], contagens['neutro'], contagens['detrator'])
+        
+        def filtros(categoria):
+            return {'categoria_nps': categoria, **({'filial': filial} if filial else {})}
+        
+        resultados = await asyncio.gather(*(
+            self.client.count(self.table_name, filtros(categoria), Config.NPS_CONTAGEM_METODO)
+            for categoria in ('promotor', 'neutro', 'detrator')
+        ))
+        for sucesso, resultado in resultados:
+            if not sucesso:
+                return False, resultado
+        return True, tuple(resultado for _, resultado in resultados)
+    
+    async def obter_estatisticas(self, filial: str = None) -> NPSResponse:
+        """Obtém estatísticas das pesquisas NPS"""
+        cache = self.servico.cache
+        chave = None
+        if cache is not None:
+            chave, resposta = cache.consultar('estatisticas', filial, {})
+            if resposta is not None:
+                return resposta
+        
+        resposta = await self._obter_estatisticas(filial)
+        if cache is not None:
+            cache.guardar(chave, resposta)
+        return resposta
+    
+    async def _obter_estatisticas(self, filial: str) -> NPSResponse:
+        try:
+            # Contadores e snapshot em memória não exigem I/O
+            for fonte in (self.servico.agregados, self.servico.snapshot):
+                if fonte is not None:
+                    contagens = fonte.contagens(filial)
+                    if contagens is not None:
+                        return self.servico._resposta_estatisticas(*contagens)
+            
+            sucesso, resultado = await self.contar_categorias(filial)
+            
+            if not sucesso:
+                return NPSResponse(
+                    success=False,
+                    message="Erro ao buscar dados para estatísticas",
+                    error=resultado.get('error', 'Erro desconhecido')
+                )
+            
+            return self.servico._resposta_estatisticas(*resultado)
+        
+        except Exception as e:
+            logger.error(f"Erro ao calcular estatísticas: {str(e)}")
+            return NPSResponse(
+                success=False,
+                message="Erro ao calcular estatísticas",
+                error=str(e)
+            )
+
+# Instância global do serviço, criada no primeiro uso
+nps_service_async = Preguicoso('nps_service_async', NPSServiceAsync)
@@ -1,7 +1,25 @@
-from typing import Dict, Any
-from src.database.supabase_client_simple import simple_supabase_client
-from src.models.nps_pesquisa_simple import NPSPesquisaSimple, NPSResponse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from src.config import Config
+from src.database.armazenamento import ArmazenamentoNPS, criar_armazenamento
+from src.models.nps_pesquisa_simple import NPSPesquisaSimple, NPSResponse, montar_estatisticas, validar_pesquisas
+from src.services.nps_agregados import NPSAgregados
+from src.services.nps_cache import NPSCache, MemoriaCacheBackend, RedisCacheBackend
+from src.services.nps_saude import MonitorSaude
+from src.services.nps_metricas import metricas
+from src.services.nps_perfil import NPSPerfilador
+from src.services.nps_admissao import ControleAdmissao, MemoriaLimiteBackend, RedisLimiteBackend
+from src.services.nps_inicializacao import Preguicoso
+from src.services.nps_idempotencia import NPSIdempotencia, REPETIDA, EM_ANDAMENTO
+from src.services.nps_paginacao import (
+    ORDEM_LISTAGEM, ORDEM_CRONOLOGICA, codificar_cursor, decodificar_cursor, intervalo_datas
+)
+from src.services.nps_ingestao import NPSIngestaoLote, STATUS_PENDENTE, inserir_isolando_falhas
+from src.services.nps_spool import NPSSpool
+import atexit
+import hashlib
 import logging
+import time
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -11,8 +29,359 @@ class NPSServiceSimple:
     """Serviço simplificado para operações relacionadas a pesquisas NPS"""
     
     def __init__(self):
-        self.client = simple_supabase_client
+        # Supabase ou SQLite local, conforme NPS_ARMAZENAMENTO
+        self.client: ArmazenamentoNPS = criar_armazenamento()
         self.table_name = 'nps_pesquisas'
+        
+        # Executor para disparar as contagens por categoria em paralelo
+        self._executor = ThreadPoolExecutor(max_workers=Config.SUPABASE_POOL_SIZE, thread_name_prefix='nps-contagem')
+        
+        # Contadores em memória para responder estatísticas sem consultar o banco
+        self.agregados = None
+        if Config.NPS_AGREGADOS_ATIVO:
+            self.agregados = NPSAgregados(
+                self._carregar_pagina_agregados,
+                intervalo_reconciliacao=Config.NPS_AGREGADOS_RECONCILIAR_S,
+                contar=self._contar_linhas
+            ).iniciar()
+        
+        # Cópia colunar da tabela para consultas analíticas em memória
+        self.snapshot = None
+        if Config.NPS_SNAPSHOT_ATIVO:
+            from src.services.nps_snapshot import NPSSnapshot
+            self.snapshot = NPSSnapshot(
+                self._carregar_pagina_snapshot,
+                intervalo_reconciliacao=Config.NPS_SNAPSHOT_RECONCILIAR_S,
+                contar=self._contar_linhas
+            ).iniciar()
+        
+        # Cache de respostas de leitura, invalidado por filial a cada gravação
+        self.cache = None
+        if Config.NPS_CACHE_ATIVO:
+            if Config.NPS_CACHE_REDIS_URL:
+                backend = RedisCacheBackend(Config.NPS_CACHE_REDIS_URL)
+            else:
+                backend = MemoriaCacheBackend(Config.NPS_CACHE_MAX_ITENS)
+            self.cache = NPSCache(backend, ttl=Config.NPS_CACHE_TTL_S)
+        
+        # Limites por IP/filial e de requisições em andamento, aplicados pelas rotas
+        self.admissao = None
+        if Config.NPS_ADMISSAO_ATIVO:
+            if Config.NPS_ADMISSAO_REDIS_URL:
+                backend_limite = RedisLimiteBackend(Config.NPS_ADMISSAO_REDIS_URL)
+            else:
+                backend_limite = MemoriaLimiteBackend()
+            self.admissao = ControleAdmissao(
+                backend_limite,
+                taxa_ip=Config.NPS_ADMISSAO_IP_RPS,
+                rajada_ip=Config.NPS_ADMISSAO_IP_RAJADA,
+                taxa_filial=Config.NPS_ADMISSAO_FILIAL_RPS,
+                rajada_filial=Config.NPS_ADMISSAO_FILIAL_RAJADA,
+                max_em_andamento=Config.NPS_ADMISSAO_MAX_EM_ANDAMENTO
+            )
+        
+        # Supressão de reenvios do POST /api/nps (Idempotency-Key ou hash do conteúdo)
+        self.idempotencia = None
+        if Config.NPS_IDEMPOTENCIA_ATIVO:
+            self.idempotencia = NPSIdempotencia(
+                max_itens=Config.NPS_IDEMPOTENCIA_MAX_ITENS,
+                ttl=Config.NPS_IDEMPOTENCIA_TTL_S,
+                bloom=Config.NPS_IDEMPOTENCIA_BLOOM,
+                por_conteudo=Config.NPS_IDEMPOTENCIA_CONTEUDO
+            )
+        
+        # Perfis de requisições sob demanda (as rotas só instalam os ganchos se ativo)
+        self.perfilador = None
+        if Config.NPS_PERFIL_ATIVO:
+            self.perfilador = NPSPerfilador(
+                Config.NPS_PERFIL_DIR,
+                max_perfis=Config.NPS_PERFIL_MAX_ARQUIVOS,
+                amostragem=Config.NPS_PERFIL_AMOSTRAGEM,
+                token=Config.NPS_PERFIL_TOKEN
+            )
+        
+        # Sonda periódica do banco; o health check responde do último resultado
+        self.saude = MonitorSaude(
+            self.client.test_connection,
+            intervalo=Config.NPS_SAUDE_INTERVALO_S,
+            janela=Config.NPS_SAUDE_JANELA
+        ).iniciar()
+        
+        # Contadores da idempotência, da admissão e da sonda lidos a cada coleta
+        metricas.registrar_coletor(self._medicoes)
+        
+        # Ingestão assíncrona opcional (POST responde 202 com recibo)
+        self.ingestao = None
+        if Config.NPS_INGESTAO_MODO == 'spool':
+            self.ingestao = NPSSpool(
+                self.client,
+                self.table_name,
+                Config.NPS_SPOOL_DIR,
+                segmento_max_bytes=int(Config.NPS_SPOOL_SEGMENTO_MB * 1024 * 1024),
+                fsync_ms=Config.NPS_SPOOL_FSYNC_MS,
+                tamanho_lote=Config.NPS_LOTE_TAMANHO,
+                coluna_dedup=Config.NPS_INGESTAO_DEDUP_COLUNA,
+                ao_gravar=self._registrar_gravacoes
+            ).iniciar()
+            atexit.register(self.ingestao.encerrar)
+        elif Config.NPS_INGESTAO_MODO == 'lote':
+            self.ingestao = NPSIngestaoLote(
+                self.client,
+                self.table_name,
+                tamanho_lote=Config.NPS_LOTE_TAMANHO,
+                intervalo_ms=Config.NPS_LOTE_INTERVALO_MS,
+                fila_max=Config.NPS_LOTE_FILA_MAX,
+                tentativas=Config.NPS_LOTE_TENTATIVAS,
+                coluna_dedup=Config.NPS_INGESTAO_DEDUP_COLUNA,
+                ao_gravar=self._registrar_gravacoes
+            ).iniciar()
+            atexit.register(self.ingestao.encerrar)
+    
+    @property
+    def ingestao_assincrona(self) -> bool:
+        return self.ingestao is not None
+    
+    def aquecer(self, tempo_max: float = 10.0) -> Dict[str, Any]:
+        """Prepara o serviço antes das primeiras requisições
+        
+        Abre as conexões do pool do banco e espera a primeira carga dos
+        contadores e do snapshot (que já rodam em segundo plano), até
+        `tempo_max` segundos no total. Nada falha aqui: o que não ficar
+        pronto é feito sob demanda, como sem aquecimento.
+        """
+        limite = time.monotonic() + tempo_max
+        resultado = {'conexoes': self.client.pre_conectar()}
+        for nome in ('agregados', 'snapshot'):
+            componente = getattr(self, nome)
+            if componente is not None:
+                resultado[nome] = componente.aguardar(max(limite - time.monotonic(), 0))
+        return resultado
+    
+    def _medicoes(self) -> List[Tuple[str, Tuple, float]]:
+        """Medições expostas em GET /api/metrics a partir dos contadores dos componentes"""
+        medicoes = [('nps_banco_conectado', (), 1 if self.saude.estado()['sucesso'] else 0)]
+        
+        if self.idempotencia is not None:
+            estatisticas = self.idempotencia.estatisticas()
+            for resultado in ('novas', 'repetidas', 'em_andamento'):
+                medicoes.append(('nps_idempotencia_total', (('resultado', resultado),), estatisticas[resultado]))
+        
+        if self.admissao is not None:
+            estatisticas = self.admissao.estatisticas()
+            for resultado in ('admitidas', 'recusadas_ip', 'recusadas_filial', 'recusadas_concorrencia'):
+                medicoes.append(('nps_admissao_total', (('resultado', resultado),), estatisticas[resultado]))
+            medicoes.append(('nps_admissao_em_andamento', (), estatisticas['em_andamento']))
+        
+        return medicoes
+    
+    def _carregar_pagina_agregados(self, apos_id: int, limite: int) -> List[Dict[str, Any]]:
+        sucesso, resultado = self.client.select(
+            self.table_name,
+            limit=limite,
+            columns='id,filial,categoria_nps',
+            order='id.asc',
+            after=apos_id
+        )
+        if not sucesso:
+            raise Exception(resultado.get('error', 'Erro desconhecido'))
+        return resultado
+    
+    def _carregar_pagina_snapshot(self, apos_id: int, limite: int) -> List[Dict[str, Any]]:
+        sucesso, resultado = self.client.select(
+            self.table_name,
+            limit=limite,
+            columns='id,filial,score,timestamp',
+            order='id.asc',
+            after=apos_id
+        )
+        if not sucesso:
+            raise Exception(resultado.get('error', 'Erro desconhecido'))
+        return resultado
+    
+    def _contar_linhas(self) -> int:
+        sucesso, resultado = self.client.count(self.table_name)
+        if not sucesso:
+            raise Exception(resultado.get('error', 'Erro desconhecido'))
+        return resultado
+    
+    def _registrar_gravacoes(self, linhas: List[Dict[str, Any]]):
+        """Atualiza os contadores e o snapshot em memória e invalida o cache das filiais afetadas"""
+        if self.agregados is not None:
+            self.agregados.registrar(linhas)
+        if self.snapshot is not None:
+            self.snapshot.registrar(linhas)
+        if self.cache is not None:
+            for filial in {linha.get('filial') for linha in linhas}:
+                self.cache.invalidar(filial)
+    
+    def versao_dados(self, endpoint: str, filial: str = None) -> Optional[str]:
+        """Versão do corpo de uma resposta de leitura, a mesma em todos os workers
+        
+        É a versão da filial no cache Redis, a mesma que entra na chave das
+        respostas guardadas lá: toda gravação, de qualquer worker, a incrementa.
+        Só existe quando o corpo vem do banco através desse cache. Um corpo
+        montado da memória deste worker (cache local, contadores ou snapshot,
+        que outros workers não veem e a reconciliação muda sem gravação) não tem
+        versão: retorna None e a resposta sai sem ETag.
+        """
+        if self.cache is None or not self.cache.compartilhado:
+            return None
+        if endpoint in ('estatisticas', 'estatisticas_filiais') and (
+                self.agregados is not None or self.snapshot is not None):
+            return None
+        return f"g{self.cache.versao(filial)}"
+    
+    @staticmethod
+    def montar_etag(endpoint: str, filial: str, versao: str, params: Dict[str, Any]) -> str:
+        parametros = '&'.join(f'{k}={v}' for k, v in sorted(params.items()) if v is not None)
+        chave = f"{endpoint}|{filial or '*'}|{parametros}|{versao}"
+        return hashlib.sha1(chave.encode('utf-8')).hexdigest()[:24]
+    
+    def etag(self, endpoint: str, filial: str = None, **params) -> Optional[str]:
+        """ETag forte de uma resposta de leitura, derivado da versão dos dados (None sem versão)"""
+        try:
+            versao = self.versao_dados(endpoint, filial)
+        except Exception as e:
+            logger.error(f"Erro ao obter versão dos dados NPS: {str(e)}")
+            return None
+        if versao is None:
+            return None
+        return self.montar_etag(endpoint, filial, versao, params)
+    
+    def contar_categorias(self, filial: str = None) -> Tuple[bool, Any]:
+        """Conta promotores, neutros e detratores no banco sem transferir as linhas
+        
+        Usa a função RPC configurada (um GROUP BY no banco) ou, sem ela, três
+        contagens HEAD concorrentes, uma por categoria.
+        """
+        if Config.NPS_ESTATISTICAS_RPC:
+            sucesso, resultado = self.client.rpc(Config.NPS_ESTATISTICAS_RPC, {'p_filial': filial})
+            if not sucesso:
+                return False, resultado
+            
+            contagens = {'promotor': 0, 'neutro': 0, 'detrator': 0}
+            for linha in resultado:
+                if linha.get('categoria_nps') in contagens:
+                    contagens[linha['categoria_nps']] += int(linha.get('total') or 0)
+            return True, (contagens['promotor'], contagens['neutro'], contagens['detrator'])
+        
+        def contar(categoria):
+            filtros = {'categoria_nps': categoria}
+            if filial:
+                filtros['filial'] = filial
+            return self.client.count(self.table_name, filtros, Config.NPS_CONTAGEM_METODO)
+        
+        resultados = list(self._executor.map(contar, ('promotor', 'neutro', 'detrator')))
+        for sucesso, resultado in resultados:
+            if not sucesso:
+                return False, resultado
+        return True, tuple(resultado for _, resultado in resultados)
+    
+    def contar_categorias_por_filial(self) -> Tuple[bool, Any]:
+        """Conta promotores, neutros e detratores de todas as filiais de uma vez
+        
+        Usa a função RPC configurada (um único GROUP BY filial, categoria) ou,
+        sem ela, uma varredura paginada das colunas filial e categoria.
+        """
+        indices = {'promotor': 0, 'neutro': 1, 'detrator': 2}
+        contagens = {}
+        
+        if Config.NPS_ESTATISTICAS_RPC:
+            sucesso, resultado = self.client.rpc(Config.NPS_ESTATISTICAS_RPC, {'p_filial': None})
+            if not sucesso:
+                return False, resultado
+            
+            for linha in resultado:
+                indice = indices.get(linha.get('categoria_nps'))
+                if indice is not None:
+                    contagens.setdefault(linha.get('filial'), [0, 0, 0])[indice] += int(linha.get('total') or 0)
+        else:
+            apos_id = 0
+            while True:
+                try:
+                    pagina = self._carregar_pagina_agregados(apos_id, 1000)
+                except Exception as e:
+                    return False, {'error': str(e)}
+                # Só uma página vazia indica o fim: o PostgREST corta em `max-rows`
+                if not pagina:
+                    break
+                for linha in pagina:
+                    indice = indices.get(linha.get('categoria_nps'))
+                    if indice is not None:
+                        contagens.setdefault(linha.get('filial'), [0, 0, 0])[indice] += 1
+                apos_id = pagina[-1]['id']
+        
+        return True, {filial: tuple(contador) for filial, contador in contagens.items()}
+    
+    def _resposta_estatisticas(self, promotores: int, neutros: int, detratores: int) -> NPSResponse:
+        if promotores + neutros + detratores == 0:
+            return NPSResponse(
+                success=True,
+                message="Nenhuma pesquisa encontrada",
+                data={
+                    'total': 0,
+                    'promotores': 0,
+                    'neutros': 0,
+                    'detratores': 0,
+                    'nps_score': 0
+                }
+            )
+        
+        return NPSResponse(
+            success=True,
+            message="Estatísticas calculadas com sucesso",
+            data=montar_estatisticas(promotores, neutros, detratores)
+        )
+    
+    def reservar_envio(self, dados: Any, chave_idempotencia: str = None) -> Tuple[Optional[str], Optional[NPSResponse], bool]:
+        """Consulta a supressão de reenvios antes de gravar
+        
+        Retorna (chave reservada, resposta pronta, repetida). Com resposta pronta
+        o envio não deve ser gravado: é a resposta original de um reenvio ou um
+        409 para um reenvio concorrente. Com chave reservada, a resposta da
+        gravação deve ser entregue a `concluir_envio`.
+        """
+        if self.idempotencia is None:
+            return None, None, False
+        
+        chaves = self.idempotencia.chaves(chave_idempotencia, dados)
+        if not chaves:
+            return None, None, False
+        
+        estado, resposta = self.idempotencia.reservar(chaves)
+        if estado == REPETIDA:
+            return None, resposta, True
+        if estado == EM_ANDAMENTO:
+            return None, NPSResponse(
+                success=False,
+                message="Envio repetido ainda em processamento",
+                error="Requisição concorrente com a mesma chave de idempotência",
+                status_code=409
+            ), False
+        return chaves[0], None, False
+    
+    def concluir_envio(self, chave: Optional[str], resposta: Optional[NPSResponse]):
+        if chave is not None:
+            self.idempotencia.concluir(chave, resposta)
+    
+    def receber_pesquisa(self, dados: Any, chave_idempotencia: str = None) -> Tuple[NPSResponse, bool]:
+        """Cria (ou enfileira) a pesquisa, respondendo reenvios com a resposta original
+        
+        Retorna (resposta, repetida).
+        """
+        chave, resposta, repetida = self.reservar_envio(dados, chave_idempotencia)
+        if resposta is not None:
+            return resposta, repetida
+        
+        resposta = None
+        try:
+            if self.ingestao_assincrona:
+                resposta = self.enfileirar_pesquisa(dados)
+            else:
+                resposta = self.criar_pesquisa(dados)
+            return resposta, False
+        finally:
+            self.concluir_envio(chave, resposta)
     
     def criar_pesquisa(self, dados: Dict[str, Any]) -> NPSResponse:
         """Cria uma nova pesquisa NPS"""
@@ -24,6 +393,7 @@ class NPSServiceSimple:
             valido, mensagem = pesquisa.validate()
             if not valido:
                 logger.error(f"Erro de validação: {mensagem}")
+                metricas.registrar_validacao_invalida(mensagem)
                 return NPSResponse(
                     success=False,
                     message="Dados inválidos",
@@ -37,6 +407,7 @@ class NPSServiceSimple:
             sucesso, resultado = self.client.insert(self.table_name, dados_inserir)
             
             if sucesso:
+                self._registrar_gravacoes([resultado])
                 logger.info(f"Pesquisa NPS criada com sucesso")
                 return NPSResponse(
                     success=True,
@@ -50,7 +421,7 @@ class NPSServiceSimple:
                     message="Erro ao salvar pesquisa",
                     error=resultado.get('error', 'Erro desconhecido')
                 )
-                
+        
         except Exception as e:
             logger.error(f"Erro ao criar pesquisa NPS: {str(e)}")
             return NPSResponse(
@@ -59,20 +430,212 @@ class NPSServiceSimple:
                 error=str(e)
             )
     
-    def listar_pesquisas(self, filial: str = None, limite: int = 100) -> NPSResponse:
-        """Lista pesquisas NPS com filtros opcionais"""
+    def enfileirar_pesquisa(self, dados: Dict[str, Any]) -> NPSResponse:
+        """Valida a pesquisa e a enfileira para gravação assíncrona (lote ou spool)"""
+        try:
+            pesquisa = NPSPesquisaSimple(**dados)
+            
+            valido, mensagem = pesquisa.validate()
+            if not valido:
+                logger.error(f"Erro de validação: {mensagem}")
+                metricas.registrar_validacao_invalida(mensagem)
+                return NPSResponse(
+                    success=False,
+                    message="Dados inválidos",
+                    error=mensagem
+                )
+            
+            recibo = self.ingestao.enfileirar(pesquisa.to_dict())
+            
+            if recibo is None:
+                logger.error("Ingestão NPS indisponível (fila cheia, spool com erro ou encerrado)")
+                return NPSResponse(
+                    success=False,
+                    message="Serviço temporariamente sobrecarregado",
+                    error="Ingestão indisponível",
+                    status_code=503
+                )
+            
+            return NPSResponse(
+                success=True,
+                message="Pesquisa NPS recebida para processamento",
+                data={'recibo': recibo, 'status': STATUS_PENDENTE},
+                status_code=202
+            )
+        
+        except Exception as e:
+            logger.error(f"Erro ao enfileirar pesquisa NPS: {str(e)}")
+            return NPSResponse(
+                success=False,
+                message="Erro interno do servidor",
+                error=str(e)
+            )
+    
+    def criar_pesquisas_lote(self, itens: List[Any]) -> NPSResponse:
+        """Valida e grava várias pesquisas com bulk inserts em blocos de NPS_LOTE_BLOCO linhas
+        
+        Retorna o resultado de cada item pela posição no array enviado, para que
+        o coletor reenvie apenas os que falharam. A gravação é direta mesmo nos
+        modos lote/spool: o coletor guarda as pesquisas até a resposta, e 201/207
+        só confirmam linhas já gravadas no banco. Sem nenhuma gravada, responde
+        503 se alguma falhou no banco (vale reenviar) ou 400 se todas foram recusadas.
+        """
+        try:
+            if not isinstance(itens, list) or not itens:
+                return NPSResponse(
+                    success=False,
+                    message="Dados inválidos",
+                    error="O corpo deve ser um array de pesquisas não vazio",
+                    status_code=400
+                )
+            
+            if len(itens) > Config.NPS_LOTE_MAX_ITENS:
+                return NPSResponse(
+                    success=False,
+                    message="Lote muito grande",
+                    error=f"Máximo de {Config.NPS_LOTE_MAX_ITENS} pesquisas por requisição",
+                    status_code=413
+                )
+            
+            resultados = [None] * len(itens)
+            posicoes, linhas = [], []
+            for posicao, (linha, erro) in enumerate(validar_pesquisas(itens)):
+                if erro is None:
+                    linhas.append(linha)
+                    posicoes.append(posicao)
+                else:
+                    metricas.registrar_validacao_invalida(erro)
+                    resultados[posicao] = {'posicao': posicao, 'success': False, 'error': erro}
+            
+            gravadas = []
+            # Falhas que não são de dados (timeout, 5xx): o mesmo item pode dar certo depois
+            transitorias = 0
+            for inicio in range(0, len(linhas), Config.NPS_LOTE_BLOCO):
+                bloco = linhas[inicio:inicio + Config.NPS_LOTE_BLOCO]
+                try:
+                    resultados_bloco = inserir_isolando_falhas(self.client, self.table_name, bloco)
+                except Exception as e:
+                    resultados_bloco = [(False, {'error': str(e)}) for _ in bloco]
+                
+                for posicao, (sucesso, resultado) in zip(posicoes[inicio:inicio + len(bloco)], resultados_bloco):
+                    if sucesso:
+                        gravadas.append(resultado)
+                        resultados[posicao] = {'posicao': posicao, 'success': True, 'id': resultado.get('id')}
+                    else:
+                        if not 400 <= (resultado.get('status_code') or 0) < 500:
+                            transitorias += 1
+                        resultados[posicao] = {
+                            'posicao': posicao,
+                            'success': False,
+                            'error': resultado.get('error', 'Erro desconhecido')
+                        }
+            
+            if gravadas:
+                self._registrar_gravacoes(gravadas)
+            
+            falhas = len(itens) - len(gravadas)
+            if falhas == 0:
+                status_code = 201
+            elif gravadas:
+                # 207: parte dos itens falhou; o array `itens` indica quais reenviar
+                status_code = 207
+            else:
+                status_code = 503 if transitorias else 400
+            logger.info(f"Lote NPS recebido: {len(gravadas)}/{len(itens)} pesquisas gravadas")
+            return NPSResponse(
+                success=falhas == 0,
+                message=f"{len(gravadas)} de {len(itens)} pesquisas salvas",
+                data={
+                    'total': len(itens),
+                    'gravadas': len(gravadas),
+                    'falhas': falhas,
+                    'itens': resultados
+                },
+                status_code=status_code
+            )
+        
+        except Exception as e:
+            logger.error(f"Erro ao criar lote de pesquisas NPS: {str(e)}")
+            return NPSResponse(
+                success=False,
+                message="Erro interno do servidor",
+                error=str(e)
+            )
+    
+    def status_recibo(self, recibo: str) -> NPSResponse:
+        """Consulta o status de gravação de uma pesquisa recebida de forma assíncrona"""
+        try:
+            status = self.ingestao.status_recibo(recibo) if self.ingestao else None
+            
+            if status is None:
+                return NPSResponse(
+                    success=False,
+                    message="Recibo não encontrado",
+                    error=f"Recibo desconhecido: {recibo}",
+                    status_code=404
+                )
+            
+            status['recibo'] = recibo
+            return NPSResponse(
+                success=True,
+                message=f"Status da pesquisa: {status['status']}",
+                data=status
+            )
+            
+        except Exception as e:
+            logger.error(f"Erro ao consultar recibo: {str(e)}")
+            return NPSResponse(
+                success=False,
+                message="Erro interno do servidor",
+                error=str(e)
+            )
+    
+    def listar_pesquisas(self, filial: str = None, limite: int = 100, cursor: str = None) -> NPSResponse:
+        """Lista pesquisas NPS com filtros opcionais
+        
+        A listagem é ordenada por (timestamp, id) decrescente e paginada por
+        chave: `next_cursor` aponta para a página seguinte e é omitido na última.
+        """
+        if self.cache is not None:
+            return self.cache.obter_ou_calcular(
+                'listar', filial, {'limite': limite, 'cursor': cursor},
+                lambda: self._listar_pesquisas(filial, limite, cursor)
+            )
+        return self._listar_pesquisas(filial, limite, cursor)
+    
+    def _listar_pesquisas(self, filial: str, limite: int, cursor: str) -> NPSResponse:
         try:
             filtros = {}
             if filial:
                 filtros['filial'] = filial
             
-            sucesso, resultado = self.client.select(self.table_name, filtros, limite)
+            apos = None
+            if cursor:
+                try:
+                    apos = decodificar_cursor(cursor)
+                except ValueError as e:
+                    return NPSResponse(
+                        success=False,
+                        message="Parâmetros inválidos",
+                        error=str(e)
+                    )
+            
+            # Uma linha a mais indica se existe próxima página
+            sucesso, resultado = self.client.select(
+                self.table_name, filtros, limite + 1, order=ORDEM_LISTAGEM, after=apos
+            )
             
             if sucesso:
+                next_cursor = None
+                if len(resultado) > limite:
+                    resultado = resultado[:limite]
+                    next_cursor = codificar_cursor(resultado[-1])
+                
                 return NPSResponse(
                     success=True,
                     message=f"Encontradas {len(resultado)} pesquisas",
-                    data=resultado
+                    data=resultado,
+                    next_cursor=next_cursor
                 )
             else:
                 return NPSResponse(
@@ -80,7 +643,7 @@ class NPSServiceSimple:
                     message="Erro ao buscar pesquisas",
                     error=resultado.get('error', 'Erro desconhecido')
                 )
-            
+        
         except Exception as e:
             logger.error(f"Erro ao listar pesquisas: {str(e)}")
             return NPSResponse(
@@ -89,61 +652,270 @@ class NPSServiceSimple:
                 error=str(e)
             )
     
-    def obter_estatisticas(self, filial: str = None) -> NPSResponse:
-        """Obtém estatísticas das pesquisas NPS"""
+    def exportar_pesquisas(self, filial: str = None, de: str = None, ate: str = None,
+                           tamanho_pagina: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Retorna um gerador de páginas com todas as pesquisas do filtro, em ordem cronológica
+        
+        Os parâmetros são validados na chamada (ValueError); as páginas são
+        buscadas sob demanda por chave (timestamp, id), mantendo no máximo uma
+        página em memória.
+        """
+        filtros = {}
+        if filial:
+            filtros['filial'] = filial
+        intervalo = intervalo_datas(de, ate)
+        
+        return self._paginas_cronologicas(filtros, intervalo, tamanho_pagina)
+    
+    def _paginas_cronologicas(self, filtros: Dict[str, Any], intervalo: Tuple[str, str],
+                              tamanho_pagina: int, colunas: str = '*') -> Iterator[List[Dict[str, Any]]]:
+        apos = None
+        while True:
+            sucesso, resultado = self.client.select(
+                self.table_name, filtros, tamanho_pagina, columns=colunas,
+                order=ORDEM_CRONOLOGICA, after=apos, ranges={'timestamp': intervalo}
+            )
+            if not sucesso:
+                raise Exception(resultado.get('error', 'Erro desconhecido'))
+            # Só uma página vazia indica o fim: o PostgREST corta em `max-rows`
+            if not resultado:
+                return
+            yield resultado
+            apos = (resultado[-1]['timestamp'], resultado[-1]['id'])
+    
+    def obter_tendencia(self, filial: str = None, granularidade: str = 'dia',
+                        de: str = None, ate: str = None) -> NPSResponse:
+        """Obtém as estatísticas NPS por dia, semana ou mês"""
+        if self.cache is not None:
+            return self.cache.obter_ou_calcular(
+                'tendencia', filial, {'granularidade': granularidade, 'de': de, 'ate': ate},
+                lambda: self._obter_tendencia(filial, granularidade, de, ate)
+            )
+        return self._obter_tendencia(filial, granularidade, de, ate)
+    
+    def _obter_tendencia(self, filial: str, granularidade: str, de: str, ate: str) -> NPSResponse:
+        # numpy só é importado na primeira tendência (ou com o snapshot ativo), fora da subida do app
+        import numpy as np
+        from src.services.nps_tendencia import GRANULARIDADES, calcular_tendencia, timestamps_epoch
+        
         try:
-            filtros = {}
-            if filial:
-                filtros['filial'] = filial
-            
-            sucesso, resultado = self.client.select(self.table_name, filtros, 1000)
+            if granularidade not in GRANULARIDADES:
+                raise ValueError(f"Granularidade inválida: {granularidade}. Use {', '.join(GRANULARIDADES)}")
+            intervalo = intervalo_datas(de, ate)
+        except ValueError as e:
+            return NPSResponse(
+                success=False,
+                message="Parâmetros inválidos",
+                error=str(e)
+            )
+        
+        try:
+            colunas = None
+            if self.snapshot is not None:
+                inicio, fim = (int(timestamps_epoch([valor])[0]) if valor else None for valor in intervalo)
+                colunas = self.snapshot.colunas(filial, inicio, fim)
             
-            if not sucesso:
-                return NPSResponse(
-                    success=False,
-                    message="Erro ao buscar dados para estatísticas",
-                    error=resultado.get('error', 'Erro desconhecido')
+            if colunas is None:
+                filtros = {}
+                if filial:
+                    filtros['filial'] = filial
+                
+                # Só as colunas usadas, convertidas em arrays tipados página a página
+                timestamps, scores = [], []
+                for pagina in self._paginas_cronologicas(filtros, intervalo, 1000, colunas='id,timestamp,score'):
+                    timestamps.append(timestamps_epoch(linha['timestamp'] for linha in pagina))
+                    scores.append(np.fromiter((linha['score'] for linha in pagina), dtype=np.int8, count=len(pagina)))
+                colunas = (
+                    np.concatenate(timestamps) if timestamps else np.empty(0, dtype=np.int64),
+                    np.concatenate(scores) if scores else np.empty(0, dtype=np.int8)
                 )
             
-            if not resultado:
-                return NPSResponse(
-                    success=True,
-                    message="Nenhuma pesquisa encontrada",
-                    data={
-                        'total': 0,
-                        'promotores': 0,
-                        'neutros': 0,
-                        'detratores': 0,
-                        'nps_score': 0
-                    }
-                )
+            periodos = calcular_tendencia(*colunas, granularidade)
             
-            # Calcular estatísticas
-            total = len(resultado)
-            promotores = len([p for p in resultado if p.get('categoria_nps') == 'promotor'])
-            detratores = len([p for p in resultado if p.get('categoria_nps') == 'detrator'])
-            neutros = total - promotores - detratores
+            return NPSResponse(
+                success=True,
+                message=f"Tendência calculada com {len(periodos)} períodos",
+                data={
+                    'filial': filial,
+                    'granularidade': granularidade,
+                    'periodos': periodos
+                }
+            )
+        
+        except Exception as e:
+            logger.error(f"Erro ao calcular tendência: {str(e)}")
+            return NPSResponse(
+                success=False,
+                message="Erro ao calcular tendência",
+                error=str(e)
+            )
+    
+    def estatisticas_idempotencia(self) -> NPSResponse:
+        """Contadores da supressão de reenvios (repetições respondidas sem gravar)"""
+        if self.idempotencia is None:
+            return NPSResponse(
+                success=True,
+                message="Supressão de reenvios desativada",
+                data={'ativo': False}
+            )
+        
+        dados = self.idempotencia.estatisticas()
+        dados['ativo'] = True
+        return NPSResponse(
+            success=True,
+            message="Estatísticas de idempotência",
+            data=dados
+        )
+    
+    def _acesso_perfis(self, token: Optional[str]) -> Optional[NPSResponse]:
+        if self.perfilador is None:
+            return NPSResponse(
+                success=False,
+                message="Perfilamento desativado",
+                error="Defina NPS_PERFIL_ATIVO=true",
+                status_code=404
+            )
+        if not self.perfilador.token_valido(token):
+            return NPSResponse(
+                success=False,
+                message="Acesso negado",
+                error="Cabeçalho X-NPS-Profile ausente ou inválido",
+                status_code=403
+            )
+        return None
+    
+    def listar_perfis(self, token: Optional[str], limite: int = 50) -> NPSResponse:
+        """Perfis de requisições mais recentes (requer o token de perfilamento)"""
+        recusa = self._acesso_perfis(token)
+        if recusa is not None:
+            return recusa
+        
+        perfis = self.perfilador.listar(limite)
+        return NPSResponse(
+            success=True,
+            message=f"{len(perfis)} perfis encontrados",
+            data=perfis
+        )
+    
+    def arquivo_perfil(self, token: Optional[str], perfil_id: str, formato: str) -> Tuple[Optional[str], Optional[NPSResponse]]:
+        """Retorna (caminho do arquivo, None) ou (None, resposta de erro)"""
+        recusa = self._acesso_perfis(token)
+        if recusa is not None:
+            return None, recusa
+        
+        caminho = self.perfilador.arquivo(perfil_id, formato)
+        if caminho is None:
+            return None, NPSResponse(
+                success=False,
+                message="Perfil não encontrado",
+                error=f"Perfil '{perfil_id}' inexistente ou formato inválido (use pstats ou texto)",
+                status_code=404
+            )
+        return caminho, None
+    
+    def estatisticas_cache(self) -> NPSResponse:
+        """Contadores de acerto, falha e descarte do cache de respostas"""
+        if self.cache is None:
+            return NPSResponse(
+                success=True,
+                message="Cache de respostas desativado",
+                data={'ativo': False}
+            )
+        
+        dados = self.cache.estatisticas()
+        dados['ativo'] = True
+        return NPSResponse(
+            success=True,
+            message="Estatísticas do cache",
+            data=dados
+        )
+    
+    def obter_estatisticas_filiais(self) -> NPSResponse:
+        """Obtém as estatísticas de todas as filiais e do total, com ranking por NPS"""
+        if self.cache is not None:
+            return self.cache.obter_ou_calcular('estatisticas_filiais', None, {}, self._obter_estatisticas_filiais)
+        return self._obter_estatisticas_filiais()
+    
+    def _obter_estatisticas_filiais(self) -> NPSResponse:
+        try:
+            # Mesma ordem de fontes de obter_estatisticas, com uma única leitura
+            contagens = None
+            if self.snapshot is not None:
+                contagens = self.snapshot.contagens_por_filial()
+            if contagens is None and self.agregados is not None:
+                contagens = self.agregados.contagens_por_filial()
+            if contagens is None:
+                sucesso, resultado = self.contar_categorias_por_filial()
+                if not sucesso:
+                    return NPSResponse(
+                        success=False,
+                        message="Erro ao buscar dados para estatísticas",
+                        error=resultado.get('error', 'Erro desconhecido')
+                    )
+                contagens = resultado
             
-            # Calcular NPS Score
-            nps_score = ((promotores - detratores) / total) * 100 if total > 0 else 0
+            total = montar_estatisticas(*(sum(c[i] for c in contagens.values()) for i in range(3)))
             
-            estatisticas = {
-                'total': total,
-                'promotores': promotores,
-                'neutros': neutros,
-                'detratores': detratores,
-                'nps_score': round(nps_score, 2),
-                'percentual_promotores': round((promotores / total) * 100, 2) if total > 0 else 0,
-                'percentual_neutros': round((neutros / total) * 100, 2) if total > 0 else 0,
-                'percentual_detratores': round((detratores / total) * 100, 2) if total > 0 else 0
-            }
+            filiais = [
+                {'filial': filial, **montar_estatisticas(*contador)}
+                for filial, contador in contagens.items() if sum(contador) > 0
+            ]
+            filiais.sort(key=lambda f: (-f['nps_score'], -f['total'], f['filial']))
+            for posicao, estatisticas in enumerate(filiais, start=1):
+                estatisticas['posicao'] = posicao
+                estatisticas['delta_nps'] = round(estatisticas['nps_score'] - total['nps_score'], 2)
             
             return NPSResponse(
                 success=True,
-                message="Estatísticas calculadas com sucesso",
-                data=estatisticas
+                message=f"Estatísticas de {len(filiais)} filiais calculadas com sucesso",
+                data={
+                    'total': total,
+                    'filiais': filiais
+                }
+            )
+        
+        except Exception as e:
+            logger.error(f"Erro ao calcular estatísticas por filial: {str(e)}")
+            return NPSResponse(
+                success=False,
+                message="Erro ao calcular estatísticas",
+                error=str(e)
+            )
+    
+    def obter_estatisticas(self, filial: str = None) -> NPSResponse:
+        """Obtém estatísticas das pesquisas NPS"""
+        if self.cache is not None:
+            return self.cache.obter_ou_calcular(
+                'estatisticas', filial, {},
+                lambda: self._obter_estatisticas(filial)
             )
+        return self._obter_estatisticas(filial)
+    
+    def _obter_estatisticas(self, filial: str) -> NPSResponse:
+        try:
+            # Responder dos contadores em memória quando já semeados
+            if self.agregados is not None:
+                contagens = self.agregados.contagens(filial)
+                if contagens is not None:
+                    return self._resposta_estatisticas(*contagens)
+            
+            if self.snapshot is not None:
+                contagens = self.snapshot.contagens(filial)
+                if contagens is not None:
+                    return self._resposta_estatisticas(*contagens)
+            
+            # Contar por categoria no próprio banco
+            sucesso, resultado = self.contar_categorias(filial)
+            
+            if not sucesso:
+                return NPSResponse(
+                    success=False,
+                    message="Erro ao buscar dados para estatísticas",
+                    error=resultado.get('error', 'Erro desconhecido')
+                )
             
+            return self._resposta_estatisticas(*resultado)
+        
         except Exception as e:
             logger.error(f"Erro ao calcular estatísticas: {str(e)}")
             return NPSResponse(
@@ -152,6 +924,6 @@ class NPSServiceSimple:
                 error=str(e)
             )
 
-# Instância global do serviço
-nps_service_simple = NPSServiceSimple()
+# Instância global do serviço, criada no primeiro uso
+nps_service_simple = Preguicoso('nps_service_simple', NPSServiceSimple)
 
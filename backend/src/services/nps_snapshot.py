@@ -0,0 +1,254 @@
+import threading
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from src.services.nps_tendencia import timestamps_epoch
+
+logger = logging.getLogger(__name__)
+
+# Códigos da coluna `categoria`, na mesma ordem das contagens (p, n, d)
+CATEGORIA_PROMOTOR, CATEGORIA_NEUTRO, CATEGORIA_DETRATOR = 0, 1, 2
+
+_MAX_FILIAIS = 256
+
+class _Colunas:
+    """Colunas tipadas com capacidade que dobra a cada estouro (acréscimo amortizado)"""
+    
+    def __init__(self, capacidade: int = 1024):
+        self.tamanho = 0
+        self.filial = np.empty(capacidade, dtype=np.uint8)
+        self.score = np.empty(capacidade, dtype=np.int8)
+        self.categoria = np.empty(capacidade, dtype=np.int8)
+        self.timestamp = np.empty(capacidade, dtype=np.int64)
+    
+    def acrescentar(self, filial: np.ndarray, score: np.ndarray, categoria: np.ndarray, timestamp: np.ndarray):
+        fim = self.tamanho + len(filial)
+        if fim > len(self.filial):
+            capacidade = max(fim, 2 * len(self.filial))
+            for nome in ('filial', 'score', 'categoria', 'timestamp'):
+                antigo = getattr(self, nome)
+                novo = np.empty(capacidade, dtype=antigo.dtype)
+                novo[:self.tamanho] = antigo[:self.tamanho]
+                setattr(self, nome, novo)
+        
+        self.filial[self.tamanho:fim] = filial
+        self.score[self.tamanho:fim] = score
+        self.categoria[self.tamanho:fim] = categoria
+        self.timestamp[self.tamanho:fim] = timestamp
+        self.tamanho = fim
+    
+    def visao(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # Fatias até o tamanho atual: acréscimos posteriores não as alteram
+        return (self.filial[:self.tamanho], self.score[:self.tamanho],
+                self.categoria[:self.tamanho], self.timestamp[:self.tamanho])
+    
+    @property
+    def nbytes(self) -> int:
+        return self.filial.nbytes + self.score.nbytes + self.categoria.nbytes + self.timestamp.nbytes
+
+class NPSSnapshot:
+    """Cópia colunar compacta de `nps_pesquisas` em memória para consultas analíticas
+    
+    Cada pesquisa ocupa 11 bytes: filial codificada por dicionário (uint8),
+    score e categoria (int8) e timestamp em segundos epoch (int64). Estatísticas,
+    tendências e comparações entre filiais são calculadas com operações
+    vetorizadas sobre essas colunas.
+    
+    Segue o ciclo de `NPSAgregados`: é semeado por uma varredura paginada,
+    recebe as pesquisas gravadas por este worker via `registrar` e é
+    reconstruído periodicamente, o que incorpora as gravações de outros workers.
+    
+    `carregar_pagina(apos_id, limite)` deve retornar as linhas (com `id`,
+    `filial`, `score` e `timestamp`) com id maior que `apos_id`, em ordem de
+    id, e lançar exceção em caso de erro. A varredura só termina numa página
+    vazia: o PostgREST corta as respostas em `max-rows` (1000 no Supabase),
+    e uma página menor que o pedido não indica o fim da tabela.
+    
+    `contar()`, opcional, retorna o total de linhas da tabela; uma reconstrução
+    que leia menos linhas do que havia no início dela é descartada.
+    """
+    
+    def __init__(self, carregar_pagina: Callable[[int, int], List[Dict[str, Any]]],
+                 tamanho_pagina: int = 1000, intervalo_reconciliacao: float = 300.0,
+                 contar: Callable[[], int] = None):
+        self.carregar_pagina = carregar_pagina
+        self.contar = contar
+        self.tamanho_pagina = tamanho_pagina
+        self.intervalo_reconciliacao = intervalo_reconciliacao
+        
+        self._lock = threading.Lock()
+        self._colunas = _Colunas()
+        self._filiais = []
+        self._codigos = {}
+        self._pronto = False
+        self._semeado = threading.Event()
+        # Gravações feitas durante uma reconstrução, reaplicadas no final
+        self._durante_varredura = None
+        self._parar = threading.Event()
+        self._thread = None
+    
+    @property
+    def pronto(self) -> bool:
+        return self._pronto
+    
+    def aguardar(self, tempo_max: float = None) -> bool:
+        """Espera a primeira carga do snapshot; False se não terminar em `tempo_max` segundos"""
+        return self._semeado.wait(tempo_max)
+    
+    def iniciar(self) -> 'NPSSnapshot':
+        """Carrega o snapshot e o reconstrói periodicamente em segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name='nps-snapshot', daemon=True)
+            self._thread.start()
+        return self
+    
+    def encerrar(self):
+        self._parar.set()
+    
+    @staticmethod
+    def _acrescentar(colunas: _Colunas, filiais: List[str], codigos: Dict[str, int],
+                     linhas: List[Dict[str, Any]]):
+        """Converte linhas em arrays tipados e as acrescenta às colunas"""
+        linhas = [linha for linha in linhas if linha.get('score') is not None and linha.get('timestamp')]
+        if not linhas:
+            return
+        
+        codigos_linhas = []
+        for linha in linhas:
+            codigo = codigos.get(linha.get('filial'))
+            if codigo is None:
+                if len(filiais) >= _MAX_FILIAIS:
+                    raise ValueError(f"Mais de {_MAX_FILIAIS} filiais distintas: snapshot indisponível")
+                codigo = codigos[linha.get('filial')] = len(filiais)
+                filiais.append(linha.get('filial'))
+            codigos_linhas.append(codigo)
+        
+        score = np.fromiter((linha['score'] for linha in linhas), dtype=np.int8, count=len(linhas))
+        categoria = np.where(
+            score >= 9, CATEGORIA_PROMOTOR, np.where(score >= 7, CATEGORIA_NEUTRO, CATEGORIA_DETRATOR)
+        ).astype(np.int8)
+        colunas.acrescentar(
+            np.array(codigos_linhas, dtype=np.uint8),
+            score,
+            categoria,
+            timestamps_epoch(linha['timestamp'] for linha in linhas)
+        )
+    
+    def registrar(self, linhas: Iterable[Dict[str, Any]]):
+        """Acrescenta pesquisas recém-gravadas"""
+        linhas = list(linhas)
+        with self._lock:
+            try:
+                self._acrescentar(self._colunas, self._filiais, self._codigos, linhas)
+            except ValueError as e:
+                logger.error(f"Erro ao registrar pesquisas no snapshot NPS: {str(e)}")
+            if self._durante_varredura is not None:
+                self._durante_varredura.extend(linhas)
+    
+    def _visao(self):
+        with self._lock:
+            return self._colunas.visao(), dict(self._codigos), list(self._filiais)
+    
+    def contagens(self, filial: str = None) -> Optional[Tuple[int, int, int]]:
+        """Retorna (promotores, neutros, detratores) da filial ou do total; None se não carregado"""
+        if not self._pronto:
+            return None
+        
+        (filiais, _, categoria, _), codigos, _ = self._visao()
+        if filial:
+            codigo = codigos.get(filial)
+            if codigo is None:
+                return (0, 0, 0)
+            categoria = categoria[filiais == codigo]
+        
+        p, n, d = np.bincount(categoria, minlength=3)
+        return int(p), int(n), int(d)
+    
+    def contagens_por_filial(self) -> Optional[Dict[str, Tuple[int, int, int]]]:
+        """Retorna as contagens de todas as filiais em uma única passada; None se não carregado"""
+        if not self._pronto:
+            return None
+        
+        (filiais, _, categoria, _), _, nomes = self._visao()
+        tabela = np.bincount(
+            filiais.astype(np.intp) * 3 + categoria, minlength=3 * len(nomes)
+        ).reshape(-1, 3)
+        return {nome: tuple(int(c) for c in tabela[codigo]) for codigo, nome in enumerate(nomes)}
+    
+    def colunas(self, filial: str = None, inicio: int = None,
+                fim: int = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Retorna (timestamps, scores) da filial em [inicio, fim) segundos epoch; None se não carregado"""
+        if not self._pronto:
+            return None
+        
+        (filiais, score, _, timestamp), codigos, _ = self._visao()
+        mascara = np.ones(len(timestamp), dtype=bool)
+        if filial:
+            codigo = codigos.get(filial)
+            if codigo is None:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8)
+            mascara &= filiais == codigo
+        if inicio is not None:
+            mascara &= timestamp >= inicio
+        if fim is not None:
+            mascara &= timestamp < fim
+        return timestamp[mascara], score[mascara]
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """Tamanho do snapshot em linhas e bytes"""
+        with self._lock:
+            linhas = self._colunas.tamanho
+            return {
+                'pronto': self._pronto,
+                'linhas': linhas,
+                'filiais': len(self._filiais),
+                'bytes': self._colunas.nbytes,
+                'bytes_por_linha': round(self._colunas.nbytes / linhas, 2) if linhas else 0
+            }
+    
+    def reconciliar(self):
+        """Reconstrói o snapshot com uma varredura paginada e substitui o atual"""
+        with self._lock:
+            self._durante_varredura = []
+        
+        try:
+            # A tabela só recebe inserções: a varredura tem de ler ao menos esse total
+            total = self.contar() if self.contar is not None else None
+            
+            colunas, filiais, codigos = _Colunas(), [], {}
+            ultimo_id = 0
+            lidas = 0
+            while True:
+                pagina = self.carregar_pagina(ultimo_id, self.tamanho_pagina)
+                if not pagina:
+                    break
+                self._acrescentar(colunas, filiais, codigos, pagina)
+                ultimo_id = pagina[-1]['id']
+                lidas += len(pagina)
+            
+            if total is not None and lidas < total:
+                raise Exception(f"Snapshot incompleto: {lidas} linhas lidas de {total}")
+            
+            with self._lock:
+                # Reaplica o que foi gravado depois do trecho já varrido
+                posteriores = [
+                    linha for linha in self._durante_varredura
+                    if linha.get('id') is None or linha['id'] > ultimo_id
+                ]
+                self._acrescentar(colunas, filiais, codigos, posteriores)
+                self._colunas, self._filiais, self._codigos = colunas, filiais, codigos
+                self._pronto = True
+            self._semeado.set()
+        finally:
+            with self._lock:
+                self._durante_varredura = None
+    
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                self.reconciliar()
+            except Exception as e:
+                logger.error(f"Erro ao reconstruir snapshot NPS: {str(e)}")
+            self._parar.wait(self.intervalo_reconciliacao)
@@ -0,0 +1,441 @@
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import logging
+
+from src.services.nps_ingestao import inserir_isolando_falhas, STATUS_PENDENTE, STATUS_GRAVADO, STATUS_ERRO
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def _erro_de_dados(resultado: Dict[str, Any]) -> bool:
+    # 4xx: o banco recusou a linha; timeout e 5xx são transitórios
+    return 400 <= (resultado.get('status_code') or 0) < 500
+
+class NPSSpool:
+    """Spool local durável (write-ahead log) para pesquisas NPS
+    
+    Cada pesquisa aceita é anexada a um segmento `segmento-<seq>.log` como uma
+    linha JSON com número de sequência. As gravações em disco são confirmadas
+    em grupo (um fsync a cada `fsync_ms` para todas as pesquisas pendentes), e
+    uma thread de reenvio drena o log para o Supabase em ordem de sequência.
+    
+    O progresso fica em `checkpoint` (último seq confirmado). Segmentos já
+    totalmente confirmados são apagados (compactação) e, ao iniciar, o que
+    estiver após o checkpoint é reenviado. Cada linha leva um id de envio
+    único na `coluna_dedup` (obrigatória) e os reenvios usam `on_conflict`
+    nessa coluna: uma linha que o banco gravou antes de a resposta se perder
+    (timeout, queda do processo) não é duplicada.
+    
+    Cada processo reivindica uma partição `<diretorio>/<n>` com trava de
+    arquivo; partições órfãs de workers anteriores são reaproveitadas e
+    reenviadas pelo próximo processo que as reivindicar.
+    
+    Só as linhas recusadas pelo banco (4xx) vão para `rejeitados.jsonl`; uma
+    linha com erro transitório (timeout, 5xx) segura o checkpoint e é
+    reenviada com as seguintes.
+    """
+    
+    STATUS_PENDENTE = STATUS_PENDENTE
+    STATUS_GRAVADO = STATUS_GRAVADO
+    STATUS_ERRO = STATUS_ERRO
+    
+    MAX_PARTICOES = 64
+    
+    def __init__(self, client, table_name: str, diretorio: str, segmento_max_bytes: int = 8 * 1024 * 1024,
+                 fsync_ms: int = 5, tamanho_lote: int = 100, coluna_dedup: str = 'id_envio',
+                 ao_gravar: Callable[[List[Dict[str, Any]]], None] = None):
+        self.client = client
+        self.table_name = table_name
+        self.diretorio_base = diretorio
+        self.segmento_max_bytes = segmento_max_bytes
+        self.fsync_intervalo = fsync_ms / 1000.0
+        self.tamanho_lote = tamanho_lote
+        if not coluna_dedup:
+            raise ValueError("O spool exige uma coluna única de deduplicação (NPS_INGESTAO_DEDUP_COLUNA)")
+        self.coluna_dedup = coluna_dedup
+        self.ao_gravar = ao_gravar
+        
+        self.particao = None
+        self.diretorio = None
+        self._trava = None
+        
+        self._lock = threading.Lock()
+        self._sincronizado = threading.Condition(self._lock)
+        self._pendentes = threading.Event()
+        self._parar = threading.Event()
+        self._threads = []
+        
+        self._arquivo = None
+        self._tamanho_segmento = 0
+        self._seq_escrito = 0
+        self._seq_sincronizado = 0
+        self._checkpoint = 0
+        
+        # Posição de leitura do reenvio: (nome do segmento, offset)
+        self._leitura = None
+        # Seqs após o checkpoint já gravados num reenvio parcial (não são reenviados)
+        self._gravados_adiante = set()
+        
+        # Índice de rejeitados.jsonl por partição: {partição: (offset lido, {seq: erro})}
+        self._rejeitados = {}
+        self._lock_rejeitados = threading.Lock()
+    
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    
+    def iniciar(self) -> 'NPSSpool':
+        """Reivindica uma partição, recupera o log e inicia as threads"""
+        self._reivindicar_particao()
+        self._checkpoint = self._ler_checkpoint(self.diretorio)
+        self._recuperar_segmentos()
+        
+        for alvo, nome in ((self._executar_fsync, 'nps-spool-fsync'), (self._executar_reenvio, 'nps-spool-reenvio')):
+            thread = threading.Thread(target=alvo, name=nome, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        
+        if self._seq_escrito > self._checkpoint:
+            logger.info(f"Spool NPS {self.particao}: {self._seq_escrito - self._checkpoint} pesquisas a reenviar")
+            self._pendentes.set()
+        return self
+    
+    def encerrar(self, timeout: float = 10.0):
+        """Sincroniza o log em disco e para as threads (o restante é reenviado no próximo início)"""
+        self._parar.set()
+        self._pendentes.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        
+        with self._lock:
+            if self._arquivo is not None:
+                self._sincronizar()
+                self._arquivo.close()
+                self._arquivo = None
+        
+        if self._trava is not None:
+            self._trava.close()
+            self._trava = None
+    
+    def _reivindicar_particao(self):
+        os.makedirs(self.diretorio_base, exist_ok=True)
+        for particao in range(self.MAX_PARTICOES):
+            diretorio = os.path.join(self.diretorio_base, f'{particao:02d}')
+            os.makedirs(diretorio, exist_ok=True)
+            trava = open(os.path.join(diretorio, 'trava'), 'a')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(trava.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    trava.close()
+                    continue
+            self.particao = f'{particao:02d}'
+            self.diretorio = diretorio
+            self._trava = trava
+            return
+        raise RuntimeError(f"Nenhuma partição livre em {self.diretorio_base}")
+    
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    
+    def enfileirar(self, linha: Dict[str, Any]) -> Optional[str]:
+        """Anexa a linha ao log e retorna o recibo após o fsync do grupo (None em caso de falha)"""
+        if self._parar.is_set():
+            return None
+        
+        registro = {'linha': linha, 'id_envio': uuid.uuid4().hex}
+        
+        try:
+            with self._lock:
+                seq = self._seq_escrito + 1
+                registro['seq'] = seq
+                dados = (json.dumps(registro, separators=(',', ':')) + '\n').encode('utf-8')
+                
+                if self._arquivo is None or self._tamanho_segmento + len(dados) > self.segmento_max_bytes:
+                    self._rotacionar(seq)
+                
+                self._arquivo.write(dados)
+                self._tamanho_segmento += len(dados)
+                self._seq_escrito = seq
+                
+                # Commit em grupo: aguarda o próximo fsync da thread de sincronização
+                while self._seq_sincronizado < seq:
+                    if not self._sincronizado.wait(timeout=5.0) and self._parar.is_set():
+                        break
+        except OSError as e:
+            logger.error(f"Erro ao gravar no spool NPS: {str(e)}")
+            return None
+        
+        self._pendentes.set()
+        return f'{self.particao}-{seq}'
+    
+    def _rotacionar(self, primeiro_seq: int):
+        # Chamado com o lock: fecha o segmento atual já sincronizado e abre outro
+        if self._arquivo is not None:
+            self._sincronizar()
+            self._arquivo.close()
+        
+        caminho = os.path.join(self.diretorio, f'segmento-{primeiro_seq:020d}.log')
+        self._arquivo = open(caminho, 'ab')
+        self._tamanho_segmento = self._arquivo.tell()
+    
+    def _sincronizar(self):
+        # Chamado com o lock
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self._seq_sincronizado = self._seq_escrito
+        self._sincronizado.notify_all()
+    
+    def _executar_fsync(self):
+        while not self._parar.is_set():
+            time.sleep(self.fsync_intervalo)
+            with self._lock:
+                if self._arquivo is not None and self._seq_sincronizado < self._seq_escrito:
+                    try:
+                        self._sincronizar()
+                    except OSError as e:
+                        logger.error(f"Erro no fsync do spool NPS: {str(e)}")
+    
+    # ------------------------------------------------------------------
+    # Recuperação e leitura
+    # ------------------------------------------------------------------
+    
+    def _segmentos(self, diretorio: str = None) -> List[str]:
+        diretorio = diretorio or self.diretorio
+        return sorted(n for n in os.listdir(diretorio) if n.startswith('segmento-') and n.endswith('.log'))
+    
+    @staticmethod
+    def _primeiro_seq(segmento: str) -> int:
+        return int(segmento[len('segmento-'):-len('.log')])
+    
+    def _recuperar_segmentos(self):
+        """Descarta uma linha final incompleta (queda no meio da escrita) e restaura o último seq"""
+        segmentos = self._segmentos()
+        if not segmentos:
+            self._seq_escrito = self._seq_sincronizado = self._checkpoint
+            return
+        
+        ultimo = os.path.join(self.diretorio, segmentos[-1])
+        with open(ultimo, 'rb+') as arquivo:
+            conteudo = arquivo.read()
+            fim = conteudo.rfind(b'\n') + 1
+            if fim < len(conteudo):
+                arquivo.truncate(fim)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            linhas = conteudo[:fim].splitlines()
+        
+        seq = self._primeiro_seq(segmentos[-1]) - 1
+        if linhas:
+            seq = json.loads(linhas[-1])['seq']
+        self._seq_escrito = self._seq_sincronizado = max(seq, self._checkpoint)
+    
+    def _ler_pendentes(self, limite: int) -> List[Dict[str, Any]]:
+        """Lê até `limite` registros após o checkpoint, em ordem de sequência"""
+        registros = []
+        segmentos = self._segmentos()
+        if not segmentos:
+            return registros
+        
+        if self._leitura is None or self._leitura[0] not in segmentos:
+            # Começa pelo segmento que contém o primeiro seq após o checkpoint
+            inicio = segmentos[0]
+            for segmento in segmentos:
+                if self._primeiro_seq(segmento) <= self._checkpoint + 1:
+                    inicio = segmento
+            self._leitura = (inicio, 0)
+        
+        indice = segmentos.index(self._leitura[0])
+        offset = self._leitura[1]
+        while indice < len(segmentos) and len(registros) < limite:
+            segmento = segmentos[indice]
+            with open(os.path.join(self.diretorio, segmento), 'rb') as arquivo:
+                arquivo.seek(offset)
+                while len(registros) < limite:
+                    dados = arquivo.readline()
+                    if not dados.endswith(b'\n'):
+                        break
+                    offset += len(dados)
+                    registro = json.loads(dados)
+                    if registro['seq'] > self._checkpoint:
+                        registros.append(registro)
+            
+            self._leitura = (segmento, offset)
+            if len(registros) >= limite or indice == len(segmentos) - 1:
+                break
+            indice += 1
+            offset = 0
+        
+        return registros
+    
+    # ------------------------------------------------------------------
+    # Reenvio ao Supabase
+    # ------------------------------------------------------------------
+    
+    def _executar_reenvio(self):
+        espera = 0.5
+        while True:
+            self._pendentes.wait(timeout=1.0)
+            self._pendentes.clear()
+            
+            while self._checkpoint < self._seq_sincronizado:
+                registros = self._ler_pendentes(self.tamanho_lote)
+                if not registros:
+                    break
+                
+                if self._reenviar(registros):
+                    espera = 0.5
+                else:
+                    # Supabase indisponível: tenta o mesmo lote depois (mantém a ordem)
+                    if self._parar.wait(espera):
+                        return
+                    espera = min(espera * 2, 30.0)
+            
+            if self._parar.is_set():
+                return
+    
+    def _reenviar(self, registros: List[Dict[str, Any]]) -> bool:
+        """Envia um lote do log; False se alguma linha teve erro transitório"""
+        enviados = [registro for registro in registros if registro['seq'] not in self._gravados_adiante]
+        linhas = []
+        for registro in enviados:
+            linha = dict(registro['linha'])
+            # Registros de antes da deduplicação obrigatória não têm id_envio
+            linha[self.coluna_dedup] = registro.setdefault('id_envio', uuid.uuid4().hex)
+            linhas.append(linha)
+        
+        try:
+            resultados = inserir_isolando_falhas(self.client, self.table_name, linhas, on_conflict=self.coluna_dedup)
+        except Exception as e:
+            resultados = [(False, {'error': str(e)}) for _ in linhas]
+        
+        # O checkpoint para antes da primeira linha com erro transitório; ela e as
+        # seguintes são relidas no próximo reenvio, menos as que já foram gravadas
+        corte = next((i for i, (ok, r) in enumerate(resultados) if not ok and not _erro_de_dados(r)), None)
+        ultimo = registros[-1]['seq'] if corte is None else enviados[corte]['seq'] - 1
+        
+        rejeitados = [(registro, r) for registro, (ok, r) in zip(enviados, resultados)
+                      if not ok and registro['seq'] <= ultimo]
+        if rejeitados:
+            self._registrar_rejeitados(rejeitados)
+        
+        gravadas = [(registro, r) for registro, (ok, r) in zip(enviados, resultados) if ok]
+        self._gravados_adiante.update(registro['seq'] for registro, _ in gravadas if registro['seq'] > ultimo)
+        if ultimo > self._checkpoint:
+            self._avancar_checkpoint(ultimo)
+            self._gravados_adiante = {seq for seq in self._gravados_adiante if seq > ultimo}
+        
+        if self.ao_gravar and gravadas:
+            self.ao_gravar([r for _, r in gravadas])
+        
+        if corte is not None:
+            logger.error(f"Reenvio do spool NPS falhou: {resultados[corte][1].get('error', 'Erro desconhecido')}")
+            # Volta a leitura para reler a partir do checkpoint
+            self._leitura = None
+            return False
+        
+        logger.info(f"Spool NPS {self.particao}: {len(gravadas)}/{len(registros)} pesquisas reenviadas")
+        return True
+    
+    def _registrar_rejeitados(self, rejeitados: List[Tuple[Dict[str, Any], Dict[str, Any]]]):
+        # Linhas recusadas pelo banco (erro de dados) não bloqueiam a fila
+        caminho = os.path.join(self.diretorio, 'rejeitados.jsonl')
+        with open(caminho, 'a', encoding='utf-8') as arquivo:
+            for registro, erro in rejeitados:
+                arquivo.write(json.dumps({
+                    'seq': registro['seq'],
+                    'id_envio': registro.get('id_envio'),
+                    'linha': registro['linha'],
+                    'error': erro.get('error', 'Erro desconhecido')
+                }) + '\n')
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        logger.error(f"Spool NPS {self.particao}: {len(rejeitados)} pesquisas rejeitadas pelo banco")
+    
+    def _avancar_checkpoint(self, seq: int):
+        temporario = os.path.join(self.diretorio, 'checkpoint.tmp')
+        with open(temporario, 'w') as arquivo:
+            arquivo.write(str(seq))
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, os.path.join(self.diretorio, 'checkpoint'))
+        self._checkpoint = seq
+        self._compactar()
+    
+    def _compactar(self):
+        """Apaga segmentos cujas linhas já foram todas confirmadas"""
+        segmentos = self._segmentos()
+        for atual, proximo in zip(segmentos, segmentos[1:]):
+            if self._primeiro_seq(proximo) - 1 > self._checkpoint:
+                break
+            os.remove(os.path.join(self.diretorio, atual))
+    
+    # ------------------------------------------------------------------
+    # Recibos
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _ler_checkpoint(diretorio: str) -> int:
+        try:
+            with open(os.path.join(diretorio, 'checkpoint')) as arquivo:
+                return int(arquivo.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+    
+    def status_recibo(self, recibo: str) -> Optional[Dict[str, Any]]:
+        """Status de um recibo `<partição>-<seq>`, lido do disco (vale entre workers)"""
+        try:
+            particao, seq = recibo.split('-', 1)
+            seq = int(seq)
+            int(particao)
+        except ValueError:
+            return None
+        
+        diretorio = os.path.join(self.diretorio_base, particao)
+        if not os.path.isdir(diretorio) or seq < 1:
+            return None
+        
+        if seq > self._ler_checkpoint(diretorio):
+            if particao == self.particao and seq > self._seq_escrito:
+                return None
+            return {'status': self.STATUS_PENDENTE}
+        
+        erro = self._erros_rejeitados(particao).get(seq)
+        if erro is not None:
+            return {'status': self.STATUS_ERRO, 'error': erro}
+        return {'status': self.STATUS_GRAVADO}
+    
+    def _erros_rejeitados(self, particao: str) -> Dict[int, str]:
+        """Erros de `rejeitados.jsonl` da partição por seq, lendo só o que foi anexado
+        
+        O arquivo só cresce (também pelos outros workers), então o índice guarda
+        o offset já lido e continua dali na próxima consulta.
+        """
+        caminho = os.path.join(self.diretorio_base, particao, 'rejeitados.jsonl')
+        with self._lock_rejeitados:
+            offset, erros = self._rejeitados.get(particao, (0, {}))
+            try:
+                tamanho = os.path.getsize(caminho)
+            except OSError:
+                return erros
+            if tamanho > offset:
+                with open(caminho, 'rb') as arquivo:
+                    arquivo.seek(offset)
+                    for dados in arquivo:
+                        if not dados.endswith(b'\n'):
+                            break
+                        offset += len(dados)
+                        rejeitado = json.loads(dados)
+                        erros[rejeitado['seq']] = rejeitado['error']
+                self._rejeitados[particao] = (offset, erros)
+            return erros
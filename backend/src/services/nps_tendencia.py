@@ -0,0 +1,61 @@
+import warnings
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from src.models.nps_pesquisa_simple import montar_estatisticas
+
+GRANULARIDADES = ('dia', 'semana', 'mes')
+
+_SEGUNDOS_DIA = 86400
+
+def timestamps_epoch(valores: Iterable[str]) -> np.ndarray:
+    """Converte timestamps ISO 8601 (com ou sem fuso) em segundos epoch UTC (int64)"""
+    with warnings.catch_warnings():
+        # O numpy converte o fuso para UTC, mas avisa que não o representa
+        warnings.simplefilter('ignore', UserWarning)
+        datas = np.array(list(valores), dtype='datetime64[us]')
+    return datas.astype('datetime64[s]').astype(np.int64)
+
+def calcular_tendencia(timestamps: np.ndarray, scores: np.ndarray, granularidade: str) -> List[Dict[str, Any]]:
+    """Calcula as estatísticas NPS por período em uma passada vetorizada
+    
+    `timestamps` são segundos epoch (int64) e `scores` notas de 0 a 10 (int8),
+    na mesma ordem. Cada período é identificado pela data inicial
+    (`AAAA-MM-DD`; semanas começam na segunda-feira). Períodos sem pesquisas
+    são omitidos.
+    """
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade inválida: {granularidade}. Use {', '.join(GRANULARIDADES)}")
+    if len(timestamps) == 0:
+        return []
+    
+    if granularidade == 'mes':
+        baldes = timestamps.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    else:
+        baldes = timestamps // _SEGUNDOS_DIA
+        if granularidade == 'semana':
+            # 1970-01-01 foi uma quinta-feira: recua cada dia até a segunda-feira
+            baldes = baldes - (baldes + 3) % 7
+    
+    # Índices densos a partir do primeiro período evitam ordenar as linhas
+    passo = 7 if granularidade == 'semana' else 1
+    inicio = baldes.min()
+    indices = (baldes - inicio) // passo
+    quantidade = int(indices.max()) + 1
+    
+    totais = np.bincount(indices, minlength=quantidade)
+    promotores = np.bincount(indices[scores >= 9], minlength=quantidade)
+    detratores = np.bincount(indices[scores <= 6], minlength=quantidade)
+    neutros = totais - promotores - detratores
+    
+    ocupados = np.flatnonzero(totais)
+    unidade = 'datetime64[M]' if granularidade == 'mes' else 'datetime64[D]'
+    periodos = (inicio + ocupados * passo).astype(unidade).astype('datetime64[D]')
+    
+    return [
+        {'periodo': str(periodo), **montar_estatisticas(int(p), int(n), int(d))}
+        for periodo, p, n, d in zip(
+            periodos, promotores[ocupados], neutros[ocupados], detratores[ocupados]
+        )
+    ]
@@ -0,0 +1,75 @@
+"""
+Fixtures dos testes: um PostgREST falso em memória (benchmarks/fake_postgrest.py)
+no lugar do Supabase, e o serviço NPS montado com a configuração de cada teste.
+
+Rode a partir de backend/: `python -m pytest -q`.
+"""
+import os
+
+import pytest
+
+from benchmarks.fake_postgrest import FakePostgREST
+
+# Antes de importar src: o cliente lê as variáveis ao ser criado e o app
+# aqueceria o serviço em segundo plano ao ser importado
+_SERVIDOR = FakePostgREST().iniciar()
+os.environ.update(
+    SUPABASE_URL=_SERVIDOR.url,
+    SUPABASE_KEY='chave-teste',
+    NPS_AQUECIMENTO='false',
+    NPS_AGREGADOS_ATIVO='false',
+    NPS_SNAPSHOT_ATIVO='false',
+    NPS_METRICAS_ATIVO='false'
+)
+
+from src.config import Config  # noqa: E402
+from src.services.nps_service_simple import NPSServiceSimple, nps_service_simple  # noqa: E402
+
+TABELA = 'nps_pesquisas'
+
+
+@pytest.fixture
+def postgrest():
+    """O PostgREST falso, vazio a cada teste"""
+    with _SERVIDOR.lock:
+        _SERVIDOR.tabelas.clear()
+        _SERVIDOR._indices.clear()
+        _SERVIDOR.ultimo_id = 0
+    _SERVIDOR.taxa_erro = 0.0
+    _SERVIDOR.max_linhas = None
+    yield _SERVIDOR
+    _SERVIDOR.taxa_erro = 0.0
+    _SERVIDOR.max_linhas = None
+
+
+@pytest.fixture
+def criar_servico(postgrest, monkeypatch):
+    """Monta um NPSServiceSimple com atributos de Config sobrescritos
+    
+    O serviço também substitui a instância global usada pelas rotas.
+    """
+    servicos = []
+    
+    def criar(**config) -> NPSServiceSimple:
+        for nome, valor in config.items():
+            monkeypatch.setattr(Config, nome, valor)
+        servico = NPSServiceSimple()
+        object.__setattr__(nps_service_simple, '_objeto', servico)
+        servicos.append(servico)
+        return servico
+    
+    yield criar
+    
+    for servico in servicos:
+        if servico.agregados is not None:
+            servico.agregados.encerrar()
+        if servico.snapshot is not None:
+            servico.snapshot.encerrar()
+    object.__setattr__(nps_service_simple, '_objeto', None)
+
+
+@pytest.fixture
+def cliente(criar_servico):
+    """Cliente HTTP do app Flask (crie o serviço antes com `criar_servico`)"""
+    from src.main import app
+    return app.test_client()
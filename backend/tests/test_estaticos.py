@@ -0,0 +1,53 @@
+import gzip
+
+import pytest
+from werkzeug.http import parse_accept_header
+
+from src.services.nps_estaticos import ArquivosEstaticos
+
+CORPO = b'console.log("nps");\n' * 200
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    (tmp_path / 'app.js').write_bytes(CORPO)
+    # Variante br do build (vite-plugin-compression), sem depender do pacote brotli
+    (tmp_path / 'app.js.br').write_bytes(b'br' * 10)
+    return ArquivosEstaticos(str(tmp_path)).arquivo('app.js')
+
+
+def _variante(arquivo, accept_encoding):
+    variante = arquivo.variante(parse_accept_header(accept_encoding))
+    return dict(variante.cabecalhos).get('Content-Encoding')
+
+
+@pytest.mark.parametrize('accept_encoding, esperada', [
+    ('gzip, br', 'br'),
+    ('gzip;q=1.0, br;q=0.5', 'gzip'),
+    ('br;q=0, *', 'gzip'),
+    ('gzip;q=0, br;q=0', None),
+    ('*;q=0', None),
+    ('identity', None),
+    ('', None),
+    ('GZIP', 'gzip'),
+])
+def test_variante_respeita_os_valores_q(arquivo, accept_encoding, esperada):
+    assert _variante(arquivo, accept_encoding) == esperada
+
+
+@pytest.mark.parametrize('accept_encoding, comprimida', [
+    ('gzip', True),
+    ('identity, *;q=0.5', True),
+    ('gzip;q=0', False),
+    ('br', False),
+])
+def test_exportacao_negocia_gzip(criar_servico, cliente, postgrest, accept_encoding, comprimida):
+    criar_servico()
+    postgrest.inserir('nps_pesquisas', [{'filial': 'blumenau', 'score': 9, 'categoria_nps': 'promotor'}])
+    
+    resposta = cliente.get('/api/nps/export', headers={'Accept-Encoding': accept_encoding})
+    corpo = resposta.get_data()
+    resposta.close()
+    
+    assert (resposta.headers.get('Content-Encoding') == 'gzip') == comprimida
+    assert b'blumenau' in (gzip.decompress(corpo) if comprimida else corpo)
@@ -0,0 +1,63 @@
+import threading
+
+from src.services.nps_cache import MemoriaCacheBackend, NPSCache
+
+
+class CacheCompartilhado(MemoriaCacheBackend):
+    """Backend em memória que se declara compartilhado, no lugar do Redis"""
+    compartilhado = True
+
+
+def _servico_com_cache_compartilhado(criar_servico, **config):
+    servico = criar_servico(**config)
+    servico.cache = NPSCache(CacheCompartilhado())
+    return servico
+
+
+def test_sem_etag_com_cache_local(criar_servico, cliente):
+    criar_servico(NPS_CACHE_ATIVO=True, NPS_CACHE_REDIS_URL=None)
+    
+    assert cliente.get('/api/nps').headers.get('ETag') is None
+    assert cliente.get('/api/nps/estatisticas').headers.get('ETag') is None
+
+
+def test_etag_nao_consulta_o_banco(criar_servico, monkeypatch):
+    local = criar_servico(NPS_CACHE_ATIVO=True, NPS_CACHE_REDIS_URL=None)
+    compartilhado = _servico_com_cache_compartilhado(criar_servico)
+    # Só as consultas desta thread (a verificação de saúde roda em segundo plano)
+    consultas = []
+    thread = threading.get_ident()
+    for metodo in ('select', 'count', 'rpc'):
+        original = getattr(local.client, metodo)
+        
+        def registrar(*args, original=original, metodo=metodo, **kwargs):
+            if threading.get_ident() == thread:
+                consultas.append(metodo)
+            return original(*args, **kwargs)
+        monkeypatch.setattr(local.client, metodo, registrar)
+    
+    assert local.etag('listar', 'blumenau', limite=10, cursor=None) is None
+    assert compartilhado.etag('listar', 'blumenau', limite=10, cursor=None)
+    assert consultas == []
+
+
+def test_etag_muda_com_gravacao_de_outro_worker(criar_servico, cliente):
+    servico = _servico_com_cache_compartilhado(criar_servico)
+    
+    etag = cliente.get('/api/nps?filial=blumenau').headers['ETag']
+    assert cliente.get('/api/nps?filial=blumenau', headers={'If-None-Match': etag}).status_code == 304
+    
+    # Outro worker gravou: só o contador compartilhado muda
+    servico.cache.invalidar('blumenau')
+    resposta = cliente.get('/api/nps?filial=blumenau', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
+
+
+def test_estatisticas_da_memoria_do_worker_sem_etag(criar_servico, cliente):
+    servico = _servico_com_cache_compartilhado(criar_servico, NPS_AGREGADOS_ATIVO=True)
+    servico.agregados.aguardar(5)
+    
+    assert cliente.get('/api/nps/estatisticas').headers.get('ETag') is None
+    assert cliente.get('/api/nps/estatisticas/filiais').headers.get('ETag') is None
+    assert cliente.get('/api/nps').headers.get('ETag') is not None
@@ -0,0 +1,29 @@
+import time
+
+from src.services.nps_idempotencia import EM_ANDAMENTO, NOVA, NPSIdempotencia
+
+
+def test_filtro_bloom_refeito_uma_vez_a_cada_max_itens_reservas():
+    idempotencia = NPSIdempotencia(max_itens=1000, bloom=True)
+    refeitos = []
+    limpar = idempotencia.bloom.limpar
+    idempotencia.bloom.limpar = lambda: (refeitos.append(1), limpar())
+    
+    for indice in range(10000):
+        assert idempotencia.reservar([f'chave-{indice}']) == (NOVA, None)
+    
+    assert len(refeitos) <= 10
+    # As chaves ainda guardadas continuam no filtro depois de refeito
+    assert idempotencia.reservar(['chave-9999'])[0] == EM_ANDAMENTO
+
+
+def test_reserva_com_filtro_cheio_continua_rapida():
+    idempotencia = NPSIdempotencia(max_itens=10000, bloom=True)
+    for indice in range(10000):
+        idempotencia.reservar([f'chave-{indice}'])
+    
+    inicio = time.perf_counter()
+    for indice in range(10000, 11000):
+        idempotencia.reservar([f'chave-{indice}'])
+    # Antes, cada reserva com o filtro cheio o refazia inteiro (dezenas de ms)
+    assert time.perf_counter() - inicio < 1.0
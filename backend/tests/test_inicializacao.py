@@ -0,0 +1,23 @@
+import os
+
+from src.services.nps_inicializacao import Preguicoso
+
+
+def test_processo_filho_cria_a_propria_instancia():
+    criadas = []
+    preguicoso = Preguicoso('teste', lambda: criadas.append(os.getpid()) or object())
+    do_pai = preguicoso.obter()
+    
+    leitura, escrita = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(leitura)
+        novo = preguicoso.obter() is not do_pai and criadas == [os.getppid(), os.getpid()]
+        os.write(escrita, b'1' if novo else b'0')
+        os._exit(0)
+    
+    os.close(escrita)
+    os.waitpid(pid, 0)
+    assert os.read(leitura, 1) == b'1'
+    os.close(leitura)
+    assert preguicoso.obter() is do_pai
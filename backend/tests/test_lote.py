@@ -0,0 +1,69 @@
+import time
+
+from src.database.supabase_client_simple import SimpleSupabaseClient
+from src.services.nps_ingestao import NPSIngestaoLote
+
+VALIDA = {'filial': 'blumenau', 'score': 9}
+INVALIDA = {'filial': 'blumenau', 'score': 11}
+
+
+def test_lote_todo_gravado_responde_201(criar_servico, cliente):
+    criar_servico()
+    resposta = cliente.post('/api/nps/lote', json=[VALIDA, VALIDA])
+    assert resposta.status_code == 201
+    assert resposta.get_json()['data']['gravadas'] == 2
+
+
+def test_lote_com_parte_gravada_responde_207(criar_servico, cliente):
+    criar_servico()
+    resposta = cliente.post('/api/nps/lote', json=[VALIDA, INVALIDA])
+    assert resposta.status_code == 207
+    itens = resposta.get_json()['data']['itens']
+    assert [item['success'] for item in itens] == [True, False]
+
+
+def test_lote_sem_nada_gravado_por_itens_invalidos_responde_400(criar_servico, cliente):
+    criar_servico()
+    assert cliente.post('/api/nps/lote', json=[INVALIDA, INVALIDA]).status_code == 400
+
+
+def test_lote_sem_nada_gravado_por_falha_do_banco_responde_503(criar_servico, cliente, postgrest):
+    criar_servico()
+    postgrest.taxa_erro = 1.0
+    assert cliente.post('/api/nps/lote', json=[VALIDA, VALIDA]).status_code == 503
+
+
+def _aguardar_gravacao(ingestao, recibo):
+    for _ in range(100):
+        if ingestao.status_recibo(recibo)['status'] != ingestao.STATUS_PENDENTE:
+            return
+        time.sleep(0.02)
+
+
+def test_recibo_confirmado_por_outro_worker(postgrest):
+    cliente = SimpleSupabaseClient()
+    ingestao = NPSIngestaoLote(cliente, 'nps_pesquisas', intervalo_ms=10).iniciar()
+    outro_worker = NPSIngestaoLote(cliente, 'nps_pesquisas')
+    try:
+        recibo = ingestao.enfileirar({'filial': 'blumenau', 'score': 9, 'categoria_nps': 'promotor'})
+        _aguardar_gravacao(ingestao, recibo)
+        
+        status = outro_worker.status_recibo(recibo)
+        assert status['status'] == NPSIngestaoLote.STATUS_GRAVADO
+        assert status['data']['id_envio'] == recibo
+        assert outro_worker.status_recibo('0' * 32) is None
+    finally:
+        ingestao.encerrar()
+
+
+def test_nova_tentativa_do_lote_nao_duplica(postgrest):
+    cliente = SimpleSupabaseClient()
+    ingestao = NPSIngestaoLote(cliente, 'nps_pesquisas')
+    recibo = 'a' * 32
+    linha = {'filial': 'blumenau', 'score': 9, 'categoria_nps': 'promotor', 'id_envio': recibo}
+    
+    # A primeira tentativa gravou, mas a resposta se perdeu
+    ingestao._gravar([(recibo, linha)])
+    ingestao._gravar([(recibo, linha)])
+    
+    assert cliente.count('nps_pesquisas') == (True, 1)
@@ -0,0 +1,18 @@
+import threading
+
+from src.services.nps_metricas import CONTADOR, NPSMetricas
+
+
+def test_fragmentos_de_threads_encerradas_sao_incorporados_ao_registrar():
+    metricas = NPSMetricas()
+    metricas.definir('nps_teste_total', CONTADOR, 'Contador de teste')
+    
+    # Servidor com uma thread por requisição: nenhuma coleta no meio
+    for _ in range(2000):
+        thread = threading.Thread(target=metricas.incrementar, args=('nps_teste_total',))
+        thread.start()
+        thread.join()
+    
+    assert len(metricas._fragmentos) < 64
+    series, _ = metricas._series_processo()
+    assert series[('nps_teste_total', ())] == 2000
@@ -0,0 +1,39 @@
+import os
+import time
+
+import pytest
+
+from src.database.sqlite_client import SQLiteClient
+from src.services.nps_spool import NPSSpool
+
+
+def test_spool_exige_coluna_de_deduplicacao(tmp_path):
+    cliente = SQLiteClient(str(tmp_path / 'nps.db'))
+    with pytest.raises(ValueError):
+        NPSSpool(cliente, 'nps_pesquisas', str(tmp_path / 'spool'), coluna_dedup=None)
+
+
+def test_reenvio_do_spool_nao_duplica(tmp_path):
+    cliente = SQLiteClient(str(tmp_path / 'nps.db'))
+    diretorio = str(tmp_path / 'spool')
+    
+    spool = NPSSpool(cliente, 'nps_pesquisas', diretorio, fsync_ms=1).iniciar()
+    recibo = spool.enfileirar({'filial': 'blumenau', 'score': 9, 'categoria_nps': 'promotor'})
+    for _ in range(100):
+        if spool.status_recibo(recibo)['status'] == NPSSpool.STATUS_GRAVADO:
+            break
+        time.sleep(0.02)
+    spool.encerrar()
+    assert cliente.count('nps_pesquisas') == (True, 1)
+    
+    # Queda antes de o checkpoint chegar ao disco: o log é reenviado ao reiniciar
+    with open(os.path.join(diretorio, spool.particao, 'checkpoint'), 'w') as arquivo:
+        arquivo.write('0')
+    spool = NPSSpool(cliente, 'nps_pesquisas', diretorio, fsync_ms=1).iniciar()
+    for _ in range(100):
+        if spool.status_recibo(recibo)['status'] == NPSSpool.STATUS_GRAVADO:
+            break
+        time.sleep(0.02)
+    spool.encerrar()
+    
+    assert cliente.count('nps_pesquisas') == (True, 1)
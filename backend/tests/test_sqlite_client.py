@@ -0,0 +1,50 @@
+import sqlite3
+import threading
+
+from src.database.sqlite_client import SQLiteClient
+
+LINHA = {'filial': 'blumenau', 'score': 9, 'categoria_nps': 'promotor'}
+
+
+def test_threads_por_requisicao_reaproveitam_as_conexoes(tmp_path):
+    cliente = SQLiteClient(str(tmp_path / 'nps.db'), pool_size=2)
+    
+    for _ in range(50):
+        thread = threading.Thread(target=cliente.insert, args=('nps_pesquisas', LINHA))
+        thread.start()
+        thread.join()
+    
+    assert cliente.count('nps_pesquisas') == (True, 50)
+    assert cliente.pool_stats()['conexoes_novas'] == 1
+
+
+def test_conexao_com_erro_volta_ao_pool(tmp_path):
+    cliente = SQLiteClient(str(tmp_path / 'nps.db'), pool_size=1)
+    
+    sucesso, erro = cliente.insert_many('nps_pesquisas', [LINHA, dict(LINHA, score=11)])
+    assert not sucesso and erro['status_code'] == 400
+    assert cliente.insert_many('nps_pesquisas', [LINHA])[0]
+    assert cliente.pool_stats()['conexoes_novas'] == 1
+
+
+def test_horarios_antigos_normalizados_uma_vez(tmp_path):
+    caminho = str(tmp_path / 'nps.db')
+    cliente = SQLiteClient(caminho)
+    cliente.insert('nps_pesquisas', LINHA)
+    cliente.close()
+    
+    # Arquivo de antes da normalização: horário sem fuso e sem microssegundos
+    conexao = sqlite3.connect(caminho)
+    conexao.execute("UPDATE nps_pesquisas SET timestamp = '2026-01-01T10:00:00'")
+    conexao.execute('PRAGMA user_version = 0')
+    conexao.commit()
+    
+    SQLiteClient(caminho)
+    assert conexao.execute('SELECT timestamp FROM nps_pesquisas').fetchone() == ('2026-01-01T10:00:00.000000+00:00',)
+    
+    # Já migrado: abrir de novo não varre a tabela
+    conexao.execute("UPDATE nps_pesquisas SET timestamp = 'intocado'")
+    conexao.commit()
+    SQLiteClient(caminho)
+    assert conexao.execute('SELECT timestamp FROM nps_pesquisas').fetchone() == ('intocado',)
+    conexao.close()
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.services.nps_agregados import NPSAgregados
+from src.services.nps_snapshot import NPSSnapshot
+
+# Como o `max-rows` do PostgREST: nenhuma página passa disto, peça-se o que for
+MAX_LINHAS = 300
+
+
+def _linhas(total):
+    inicio = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'id': i,
+            'filial': 'blumenau' if i % 2 else 'joinville',
+            'score': 9,
+            'categoria_nps': 'promotor',
+            'timestamp': (inicio + timedelta(minutes=i)).isoformat()
+        }
+        for i in range(1, total + 1)
+    ]
+
+
+def _carregador(linhas):
+    def carregar_pagina(apos_id, limite):
+        return [linha for linha in linhas if linha['id'] > apos_id][:min(limite, MAX_LINHAS)]
+    return carregar_pagina
+
+
+def test_snapshot_le_a_tabela_inteira_com_paginas_cortadas():
+    linhas = _linhas(2500)
+    snapshot = NPSSnapshot(_carregador(linhas), contar=lambda: len(linhas))
+    snapshot.reconciliar()
+    
+    assert snapshot.contagens() == (2500, 0, 0)
+    assert snapshot.contagens('blumenau') == (1250, 0, 0)
+
+
+def test_snapshot_incompleto_nao_substitui_o_atual():
+    linhas = _linhas(10)
+    snapshot = NPSSnapshot(_carregador(linhas), contar=lambda: len(linhas))
+    snapshot.reconciliar()
+    
+    snapshot.contar = lambda: 50
+    with pytest.raises(Exception, match='Snapshot incompleto'):
+        snapshot.reconciliar()
+    assert snapshot.contagens() == (10, 0, 0)
+
+
+def test_agregados_leem_a_tabela_inteira_com_paginas_cortadas():
+    linhas = _linhas(2500)
+    agregados = NPSAgregados(_carregador(linhas), contar=lambda: len(linhas))
+    agregados.reconciliar()
+    
+    assert agregados.contagens() == (2500, 0, 0)
+
+
+def test_agregados_incompletos_nao_substituem_os_atuais():
+    linhas = _linhas(10)
+    agregados = NPSAgregados(_carregador(linhas), contar=lambda: len(linhas))
+    agregados.reconciliar()
+    
+    agregados.contar = lambda: 50
+    with pytest.raises(Exception, match='Agregados incompletos'):
+        agregados.reconciliar()
+    assert agregados.contagens() == (10, 0, 0)
+
+
+def test_contagens_e_exportacao_paginam_ate_a_pagina_vazia(criar_servico, postgrest):
+    servico = criar_servico(NPS_ESTATISTICAS_RPC=None)
+    postgrest.inserir('nps_pesquisas', [{k: v for k, v in linha.items() if k != 'id'} for linha in _linhas(2500)])
+    postgrest.max_linhas = MAX_LINHAS
+    
+    sucesso, contagens = servico.contar_categorias_por_filial()
+    assert sucesso
+    assert contagens == {'blumenau': (1250, 0, 0), 'joinville': (1250, 0, 0)}
+    assert sum(len(pagina) for pagina in servico.exportar_pesquisas()) == 2500